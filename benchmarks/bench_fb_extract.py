@@ -0,0 +1,183 @@
+"""
+bench_fb_extract.py
+───────────────────
+Micro-benchmark for the Facebook page scanner (facebook_download._scan_page)
+against the per-token regex passes it replaced, on 2–5 MB pages.
+
+Pages are generated with fake_cdn.fb_profile_html (padded to size) unless
+real ones are given with --page; save a reels tab from the browser
+("Save page as… → HTML only") or a GraphQL response body to use those.
+Both implementations must agree on every page before timings are printed,
+and the streamed JS bundle scan (facebook_download._scan_bundle) must
+return the whole doc_id wherever a chunk boundary cuts it.
+
+Usage:
+  python benchmarks/bench_fb_extract.py
+  python benchmarks/bench_fb_extract.py --sizes-mb 2,5 --repeat 20
+  python benchmarks/bench_fb_extract.py --page saved_reels.html --page graphql.json
+"""
+
+from __future__ import annotations
+import argparse
+import base64
+import json
+import os
+import re
+import sys
+import threading
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+from fake_cdn import (FB_DOC_ID, FB_QUERY, fb_graphql_page,  # noqa: E402
+                      fb_js_bundle, fb_profile_html)
+
+import facebook_download                                # noqa: E402
+
+
+def legacy_scan(text: str) -> dict:
+    """The extraction as it was done before _scan_page: one regex pass per token."""
+    reels, videos, local_seen = [], [], set()
+    for reel_id in re.findall(r'(?:/|\\/)reel(?:/|\\/)(\d+)', text):
+        if reel_id not in local_seen:
+            local_seen.add(reel_id)
+            reels.append(reel_id)
+    for vid_id in re.findall(r'"video_id"\s*:\s*"(\d+)"', text):
+        if vid_id not in local_seen:
+            local_seen.add(vid_id)
+            videos.append(vid_id)
+    cursor_m = re.search(r'"end_cursor"\s*:\s*"([^"]+)"', text)
+    has_next_m = re.search(r'"has_next_page"\s*:\s*(true|false)', text)
+    lsd_m = re.search(r'"LSD",\[\],\{"token":"([^"]+)"\}', text)
+    dtsg_m = re.search(r'"DTSGInitData",\[\],\{"token":"([^"]+)"', text)
+    collection = None
+    for b64 in re.findall(r'"id"\s*:\s*"([A-Za-z0-9+/]{20,}={0,2})"', text):
+        try:
+            if 'app_collection' in base64.b64decode(b64 + '==').decode('utf-8', errors='replace'):
+                collection = b64
+                break
+        except Exception:
+            pass
+    js = list(dict.fromkeys(re.findall(r'"(https://static[^"]+rsrc\.php[^"]*\.js[^"]*)"', text)))
+    return {
+        'reels': reels,
+        'videos': videos,
+        'cursor': cursor_m.group(1) if cursor_m else None,
+        'has_next': (has_next_m.group(1) == 'true') if has_next_m else None,
+        'lsd': lsd_m.group(1) if lsd_m else None,
+        'dtsg': dtsg_m.group(1) if dtsg_m else None,
+        'collection': collection,
+        'js': js,
+    }
+
+
+def _comparable(scan: dict) -> dict:
+    # The old code dropped a video_id that repeated a reel ID; the scraper
+    # still dedupes by ID after _scan_page, so compare the resulting ID set.
+    out = dict(scan)
+    out['ids'] = list(dict.fromkeys(scan['reels'] + scan['videos']))
+    del out['reels'], out['videos']
+    out.pop('times', None)
+    return out
+
+
+class _StubResponse:
+    """Just enough of a streamed requests.Response for _scan_bundle."""
+
+    status_code = 200
+
+    def __init__(self, chunks: list[bytes]):
+        self._chunks = chunks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        return iter(self._chunks)
+
+
+class _StubSession:
+    def __init__(self, chunks: list[bytes]):
+        self._chunks = chunks
+
+    def get(self, url, **kwargs):
+        return _StubResponse(self._chunks)
+
+
+def check_bundle_split() -> str | None:
+    """Stream bundles cut at every offset inside the doc_id through
+    _scan_bundle; return a description of the first wrong result."""
+    bundles = {
+        'quoted': fb_js_bundle(7, 2000).encode(),               # e.exports="…"}),null);
+        'at end': f'{FB_QUERY}:{FB_DOC_ID}'.encode(),          # id is the last byte
+    }
+    for name, js in bundles.items():
+        pos = js.rindex(FB_DOC_ID.encode())
+        for cut in range(pos + 1, pos + len(FB_DOC_ID)):
+            stub = _StubSession([js[:cut], js[cut:]])
+            got = facebook_download._scan_bundle(stub, 'bundle.js', threading.Event())
+            if got != FB_DOC_ID:
+                return f'bundle {name!r} cut at +{cut - pos}: got {got}, want {FB_DOC_ID}'
+    return None
+
+
+def _pages(sizes_mb: list[float], files: list[str]) -> list[tuple[str, str]]:
+    pages = []
+    for path in files:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            pages.append((os.path.basename(path), f.read()))
+    for mb in sizes_mb:
+        pages.append((f'profile {mb:g} MB', fb_profile_html(10, int(mb * 1024 * 1024))))
+    pages.append(('graphql 24 items', fb_graphql_page('cursor_10', 24, 1000)))
+    return pages
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes-mb', default='2,3,5', help='generated page sizes (default 2,3,5)')
+    ap.add_argument('--page', action='append', default=[], metavar='FILE',
+                    help='recorded page / GraphQL response to include (repeatable)')
+    ap.add_argument('--repeat', type=int, default=10, help='timed runs per page (best is kept)')
+    ap.add_argument('--json', metavar='PATH', help='also write results as JSON')
+    args = ap.parse_args(argv)
+
+    err = check_bundle_split()
+    if err:
+        print(f'_scan_bundle: {err}')
+        return 1
+
+    sizes = [float(s) for s in args.sizes_mb.split(',') if s.strip()]
+    rows = []
+    for name, text in _pages(sizes, args.page):
+        new = facebook_download._scan_page(text)
+        old = legacy_scan(text)
+        if _comparable(new) != _comparable(old):
+            print(f'{name}: results differ\n  old={_comparable(old)}\n  new={_comparable(new)}')
+            return 1
+        t_old = min(timeit.repeat(lambda: legacy_scan(text), number=1, repeat=args.repeat))
+        t_new = min(timeit.repeat(lambda: facebook_download._scan_page(text),
+                                  number=1, repeat=args.repeat))
+        rows.append({'page': name, 'bytes': len(text), 'legacy_ms': t_old * 1000,
+                     'scan_ms': t_new * 1000, 'speedup': t_old / t_new if t_new else 0.0,
+                     'ids': len(new['reels']) + len(new['videos'])})
+
+    hdr = f"{'page':<22} {'MB':>6} {'legacy ms':>10} {'scan ms':>9} {'speedup':>8} {'ids':>5}"
+    print(hdr)
+    print('─' * len(hdr))
+    for r in rows:
+        print(f"{r['page']:<22} {r['bytes'] / 1048576:>6.2f} {r['legacy_ms']:>10.2f} "
+              f"{r['scan_ms']:>9.2f} {r['speedup']:>7.1f}x {r['ids']:>5}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
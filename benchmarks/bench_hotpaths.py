@@ -0,0 +1,279 @@
+"""
+bench_hotpaths.py
+─────────────────
+Benchmark extraction and download hot paths against the local fake CDN.
+
+Stages (each run for every scenario size, default 10 / 100 / 1000 items):
+  build_opts   _build_tt_opts / _build_fb_opts / _build_ig_opts / _build_ydl_opts
+  parse_info   tiktok_download._parse_info over a recorded-shape playlist
+  fb_scrape    facebook_download._scrape_video_urls (HTML + JS bundles + GraphQL)
+  fb_warm      same, with doc_id / tokens loaded from the persisted token store
+  fb_serial    10 profile pages scraped one after another (cold doc_id)
+  fb_batch     the same 10 pages through scrape_facebook_profiles (concurrent)
+  tt_resolve   tiktok_download._resolve_channel_id (profile page → secUid)
+  download     yt-dlp transfer of N media files with each platform's opts
+
+Reports wall time, per-item latency, throughput and peak Python memory
+(tracemalloc, measured in a second pass so it doesn't skew timings).
+The download stage reports RSS high-water instead.
+
+Usage:
+  python benchmarks/bench_hotpaths.py
+  python benchmarks/bench_hotpaths.py --sizes 10,100 --stages fb_scrape,download
+  python benchmarks/bench_hotpaths.py --json bench_output.json
+"""
+
+from __future__ import annotations
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_cdn import FB_DOC_ID, FakeCDN, route_requests, ytdlp_playlist_info  # noqa: E402
+
+import yt_dlp                   # noqa: E402
+import tiktok_download          # noqa: E402
+import facebook_download        # noqa: E402
+import fb_tokens                # noqa: E402
+import tt_ids                   # noqa: E402
+import instagram_download       # noqa: E402
+import youtube_download         # noqa: E402
+
+try:
+    import resource
+except ImportError:             # Windows
+    resource = None
+
+
+STAGES = ['build_opts', 'parse_info', 'fb_scrape', 'fb_warm', 'fb_serial', 'fb_batch',
+          'tt_resolve', 'download']
+FB_PROFILES = 10
+PLATFORMS = ['tiktok', 'facebook', 'instagram', 'youtube']
+
+
+def _opts_for(platform: str, out_dir: str) -> dict:
+    if platform == 'tiktok':
+        return tiktok_download._build_tt_opts(out_dir)
+    if platform == 'facebook':
+        return facebook_download._build_fb_opts(out_dir)
+    if platform == 'instagram':
+        return instagram_download._build_ig_opts(out_dir)
+    return youtube_download._build_ydl_opts(out_dir)
+
+
+# ── Stage bodies: each returns (items_processed, bytes_moved) ─────────────────
+
+def stage_build_opts(n: int, cdn: FakeCDN, platforms: list[str]) -> tuple[int, int]:
+    for _ in range(n):
+        for p in platforms:
+            _opts_for(p, 'downloads')
+    return n * len(platforms), 0
+
+
+def stage_parse_info(n: int, cdn: FakeCDN, platforms: list[str]) -> tuple[int, int]:
+    info = ytdlp_playlist_info(n)
+    out = tiktok_download._parse_info(info, 'https://www.tiktok.com/@bench')
+    assert len(out) == n
+    return n, 0
+
+
+def stage_fb_scrape(n: int, cdn: FakeCDN, platforms: list[str]) -> tuple[int, int]:
+    facebook_download.token_store.clear()            # include bundle discovery
+    return _fb_scrape(n, cdn)
+
+
+def stage_fb_warm(n: int, cdn: FakeCDN, platforms: list[str]) -> tuple[int, int]:
+    facebook_download.token_store.put_doc_id(FB_DOC_ID)   # as left by an earlier run
+    return _fb_scrape(n, cdn)
+
+
+def _fb_profiles(cdn: FakeCDN, n: int) -> list[str]:
+    cdn.items = n
+    facebook_download.token_store.clear()
+    facebook_download._cached_reels_doc_id = None
+    return [f'https://www.facebook.com/benchpage{i}' for i in range(FB_PROFILES)]
+
+
+def stage_fb_serial(n: int, cdn: FakeCDN, platforms: list[str]) -> tuple[int, int]:
+    profiles = _fb_profiles(cdn, n)
+    with route_requests(cdn):
+        found = sum(len(facebook_download._scrape_video_urls(p)) for p in profiles)
+    if found != n * FB_PROFILES:
+        raise RuntimeError(f'fb_serial returned {found} of {n * FB_PROFILES} URLs')
+    return found, 0
+
+
+def stage_fb_batch(n: int, cdn: FakeCDN, platforms: list[str]) -> tuple[int, int]:
+    profiles = _fb_profiles(cdn, n)
+    with route_requests(cdn):
+        found = len(list(facebook_download.scrape_facebook_profiles(profiles)))
+    if found != n * FB_PROFILES:
+        raise RuntimeError(f'fb_batch returned {found} of {n * FB_PROFILES} URLs')
+    return found, 0
+
+
+def _fb_scrape(n: int, cdn: FakeCDN) -> tuple[int, int]:
+    cdn.items = n
+    facebook_download._cached_reels_doc_id = None    # as in a fresh process
+    with route_requests(cdn):
+        urls = facebook_download._scrape_video_urls('https://www.facebook.com/benchpage')
+    if len(urls) != n:
+        raise RuntimeError(f'fb_scrape returned {len(urls)} of {n} URLs')
+    return n, 0
+
+
+def stage_tt_resolve(n: int, cdn: FakeCDN, platforms: list[str]) -> tuple[int, int]:
+    tiktok_download.id_cache.clear()                 # measure the lookups, not the cache
+    with route_requests(cdn):
+        for i in range(n):
+            if not tiktok_download._resolve_channel_id(f'https://www.tiktok.com/@bench{i}'):
+                raise RuntimeError('secUid not resolved')
+    return n, 0
+
+
+def stage_download(n: int, cdn: FakeCDN, platforms: list[str]) -> tuple[int, int]:
+    total_bytes = 0
+    items = 0
+    for p in platforms:
+        out_dir = tempfile.mkdtemp(prefix=f'bench_{p}_')
+        try:
+            opts = _opts_for(p, out_dir)
+            opts.pop('cookiefile', None)
+            opts.pop('cookiesfrombrowser', None)
+            opts['outtmpl'] = os.path.join(out_dir, '%(id)s.%(ext)s')
+            urls = [cdn.media_url(f'{p}_{i:05d}') for i in range(n)]
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                ydl.download(urls)
+            for name in os.listdir(out_dir):
+                total_bytes += os.path.getsize(os.path.join(out_dir, name))
+                items += 1
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    return items, total_bytes
+
+
+_STAGE_FNS = {
+    'build_opts': stage_build_opts,
+    'parse_info': stage_parse_info,
+    'fb_scrape':  stage_fb_scrape,
+    'fb_warm':    stage_fb_warm,
+    'fb_serial':  stage_fb_serial,
+    'fb_batch':   stage_fb_batch,
+    'tt_resolve': stage_tt_resolve,
+    'download':   stage_download,
+}
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+def _rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024 * 1024)
+
+
+def run_stage(name: str, n: int, cdn: FakeCDN, platforms: list[str],
+              measure_memory: bool) -> dict:
+    fn = _STAGE_FNS[name]
+    gc.collect()
+    hits_before = dict(cdn.hits)
+    t0 = time.perf_counter()
+    items, nbytes = fn(n, cdn, platforms)
+    wall = time.perf_counter() - t0
+    requests_made = sum(cdn.hits.values()) - sum(hits_before.values())
+
+    row = {
+        'stage':        name,
+        'size':         n,
+        'items':        items,
+        'wall_s':       wall,
+        'per_item_ms':  wall / items * 1000 if items else 0.0,
+        'items_per_s':  items / wall if wall > 0 else 0.0,
+        'mb_per_s':     nbytes / wall / (1024 * 1024) if wall > 0 and nbytes else 0.0,
+        'http_requests': requests_made,
+        'peak_mem_mb':  None,
+        'rss_mb':       None,
+    }
+
+    if name == 'download':
+        row['rss_mb'] = _rss_mb()
+    elif measure_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn(n, cdn, platforms)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        row['peak_mem_mb'] = peak / (1024 * 1024)
+    return row
+
+
+def _print_table(rows: list[dict]) -> None:
+    hdr = (f"{'stage':<11} {'size':>5} {'items':>6} {'wall s':>8} {'ms/item':>9} "
+           f"{'items/s':>9} {'MB/s':>7} {'reqs':>6} {'mem MB':>7}")
+    print(hdr)
+    print('─' * len(hdr))
+    for r in rows:
+        mem = r['peak_mem_mb'] if r['peak_mem_mb'] is not None else r['rss_mb']
+        mem_s = f'{mem:7.1f}' if mem is not None else '    n/a'
+        print(f"{r['stage']:<11} {r['size']:>5} {r['items']:>6} {r['wall_s']:>8.3f} "
+              f"{r['per_item_ms']:>9.3f} {r['items_per_s']:>9.1f} {r['mb_per_s']:>7.1f} "
+              f"{r['http_requests']:>6} {mem_s}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes', default='10,100,1000',
+                    help='comma-separated scenario sizes (default 10,100,1000)')
+    ap.add_argument('--stages', default=','.join(STAGES),
+                    help=f'comma-separated subset of {",".join(STAGES)}')
+    ap.add_argument('--platforms', default=','.join(PLATFORMS),
+                    help='platform option builders used by build_opts / download')
+    ap.add_argument('--media-kb', type=int, default=256, help='size of each media file')
+    ap.add_argument('--page-kb', type=int, default=0,
+                    help='pad Facebook HTML pages to this size (e.g. 3000 for ~3 MB)')
+    ap.add_argument('--latency-ms', type=float, default=0.0,
+                    help='artificial latency added to every fake-CDN response')
+    ap.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    ap.add_argument('--json', metavar='PATH', help='also write results as JSON')
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    stages = [s for s in args.stages.split(',') if s.strip()]
+    platforms = [p for p in args.platforms.split(',') if p.strip()]
+    for s in stages:
+        if s not in _STAGE_FNS:
+            ap.error(f'unknown stage: {s}')
+
+    # Keep the user's fb_tokens.json out of it
+    token_dir = tempfile.mkdtemp(prefix='tt_bench_tokens_')
+    facebook_download.token_store = fb_tokens.TokenStore(os.path.join(token_dir, 'fb_tokens.json'))
+    tiktok_download.id_cache = tt_ids.ProfileCache(os.path.join(token_dir, 'tt_ids.json'))
+
+    rows: list[dict] = []
+    with FakeCDN(media_size=args.media_kb * 1024, page_pad=args.page_kb * 1024,
+                 latency=args.latency_ms / 1000) as cdn:
+        for stage in stages:
+            for n in sizes:
+                rows.append(run_stage(stage, n, cdn, platforms, not args.no_memory))
+
+    shutil.rmtree(token_dir, ignore_errors=True)
+    _print_table(rows)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'sizes': sizes, 'platforms': platforms, 'results': rows}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
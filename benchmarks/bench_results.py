@@ -0,0 +1,162 @@
+"""
+bench_results.py
+────────────────
+Benchmark the search-result store (results_store.ResultStore) against the
+old list of result dicts, for 1 000 – 100 000 synthetic videos shaped like
+fetch_tiktok_video_list() output (a few hundred distinct uploaders).
+
+  build     append every result (store) / list.append (dicts)
+  memory    memory the built container keeps alive (tracemalloc)
+  sort      order by view_count, descending (NumPy argsort on the column
+            vs sorted() over the dicts)
+  search    rows matching "dan re" by word prefix, ordered by likes (token
+            index vs scanning every title)
+
+Usage:
+  python benchmarks/bench_results.py
+  python benchmarks/bench_results.py --sizes 10000,100000 --json results.json
+"""
+
+from __future__ import annotations
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from results_store import ResultStore, tokens       # noqa: E402
+
+UPLOADERS = 300
+QUERY = 'dan re'
+
+
+def make_results(n: int, seed: int = 1) -> list[dict]:
+    rnd = random.Random(seed)
+    words = ['dance', 'recipe', 'cat', 'trend', 'review', 'vlog', 'tutorial', 'funny',
+             'music', 'travel', 'prank', 'asmr', 'fitness', 'unboxing', 'challenge']
+    out = []
+    for i in range(n):
+        vid = 7_300_000_000_000_000_000 + i
+        user = f'creator{rnd.randrange(UPLOADERS)}'
+        out.append({
+            'url':           f'https://www.tiktok.com/@{user}/video/{vid}',
+            'title':         ' '.join(rnd.choices(words, k=rnd.randint(3, 8))) + f' #{i}',
+            'thumbnail':     f'https://p16-sign.tiktokcdn.com/obj/{vid:x}~tplv-noop.jpeg',
+            'view_count':    rnd.randrange(10_000_000),
+            'duration':      rnd.randrange(5, 600),
+            'uploader':      ''.join(user),           # a fresh string per row, like JSON
+            'like_count':    rnd.randrange(1_000_000),
+            'comment_count': rnd.randrange(50_000),
+            'repost_count':  rnd.randrange(20_000),
+            'flat':          True,
+        })
+    return out
+
+
+def _build_dicts(results: list[dict]) -> list[dict]:
+    out = []
+    for d in results:
+        d = dict(d)
+        d['platform'] = 'tiktok'
+        out.append(d)
+    return out
+
+
+def _build_store(results: list[dict]) -> ResultStore:
+    store = ResultStore()
+    for d in results:
+        store.append(d, platform='tiktok')
+    return store
+
+
+def _sort_dicts(rows: list[dict]) -> list[int]:
+    return sorted(range(len(rows)), key=lambda i: rows[i]['view_count'], reverse=True)
+
+
+def _sort_store(store: ResultStore) -> list[int]:
+    return store.query('view_count')
+
+
+def _search_dicts(rows: list[dict]) -> list[int]:
+    words = tokens(QUERY)
+    hits = []
+    for i, d in enumerate(rows):
+        have = tokens(f"{d['title']} {d['uploader']}")
+        if all(any(t.startswith(w) for t in have) for w in words):
+            hits.append(i)
+    return sorted(hits, key=lambda i: rows[i]['like_count'], reverse=True)
+
+
+def _search_store(store: ResultStore) -> list[int]:
+    return store.query('like_count', text=QUERY)
+
+
+def _timed(fn, *args, repeat: int = 3) -> tuple[float, object]:
+    best, out = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def _retained(fn, *args) -> int:
+    gc.collect()
+    tracemalloc.start()
+    keep = fn(*args)      # noqa: F841  (held until the snapshot)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def run(n: int) -> list[dict]:
+    rows = []
+    for kind, build, sort, search in (('dicts', _build_dicts, _sort_dicts, _search_dicts),
+                                      ('store', _build_store, _sort_store, _search_store)):
+        build_s, container = _timed(build, make_results(n), repeat=1)
+        # results are generated inside the traced call, so both kinds pay for their strings
+        kept = _retained(lambda: build(make_results(n)))
+        sort_s, order = _timed(sort, container)
+        search_s, hits = _timed(search, container)
+        rows.append({'n': n, 'kind': kind, 'build_s': build_s, 'kept_mb': kept / 1e6,
+                     'sort_ms': sort_s * 1000, 'search_ms': search_s * 1000,
+                     'hits': len(hits), 'check': (order[0], hits[:50])})
+    if rows[0]['check'] != rows[1]['check']:
+        raise RuntimeError(f'n={n}: store and dict results disagree')
+    for r in rows:
+        del r['check']
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes', default='1000,10000,100000')
+    ap.add_argument('--json', metavar='PATH', help='also write results as JSON')
+    args = ap.parse_args(argv)
+
+    rows = []
+    for n in (int(s) for s in args.sizes.split(',') if s.strip()):
+        rows.extend(run(n))
+
+    hdr = (f"{'n':>7} {'kind':<6} {'build s':>8} {'kept MB':>8} {'sort ms':>8} "
+           f"{'search ms':>9} {'hits':>6}")
+    print(hdr)
+    print('─' * len(hdr))
+    for r in rows:
+        print(f"{r['n']:>7} {r['kind']:<6} {r['build_s']:>8.3f} {r['kept_mb']:>8.1f} "
+              f"{r['sort_ms']:>8.2f} {r['search_ms']:>9.2f} {r['hits']:>6}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+bench_startup.py
+────────────────
+Cold-start benchmark for the GUI.
+
+Each run is a fresh interpreter (nothing cached in sys.modules):
+
+  import   time to `import tk_gui` + which heavy modules got loaded with it
+  gui      time from interpreter start to the first rendered frame of
+           App().run() (needs a display; the window closes itself)
+
+The slowest imports are listed from `python -X importtime`, so a new eager
+import of yt_dlp / numpy / PIL shows up immediately.
+
+Usage:
+  python benchmarks/bench_startup.py
+  python benchmarks/bench_startup.py --runs 10 --gui
+  python benchmarks/bench_startup.py --json startup.json
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should NOT be loaded before the window is up
+HEAVY = ('yt_dlp', 'numpy', 'PIL.Image', 'requests', 'ffmpeg',
+         'http.client', 'urllib.request')
+
+_IMPORT_PROBE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import tk_gui
+t1 = time.perf_counter()
+print(json.dumps({"import_s": t1 - t0,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+''' % (HEAVY,)
+
+_GUI_PROBE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import dearpygui.dearpygui as dpg
+import tk_gui
+t1 = time.perf_counter()
+_render = dpg.render_dearpygui_frame
+_state = {"frames": 0}
+
+def _first_frame():
+    _render()
+    _state["frames"] += 1
+    if _state["frames"] == 1:
+        print(json.dumps({"import_s": t1 - t0,
+                          "first_frame_s": time.perf_counter() - t0,
+                          "loaded": [m for m in %r if m in sys.modules]}),
+              flush=True)
+        dpg.stop_dearpygui()
+
+dpg.render_dearpygui_frame = _first_frame
+tk_gui.App().run()
+''' % (HEAVY,)
+
+
+def _probe(code: str, timeout: float) -> dict:
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                          capture_output=True, text=True, timeout=timeout)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip()
+                       else f'probe exited with {proc.returncode}')
+
+
+def slowest_imports(limit: int) -> list[tuple[str, float]]:
+    """Return the top-level imports of tk_gui with the largest cumulative time."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import tk_gui'],
+                          cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            rows.append((name.strip(), int(cumulative) / 1e6))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows[:limit]
+
+
+def _stats(values: list[float]) -> dict:
+    return {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--runs', type=int, default=5)
+    ap.add_argument('--gui', action='store_true', help='also measure time to first frame')
+    ap.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    ap.add_argument('--json', metavar='PATH', help='also write results as JSON')
+    args = ap.parse_args(argv)
+
+    result: dict = {}
+    runs = [_probe(_IMPORT_PROBE, 60) for _ in range(args.runs)]
+    result['import'] = _stats([r['import_s'] for r in runs])
+    result['loaded'] = runs[-1]['loaded']
+    print(f"import tk_gui   median {result['import']['median'] * 1000:7.1f} ms   "
+          f"(min {result['import']['min'] * 1000:.1f} / max {result['import']['max'] * 1000:.1f})")
+
+    if args.gui:
+        try:
+            gui = [_probe(_GUI_PROBE, 120) for _ in range(args.runs)]
+            result['first_frame'] = _stats([r['first_frame_s'] for r in gui])
+            result['loaded'] = gui[-1]['loaded']
+            print(f"first frame     median {result['first_frame']['median'] * 1000:7.1f} ms   "
+                  f"(min {result['first_frame']['min'] * 1000:.1f} / "
+                  f"max {result['first_frame']['max'] * 1000:.1f})")
+        except Exception as e:
+            print(f'first frame     skipped: {e}')
+
+    print('heavy modules loaded at startup:', ', '.join(result['loaded']) or 'none')
+    result['slowest'] = slowest_imports(args.top)
+    print('\nslowest top-level imports:')
+    for name, secs in result['slowest']:
+        print(f'  {secs * 1000:8.1f} ms  {name}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
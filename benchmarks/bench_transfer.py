@@ -0,0 +1,131 @@
+"""
+bench_transfer.py
+─────────────────
+Benchmark the shared transfer engine (transfer.py) against yt-dlp's
+single-stream default, per platform and file size, on the local fake CDN
+with a per-connection bandwidth cap (the situation multi-connection
+downloads are meant for).
+
+  single   the platform's opts without external downloader / chunking
+  engine   the same opts with transfer.attach(): native below
+           transfer.NATIVE_BELOW, aria2c split by size above it
+
+Without aria2c on PATH the engine stays native and both rows measure the
+same path; the table says so.  Every file is checked for its full size.
+
+Usage:
+  python benchmarks/bench_transfer.py
+  python benchmarks/bench_transfer.py --sizes-mb 1,8,32 --bandwidth-mb 2
+  python benchmarks/bench_transfer.py --platforms tiktok --json transfer.json
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+from fake_cdn import FakeCDN                    # noqa: E402
+
+import yt_dlp                                   # noqa: E402
+import transfer                                 # noqa: E402
+from bench_hotpaths import _opts_for            # noqa: E402
+
+PLATFORMS = ['tiktok', 'instagram', 'facebook']
+MODES = ['single', 'engine']
+
+
+def _opts(platform: str, mode: str, out_dir: str) -> dict:
+    opts = _opts_for(platform, out_dir)
+    opts.pop('cookiefile', None)
+    opts.pop('cookiesfrombrowser', None)
+    opts['outtmpl'] = os.path.join(out_dir, '%(id)s.%(ext)s')
+    if mode == 'single':
+        for key in ('external_downloader', 'external_downloader_args', 'http_chunk_size'):
+            opts.pop(key, None)
+    return opts
+
+
+def run_one(cdn: FakeCDN, platform: str, mode: str, size: int, files: int) -> dict:
+    out_dir = tempfile.mkdtemp(prefix=f'bench_transfer_{platform}_')
+    try:
+        hits_before = cdn.hits.get('media', 0)
+        t0 = time.perf_counter()
+        with yt_dlp.YoutubeDL(_opts(platform, mode, out_dir)) as ydl:
+            if mode == 'engine':
+                transfer.attach(ydl, platform)
+            for i in range(files):
+                name = f'{platform}_{mode}_{size}_{i}'
+                ydl.process_ie_result({
+                    'id': name, 'title': name, 'ext': 'mp4', 'protocol': 'http',
+                    'url': cdn.media_url(name, size), 'filesize': size,
+                }, download=True)
+        wall = time.perf_counter() - t0
+        got = [os.path.getsize(os.path.join(out_dir, n)) for n in os.listdir(out_dir)]
+        if len(got) != files or any(g != size for g in got):
+            raise RuntimeError(f'{platform}/{mode}: incomplete files {got}')
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    engine = mode == 'engine' and transfer.has_aria2c()
+    return {
+        'platform':    platform,
+        'mode':        mode,
+        'size_mb':     size / transfer.MiB,
+        'connections': transfer.connections_for(size, platform) if engine else 1,
+        'wall_s':      wall,
+        'mb_per_s':    size * files / wall / transfer.MiB if wall > 0 else 0.0,
+        'requests':    cdn.hits.get('media', 0) - hits_before,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes-mb', default='1,8,32', help='file sizes in MB (default 1,8,32)')
+    ap.add_argument('--platforms', default=','.join(PLATFORMS))
+    ap.add_argument('--files', type=int, default=2, help='files per size / mode')
+    ap.add_argument('--bandwidth-mb', type=float, default=4.0,
+                    help='per-connection bandwidth cap of the fake CDN (MB/s)')
+    ap.add_argument('--latency-ms', type=float, default=20.0,
+                    help='artificial latency added to every fake-CDN response')
+    ap.add_argument('--json', metavar='PATH', help='also write results as JSON')
+    args = ap.parse_args(argv)
+
+    sizes = [int(float(s) * transfer.MiB) for s in args.sizes_mb.split(',') if s.strip()]
+    platforms = [p for p in args.platforms.split(',') if p.strip()]
+
+    rows = []
+    with FakeCDN(bandwidth=int(args.bandwidth_mb * transfer.MiB),
+                 latency=args.latency_ms / 1000) as cdn:
+        for p in platforms:
+            for size in sizes:
+                for mode in MODES:
+                    rows.append(run_one(cdn, p, mode, size, args.files))
+
+    if not transfer.has_aria2c():
+        print('aria2c not found on PATH: the engine stays native (single stream).\n')
+    hdr = (f"{'platform':<10} {'MB':>6} {'mode':<7} {'conns':>5} {'wall s':>8} "
+           f"{'MB/s':>7} {'reqs':>5} {'speedup':>8}")
+    print(hdr)
+    print('─' * len(hdr))
+    for r in rows:
+        base = next(b for b in rows if b['mode'] == 'single' and b['platform'] == r['platform']
+                    and b['size_mb'] == r['size_mb'])
+        speedup = base['wall_s'] / r['wall_s'] if r['wall_s'] > 0 else 0.0
+        print(f"{r['platform']:<10} {r['size_mb']:>6.1f} {r['mode']:<7} {r['connections']:>5} "
+              f"{r['wall_s']:>8.3f} {r['mb_per_s']:>7.1f} {r['requests']:>5} {speedup:>7.2f}x")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'aria2c': transfer.has_aria2c(), 'results': rows}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
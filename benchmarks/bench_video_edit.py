@@ -0,0 +1,224 @@
+"""
+bench_video_edit.py
+───────────────────
+Reproducible benchmark for every video_edit operation.
+
+A corpus of test clips is synthesised with ffmpeg's lavfi sources
+(testsrc2 video + sine audio) over a matrix of resolutions, durations and
+codecs, then each operation is timed on each clip:
+
+  resize_video  trim_video   crop_video    extract_audio  remove_audio
+  convert_format speed_video rotate_video  merge_videos   add_logo
+
+Reported per run: wall time, encode fps (output frames / wall time),
+CPU utilisation of the ffmpeg child (user+sys / wall, can exceed 100% on
+multi-core), and output size.  The corpus is cached in --corpus so runs
+before/after an encoder change use identical inputs.
+
+Usage:
+  python benchmarks/bench_video_edit.py
+  python benchmarks/bench_video_edit.py --resolutions 1280x720 --durations 10 --ops resize,speed
+  python benchmarks/bench_video_edit.py --repeat 3 --json edit_bench.json
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import video_edit  # noqa: E402
+
+
+_CODECS: dict[str, tuple[str, list[str]]] = {
+    # name → (container ext, ffmpeg encoder args)
+    'h264': ('mp4',  ['-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+                      '-c:a', 'aac', '-b:a', '128k']),
+    'hevc': ('mp4',  ['-c:v', 'libx265', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+                      '-tag:v', 'hvc1', '-c:a', 'aac', '-b:a', '128k']),
+    'vp9':  ('webm', ['-c:v', 'libvpx-vp9', '-deadline', 'realtime', '-cpu-used', '8',
+                      '-pix_fmt', 'yuv420p', '-c:a', 'libopus', '-b:a', '96k']),
+}
+
+_FPS = 30
+_ROTATION = next(iter(video_edit.ROTATIONS))
+
+OPS = ['resize', 'trim', 'crop', 'extract_audio', 'remove_audio',
+       'convert', 'speed', 'rotate', 'merge', 'logo']
+
+
+# ── Corpus ────────────────────────────────────────────────────────────────────
+
+def _ffmpeg(args: list[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(['ffmpeg', '-hide_banner', '-nostdin', '-y', *args],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=False)
+
+
+def make_clip(corpus: str, width: int, height: int, duration: int, codec: str) -> str:
+    ext, enc = _CODECS[codec]
+    path = os.path.join(corpus, f'clip_{width}x{height}_{duration}s_{codec}.{ext}')
+    if os.path.exists(path):
+        return path
+    proc = _ffmpeg([
+        '-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={_FPS}:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=48000:duration={duration}',
+        *enc, '-shortest', path,
+    ])
+    if proc.returncode != 0:
+        raise RuntimeError(f'clip generation failed ({codec}): '
+                           + proc.stderr.decode(errors='replace')[-300:])
+    return path
+
+
+def make_logo(corpus: str) -> str:
+    path = os.path.join(corpus, 'logo.png')
+    if not os.path.exists(path):
+        proc = _ffmpeg(['-f', 'lavfi', '-i', 'color=c=red@0.6:s=240x120,format=rgba',
+                        '-frames:v', '1', path])
+        if proc.returncode != 0:
+            raise RuntimeError('logo generation failed')
+    return path
+
+
+def count_frames(path: str) -> int:
+    """Count video packets by stream-copying to the framecrc muxer (no ffprobe needed)."""
+    proc = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-nostdin', '-loglevel', 'error', '-i', path,
+         '-map', '0:v:0?', '-c', 'copy', '-f', 'framecrc', '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False)
+    return sum(1 for line in proc.stdout.splitlines() if line.startswith(b'0,'))
+
+
+# ── Operations ────────────────────────────────────────────────────────────────
+
+def run_op(op: str, clip: str, duration: int, width: int, height: int,
+           out_dir: str, logo: str) -> str:
+    ext = os.path.splitext(clip)[1]
+    out = os.path.join(out_dir, f'{op}{ext}')
+    if op == 'resize':
+        return video_edit.resize_video(clip, max(2, width // 2 // 2 * 2), -2, out)
+    if op == 'trim':
+        end = max(1, duration - 1)
+        return video_edit.trim_video(clip, '1', str(end), out)
+    if op == 'crop':
+        return video_edit.crop_video(clip, width // 2, height // 2, width // 4, height // 4, out)
+    if op == 'extract_audio':
+        return video_edit.extract_audio(clip, 'mp3', os.path.join(out_dir, 'audio.mp3'))
+    if op == 'remove_audio':
+        return video_edit.remove_audio(clip, out)
+    if op == 'convert':
+        target = 'mkv' if ext != '.mkv' else 'mp4'
+        return video_edit.convert_format(clip, target, os.path.join(out_dir, f'convert.{target}'))
+    if op == 'speed':
+        return video_edit.speed_video(clip, 2.0, out)
+    if op == 'rotate':
+        return video_edit.rotate_video(clip, _ROTATION, out)
+    if op == 'merge':
+        return video_edit.merge_videos([clip, clip], out)
+    if op == 'logo':
+        return video_edit.add_logo(clip, logo, 'Bottom-Right', output_path=out)
+    raise ValueError(op)
+
+
+def _child_cpu() -> float:
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+def measure(op: str, clip: str, duration: int, width: int, height: int,
+            logo: str, repeat: int) -> dict:
+    walls, cpus, frames, size = [], [], 0, 0
+    for _ in range(repeat):
+        out_dir = tempfile.mkdtemp(prefix='bench_edit_')
+        try:
+            cpu0 = _child_cpu()
+            t0 = time.perf_counter()
+            out = run_op(op, clip, duration, width, height, out_dir, logo)
+            wall = time.perf_counter() - t0
+            cpu = _child_cpu() - cpu0
+            walls.append(wall)
+            cpus.append(cpu)
+            size = os.path.getsize(out)
+            frames = count_frames(out) if op != 'extract_audio' else 0
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    wall = statistics.median(walls)
+    cpu = statistics.median(cpus)
+    return {
+        'op':        op,
+        'clip':      os.path.basename(clip),
+        'wall_s':    wall,
+        'fps':       frames / wall if frames and wall > 0 else 0.0,
+        'cpu_pct':   cpu / wall * 100 if wall > 0 else 0.0,
+        'frames':    frames,
+        'out_bytes': size,
+        'runs':      repeat,
+    }
+
+
+def _print_table(rows: list[dict]) -> None:
+    hdr = (f"{'op':<14} {'clip':<30} {'wall s':>8} {'fps':>8} {'cpu %':>7} "
+           f"{'frames':>7} {'out MB':>8}")
+    print(hdr)
+    print('─' * len(hdr))
+    for r in rows:
+        if 'error' in r:
+            print(f"{r['op']:<14} {r['clip']:<30} ERROR: {r['error']}")
+            continue
+        print(f"{r['op']:<14} {r['clip']:<30} {r['wall_s']:>8.2f} {r['fps']:>8.1f} "
+              f"{r['cpu_pct']:>7.0f} {r['frames']:>7} {r['out_bytes'] / 1048576:>8.2f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--resolutions', default='640x360,1280x720,1920x1080')
+    ap.add_argument('--durations', default='5,15', help='clip lengths in seconds')
+    ap.add_argument('--codecs', default='h264,hevc,vp9', help=f'subset of {",".join(_CODECS)}')
+    ap.add_argument('--ops', default=','.join(OPS), help=f'subset of {",".join(OPS)}')
+    ap.add_argument('--repeat', type=int, default=1, help='runs per measurement (median kept)')
+    ap.add_argument('--corpus', default=os.path.join(tempfile.gettempdir(), 'tt_edit_corpus'),
+                    help='directory for cached generated clips')
+    ap.add_argument('--json', metavar='PATH', help='also write results as JSON')
+    args = ap.parse_args(argv)
+
+    if not video_edit.check_ffmpeg():
+        print('ffmpeg not found on PATH', file=sys.stderr)
+        return 1
+
+    ops = [o for o in args.ops.split(',') if o]
+    for o in ops:
+        if o not in OPS:
+            ap.error(f'unknown op: {o}')
+    os.makedirs(args.corpus, exist_ok=True)
+    logo = make_logo(args.corpus)
+
+    rows: list[dict] = []
+    for res in args.resolutions.split(','):
+        width, height = (int(v) for v in res.lower().split('x'))
+        for duration in (int(d) for d in args.durations.split(',')):
+            for codec in args.codecs.split(','):
+                clip = make_clip(args.corpus, width, height, duration, codec)
+                for op in ops:
+                    try:
+                        rows.append(measure(op, clip, duration, width, height, logo, args.repeat))
+                    except Exception as e:
+                        rows.append({'op': op, 'clip': os.path.basename(clip),
+                                     'error': str(e).splitlines()[-1][:80]})
+
+    _print_table(rows)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
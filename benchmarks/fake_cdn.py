@@ -0,0 +1,362 @@
+"""
+fake_cdn.py
+───────────
+Local HTTP stand-in for TikTok / Facebook / Instagram / YouTube used by the
+benchmarks.  Nothing here talks to the real sites.
+
+Serves:
+  - Facebook profile pages (reel IDs, pagination cursor, LSD / DTSG tokens,
+    app_collection node ID, rsrc.php JS bundle links)
+  - Facebook rsrc.php JS bundles (one carries the pagination doc_id)
+  - Facebook GraphQL pagination responses (`for (;;);` prefixed)
+  - TikTok profile pages with an embedded secUid
+  - Media files of any size at /media/<name>.mp4 (HEAD + Range supported,
+    optional per-connection bandwidth cap)
+
+Absolute URLs are mapped onto the server as  http://127.0.0.1:<port>/<host>/<path>;
+route_requests() patches requests.Session so the download modules' own
+`https://www.facebook.com/...` URLs land here unchanged.
+"""
+
+from __future__ import annotations
+import base64
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+
+FB_DOC_ID   = '7654321098765432'
+FB_LSD      = 'AVqbench_lsd_token'
+FB_DTSG     = 'NAcbench_dtsg_token:1:1700000000'
+FB_QUERY    = 'ProfileCometAppCollectionReelsRendererPaginationQuery'
+TT_SEC_UID  = 'MS4wLjABAAAA' + 'b' * 64
+_JS_BUNDLES = 8           # number of rsrc.php bundles linked from each page
+_INITIAL    = 10          # reel IDs embedded in the first HTML page
+
+
+def _reel_id(n: int) -> str:
+    return str(1_000_000_000_000_000 + n)
+
+
+# ── Fixture builders (also usable without the server) ─────────────────────────
+
+def fb_profile_html(items: int, pad_bytes: int = 0, seed: int = 0) -> str:
+    """Facebook reels-tab HTML with up to _INITIAL reels and pagination state."""
+    rnd = random.Random(seed)
+    first = min(items, _INITIAL)
+    parts = ['<!DOCTYPE html><html><head>']
+    for i in range(_JS_BUNDLES):
+        parts.append(
+            f'<script>{{"src":"https://static.xx.fbcdn.net/rsrc.php/v3/y{i}/r/b{i}.js?_nc_x=1"}}</script>')
+    parts.append('</head><body><script type="application/json">')
+    parts.append('["LSD",[],{"token":"%s"},323]' % FB_LSD)
+    parts.append('["DTSGInitData",[],{"token":"%s","async_get_token":"x"},258]' % FB_DTSG)
+    node = base64.b64encode(b'app_collection:100000000000001:168684841768375:260').decode()
+    # Decoy base64 IDs that do not decode to an app_collection node
+    for j in range(20):
+        decoy = base64.b64encode(f'S:_I100000000000001:{j:06d}'.encode()).decode()
+        parts.append(f'{{"id":"{decoy}"}}')
+    parts.append(f'{{"id":"{node}","__typename":"AppCollection"}}')
+    for n in range(first):
+        rid = _reel_id(n)
+        parts.append(
+            f'{{"node":{{"video":{{"id":"{rid}"}},"url":"https:\\/\\/www.facebook.com\\/reel\\/{rid}\\/",'
+            f'"creation_time":{1_700_000_000 - n * 3600}}}}}')
+    has_next = 'true' if items > first else 'false'
+    parts.append(f'{{"page_info":{{"end_cursor":"cursor_{first}","has_next_page":{has_next}}}}}')
+    body = ''.join(parts)
+    if pad_bytes > len(body):
+        filler = []
+        size = len(body)
+        while size < pad_bytes:
+            chunk = ('{"__bbox":{"require":[["ScheduledServerJS","handle",null,[{"x":"%s"}]]]}}'
+                     % ''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(200)))
+            filler.append(chunk)
+            size += len(chunk)
+        body += '</script><script>' + ''.join(filler)
+    return body + '</script></body></html>'
+
+
+def fb_js_bundle(index: int, size: int = 200_000) -> str:
+    """A rsrc.php bundle; the last one defines the pagination query doc_id."""
+    head = f'__d("Bundle{index}",[],function(){{}});'
+    pad = '/*' + 'x' * max(0, size - 200) + '*/'
+    if index == _JS_BUNDLES - 1:
+        return (head + pad + f'__d("{FB_QUERY}_facebookRelayOperation",[],'
+                f'(function(a,b,c,d,e,f){{e.exports="{FB_DOC_ID}"}}),null);')
+    return head + pad
+
+
+def fb_graphql_page(cursor: str | None, count: int, items: int) -> str:
+    """GraphQL pagination response for the reels collection."""
+    start = int(cursor.split('_')[1]) if cursor and cursor.startswith('cursor_') else 0
+    end = min(items, start + count)
+    edges = []
+    for n in range(start, end):
+        rid = _reel_id(n)
+        edges.append({
+            'node': {
+                'video': {'id': rid},
+                'url': f'https://www.facebook.com/reel/{rid}/',
+                'creation_time': 1_700_000_000 - n * 3600,
+            },
+        })
+    payload = {
+        'data': {'node': {'aggregated_fb_shorts': {
+            'edges': edges,
+            'page_info': {'end_cursor': f'cursor_{end}', 'has_next_page': end < items},
+        }}},
+    }
+    # Facebook escapes slashes in JSON; the scraper's regexes expect that form
+    return 'for (;;);' + json.dumps(payload).replace('/', '\\/')
+
+
+def tt_profile_html(user: str) -> str:
+    data = {'__DEFAULT_SCOPE__': {'webapp.user-detail': {'userInfo': {
+        'user': {'uniqueId': user, 'secUid': TT_SEC_UID},
+    }}}}
+    return ('<html><head></head><body><script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" '
+            f'type="application/json">{json.dumps(data)}</script></body></html>')
+
+
+def ytdlp_playlist_info(items: int, platform: str = 'tiktok') -> dict:
+    """Info dict shaped like yt-dlp's output for a profile with *items* videos."""
+    entries = []
+    for n in range(items):
+        vid = _reel_id(n)
+        entries.append({
+            'id': vid,
+            'url': f'https://www.{platform}.com/@bench/video/{vid}',
+            'webpage_url': f'https://www.{platform}.com/@bench/video/{vid}',
+            'title': f'Benchmark clip #{n} ' + 'lorem ipsum ' * 4,
+            'thumbnails': [{'url': f'https://p16.example/{vid}_{k}.jpg', 'width': 100 * k}
+                           for k in range(1, 5)],
+            'view_count': 1000 + n * 37,
+            'like_count': 100 + n,
+            'comment_count': n % 50,
+            'repost_count': n % 7,
+            'duration': 15 + n % 60,
+            'uploader': 'bench_user',
+            'formats': [{'format_id': f'f{k}', 'url': f'https://v16.example/{vid}/{k}.mp4',
+                         'height': 360 * k, 'tbr': 500 * k} for k in range(1, 4)],
+        })
+    return {'_type': 'playlist', 'id': 'bench', 'title': 'bench', 'entries': entries}
+
+
+def media_bytes(start: int, end: int) -> bytes:
+    """Deterministic payload bytes [start, end)."""
+    block = bytes(range(256)) * 256     # 64 KiB pattern
+    out = bytearray()
+    pos = start
+    while pos < end:
+        off = pos % len(block)
+        take = min(len(block) - off, end - pos)
+        out += block[off:off + take]
+        pos += take
+    return bytes(out)
+
+
+# ── Server ────────────────────────────────────────────────────────────────────
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass   # clients (yt-dlp, aria2c) drop connections mid-transfer on purpose
+
+
+class FakeCDN:
+    """Threaded local server.  Use as a context manager.
+
+    items:        videos per Facebook profile
+    page_pad:     pad Facebook HTML pages to this many bytes
+    media_size:   default size of /media/* files (bytes)
+    bandwidth:    per-connection cap in bytes/s (None = unlimited)
+    latency:      seconds added before every response
+    """
+
+    def __init__(self, items: int = 100, page_pad: int = 0,
+                 media_size: int = 256 * 1024, bandwidth: int | None = None,
+                 latency: float = 0.0):
+        self.items = items
+        self.page_pad = page_pad
+        self.media_size = media_size
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.hits: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._html_cache: dict[tuple, str] = {}
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def url(self, absolute: str) -> str:
+        """Map https://host/path onto this server."""
+        parts = urlsplit(absolute)
+        q = f'?{parts.query}' if parts.query else ''
+        return f'{self.base}/{parts.netloc}{parts.path}{q}'
+
+    def media_url(self, name: str, size: int | None = None) -> str:
+        q = f'?size={size}' if size else ''
+        return f'{self.base}/media/{name}.mp4{q}'
+
+    def __enter__(self) -> 'FakeCDN':
+        cdn = self
+
+        class Handler(_Handler):
+            server_cdn = cdn
+
+        self._server = _QuietServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+
+    def _profile_html(self) -> str:
+        key = (self.items, self.page_pad)
+        html = self._html_cache.get(key)
+        if html is None:
+            html = fb_profile_html(self.items, self.page_pad)
+            self._html_cache[key] = html
+        return html
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_cdn: FakeCDN
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):   # keep benchmark output clean
+        pass
+
+    # ── dispatch ─────────────────────────────────────────────────────────────
+    def do_HEAD(self):
+        self._dispatch(head=True)
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8', errors='replace')
+        cdn = self.server_cdn
+        if cdn.latency:
+            time.sleep(cdn.latency)
+        if self.path.startswith('/www.facebook.com/api/graphql'):
+            cdn._count('fb_graphql')
+            form = parse_qs(body)
+            if form.get('doc_id', [''])[0] != FB_DOC_ID:
+                return self._send(200, b'for (;;);{"errors":[{"message":"unknown doc_id"}]}',
+                                  'application/json')
+            variables = json.loads(form.get('variables', ['{}'])[0])
+            text = fb_graphql_page(variables.get('cursor'), int(variables.get('count', 24)), cdn.items)
+            return self._send(200, text.encode(), 'application/json')
+        self._send(404, b'not found', 'text/plain')
+
+    def _dispatch(self, head: bool = False):
+        cdn = self.server_cdn
+        if cdn.latency:
+            time.sleep(cdn.latency)
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path.startswith('/media/'):
+            cdn._count('media')
+            size = int(parse_qs(parts.query).get('size', [cdn.media_size])[0])
+            return self._send_media(size, head)
+        if path.startswith('/static.xx.fbcdn.net/') and 'rsrc.php' in path:
+            cdn._count('fb_js')
+            m = re.search(r'/b(\d+)\.js', path)
+            text = fb_js_bundle(int(m.group(1)) if m else 0)
+            return self._send(200, text.encode(), 'application/javascript', head)
+        if path.startswith('/www.facebook.com/'):
+            cdn._count('fb_page')
+            return self._send(200, cdn._profile_html().encode(), 'text/html', head)
+        if path.startswith('/www.tiktok.com/@'):
+            cdn._count('tt_page')
+            user = path.split('@', 1)[1].split('/')[0]
+            return self._send(200, tt_profile_html(user).encode(), 'text/html', head)
+        self._send(404, b'not found', 'text/plain', head)
+
+    # ── responses ────────────────────────────────────────────────────────────
+    def _send(self, code: int, body: bytes, ctype: str, head: bool = False):
+        self.send_response(code)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _send_media(self, size: int, head: bool):
+        start, end = 0, size
+        rng = self.headers.get('Range')
+        m = re.match(r'bytes=(\d*)-(\d*)', rng or '')
+        if m:
+            if m.group(1):
+                start = int(m.group(1))
+                if m.group(2):
+                    end = min(size, int(m.group(2)) + 1)
+            elif m.group(2):
+                start = max(0, size - int(m.group(2)))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end - 1}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start))
+        self.end_headers()
+        if head:
+            return
+        bw = self.server_cdn.bandwidth
+        chunk = 64 * 1024
+        pos = start
+        t0 = time.perf_counter()
+        try:
+            while pos < end:
+                n = min(chunk, end - pos)
+                self.wfile.write(media_bytes(pos, pos + n))
+                pos += n
+                if bw:
+                    ahead = (pos - start) / bw - (time.perf_counter() - t0)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+# ── Route the download modules' requests.Session traffic here ─────────────────
+
+@contextmanager
+def route_requests(cdn: FakeCDN):
+    """Patch requests.Session so absolute URLs are served by *cdn*."""
+    original = requests.Session
+
+    class _RoutedSession(original):
+        def request(self, method, url, *args, **kwargs):
+            if url.startswith('https://'):
+                url = cdn.url(url)
+            return super().request(method, url, *args, **kwargs)
+
+    requests.Session = _RoutedSession
+    try:
+        yield
+    finally:
+        requests.Session = original
@@ -42,6 +42,12 @@ a = Analysis(
         'PIL',
         'PIL.Image',
         'numpy',
+        # ← nạp trễ qua lazy_import.lazy_module(), PyInstaller không tự thấy
+        'requests',
+        'ffmpeg',
+        'urllib.request',
+        'http.cookiejar',
+        'http.server',
     ],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,333 @@
+"""
+concurrency.py
+──────────────
+Adaptive (AIMD) concurrency control for downloads.
+
+One controller per platform tunes two knobs from what it observes:
+  - workers:    how many videos download at the same time
+  - fragments:  yt-dlp `concurrent_fragment_downloads` for each new download
+
+Behaviour:
+  ✓ Additive increase while aggregate throughput keeps rising
+  ✓ Step back after throughput plateaus for a few windows
+  ✓ Multiplicative decrease on HTTP 429 / 403 and timeouts
+  ✓ Every decision is reported through log_fn and kept in `decisions`
+
+Feed a controller by adding `controller.observe` to yt-dlp's progress_hooks
+and `controller.logger()` as the yt-dlp logger (it spots retry / error lines).
+
+MultiProgress folds the progress of several concurrent downloads into one
+stream for the GUI's single progress bar.
+"""
+
+from __future__ import annotations
+import sys
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable
+
+
+# ── Per-platform starting points (workers, fragments) ──────────────────────────
+_DEFAULTS: dict[str, tuple[int, int]] = {
+    'youtube':   (3, 8),
+    'tiktok':    (1, 4),
+    'facebook':  (1, 8),
+    'instagram': (1, 8),
+}
+
+MIN_WORKERS   = 1
+MAX_WORKERS   = 8
+MIN_FRAGMENTS = 1
+MAX_FRAGMENTS = 16
+
+# Messages that mean "the server wants us to slow down"
+_THROTTLE_MARKERS = (
+    'http error 429', 'too many requests',
+    'http error 403', 'forbidden',
+    'timed out', 'timeout',
+)
+
+
+def is_throttle_error(message: str) -> bool:
+    """Return True if *message* looks like a 429 / 403 / timeout error."""
+    text = message.lower()
+    return any(marker in text for marker in _THROTTLE_MARKERS)
+
+
+class AdaptiveConcurrency:
+    """AIMD controller for one platform.
+
+    Thread-safe: download threads call observe() / record_error() while the
+    scheduler holds slots via slot().
+    """
+
+    def __init__(self, platform: str, workers: int = 3, fragments: int = 8,
+                 window: float = 5.0, gain: float = 0.05,
+                 plateau_windows: int = 3, cooldown: float = 10.0,
+                 log_fn: Callable | None = None):
+        self.platform        = platform
+        self.window          = window            # seconds per throughput sample
+        self.gain            = gain              # min relative gain counted as "rising"
+        self.plateau_windows = plateau_windows   # flat windows before stepping back
+        self.cooldown        = cooldown          # ignore repeat errors for N seconds
+        self.log_fn          = log_fn
+        self.decisions: deque[dict] = deque(maxlen=200)
+
+        self._workers   = max(MIN_WORKERS, min(MAX_WORKERS, workers))
+        self._fragments = max(MIN_FRAGMENTS, min(MAX_FRAGMENTS, fragments))
+        self._cond      = threading.Condition()
+        self._active    = 0
+
+        self._bytes_seen: dict[str, int] = {}   # filename → downloaded_bytes
+        self._window_bytes  = 0
+        self._window_start  = time.monotonic()
+        self._last_rate: float | None = None
+        self._plateau       = 0
+        self._last_backoff  = 0.0
+
+    # ── Knobs ────────────────────────────────────────────────────────────────
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def fragments(self) -> int:
+        return self._fragments
+
+    @property
+    def rate(self) -> float:
+        """Throughput (bytes/s) measured over the last full window."""
+        return self._last_rate or 0.0
+
+    # ── Worker slots ─────────────────────────────────────────────────────────
+    @contextmanager
+    def slot(self):
+        """Block until fewer than `workers` downloads are active, then hold a slot."""
+        with self._cond:
+            while self._active >= self._workers:
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    # ── Signals ──────────────────────────────────────────────────────────────
+    def observe(self, d: dict) -> None:
+        """yt-dlp progress hook: accumulate transferred bytes."""
+        status = d.get('status')
+        key = d.get('filename') or d.get('tmpfilename') or ''
+        with self._cond:
+            if status == 'downloading':
+                done = d.get('downloaded_bytes') or 0
+                prev = self._bytes_seen.get(key, 0)
+                if done > prev:
+                    self._window_bytes += done - prev
+                self._bytes_seen[key] = done
+            elif status in ('finished', 'error'):
+                self._bytes_seen.pop(key, None)
+            self._maybe_evaluate(time.monotonic())
+
+    def record_error(self, message: str) -> None:
+        """Back off multiplicatively if *message* is a throttling error."""
+        if not is_throttle_error(message):
+            return
+        now = time.monotonic()
+        with self._cond:
+            if now - self._last_backoff < self.cooldown:
+                return
+            self._last_backoff = now
+            reason = message.strip().splitlines()[0][:80] if message.strip() else 'error'
+            self._set(max(MIN_WORKERS, self._workers // 2),
+                      max(MIN_FRAGMENTS, self._fragments // 2),
+                      f'backoff: {reason}')
+            self._last_rate = None
+            self._plateau = 0
+
+    def logger(self, inner=None) -> '_SignalLogger':
+        """Return a yt-dlp logger that reports throttling to this controller."""
+        return _SignalLogger(self, inner)
+
+    # ── AIMD core (caller holds self._cond) ──────────────────────────────────
+    def _maybe_evaluate(self, now: float) -> None:
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+        rate = self._window_bytes / elapsed
+        self._window_bytes = 0
+        self._window_start = now
+        if elapsed > self.window * 3:
+            # Long idle gap — the sample says nothing about concurrency
+            self._last_rate = None
+            return
+
+        prev = self._last_rate
+        self._last_rate = rate
+        if prev is None or now - self._last_backoff < self.cooldown:
+            return
+
+        if rate > prev * (1 + self.gain):
+            self._plateau = 0
+            self._set(min(MAX_WORKERS, self._workers + 1),
+                      min(MAX_FRAGMENTS, self._fragments + 2),
+                      f'rising {_fmt_rate(prev)} → {_fmt_rate(rate)}')
+        else:
+            self._plateau += 1
+            if self._plateau >= self.plateau_windows:
+                self._plateau = 0
+                self._set(max(MIN_WORKERS, self._workers - 1),
+                          max(MIN_FRAGMENTS, self._fragments - 2),
+                          f'plateau at {_fmt_rate(rate)}')
+
+    def _set(self, workers: int, fragments: int, reason: str) -> None:
+        if workers == self._workers and fragments == self._fragments:
+            return
+        entry = {
+            'time':      time.time(),
+            'platform':  self.platform,
+            'workers':   (self._workers, workers),
+            'fragments': (self._fragments, fragments),
+            'rate':      self._last_rate or 0.0,
+            'reason':    reason,
+        }
+        self.decisions.append(entry)
+        self._workers, self._fragments = workers, fragments
+        self._cond.notify_all()
+        if self.log_fn:
+            try:
+                self.log_fn(
+                    f'[AIMD {self.platform}] workers {entry["workers"][0]}→{workers} | '
+                    f'N {entry["fragments"][0]}→{fragments} | {reason}',
+                    'info',
+                )
+            except Exception:
+                pass
+
+
+class _SignalLogger:
+    """yt-dlp logger that forwards to *inner* and feeds throttling signals.
+
+    Without *inner* it mirrors a quiet yt-dlp: debug / warnings are dropped
+    and errors still go to stderr.
+    """
+
+    def __init__(self, controller: AdaptiveConcurrency, inner=None):
+        self._ctl = controller
+        self._inner = inner
+
+    def debug(self, msg):
+        # Retry notices ("[download] Got error: HTTP Error 429 …") arrive here
+        if 'Got error' in msg:
+            self._ctl.record_error(msg)
+        if self._inner:
+            self._inner.debug(msg)
+
+    def info(self, msg):
+        if self._inner:
+            self._inner.info(msg)
+
+    def warning(self, msg):
+        self._ctl.record_error(msg)
+        if self._inner:
+            self._inner.warning(msg)
+
+    def error(self, msg):
+        self._ctl.record_error(msg)
+        if self._inner:
+            self._inner.error(msg)
+        else:
+            print(msg, file=sys.stderr)
+
+
+def _fmt_rate(rate: float) -> str:
+    return f'{rate / (1024 * 1024):.2f} MiB/s'
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if n < 1024 or unit == 'GiB':
+            return f'{n:.2f}{unit}'
+        n /= 1024
+
+
+def _fmt_eta(seconds: float) -> str:
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f'{h}:{m:02d}:{s:02d}' if h else f'{m:02d}:{s:02d}'
+
+
+# ── Combined progress for concurrent downloads ────────────────────────────────
+class MultiProgress:
+    """Fold the progress of concurrent downloads into one yt-dlp style dict.
+
+    Each worker reports through its own feed(); 'downloading' events are
+    summed over every worker with a file in flight, 'finished' events are
+    passed through as they are.
+    """
+
+    def __init__(self, hook: Callable):
+        self._hook  = hook
+        self._lock  = threading.Lock()
+        self._files: dict[int, tuple[int, int, float]] = {}   # worker → (done, total, speed)
+
+    def feed(self, worker: int) -> Callable[[dict], None]:
+        return lambda d: self._update(worker, d)
+
+    def clear(self, worker: int) -> None:
+        """Forget *worker*'s file (its attempt ended, possibly without 'finished')."""
+        with self._lock:
+            self._files.pop(worker, None)
+
+    def _update(self, worker: int, d: dict) -> None:
+        if d.get('status') != 'downloading':
+            self.clear(worker)
+            self._hook(d)
+            return
+        with self._lock:
+            self._files[worker] = (d.get('downloaded_bytes') or 0,
+                                   d.get('total_bytes') or d.get('total_bytes_estimate') or 0,
+                                   d.get('speed') or 0.0)
+            done   = sum(f[0] for f in self._files.values())
+            total  = sum(f[1] for f in self._files.values())
+            speed  = sum(f[2] for f in self._files.values())
+            active = len(self._files)
+        agg = {
+            'status':           'downloading',
+            'filename':         d.get('filename'),
+            'downloaded_bytes': done,
+            'total_bytes':      total or None,
+            'speed':            speed or None,
+            '_total_bytes_str': _fmt_bytes(total) if total else '~',
+            '_speed_str':       f'{_fmt_bytes(speed)}/s' if speed else '',
+            'active':           active,
+        }
+        if total:
+            agg['_percent_str'] = f'{done / total * 100:5.1f}%'
+            if speed:
+                agg['_eta_str'] = _fmt_eta(max(0, total - done) / speed)
+        self._hook(agg)
+
+
+# ── Registry ─────────────────────────────────────────────────────────────────
+_controllers: dict[str, AdaptiveConcurrency] = {}
+_registry_lock = threading.Lock()
+
+
+def get_controller(platform: str, log_fn: Callable | None = None) -> AdaptiveConcurrency:
+    """Return the process-wide controller for *platform* (created on first use).
+
+    If *log_fn* is given it replaces the controller's current log callback.
+    """
+    with _registry_lock:
+        ctl = _controllers.get(platform)
+        if ctl is None:
+            workers, fragments = _DEFAULTS.get(platform, (1, 8))
+            ctl = AdaptiveConcurrency(platform, workers, fragments)
+            _controllers[platform] = ctl
+    if log_fn is not None:
+        ctl.log_fn = log_fn
+    return ctl
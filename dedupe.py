@@ -0,0 +1,421 @@
+"""
+dedupe.py
+─────────
+Content fingerprints for the download library, so a clip reposted to
+TikTok, Instagram Reels and Facebook Reels is kept on disk once.
+
+Each video gets a fingerprint:
+
+  hash      blake2b of the file (byte-identical copies)
+  duration  seconds
+  frames    64-bit difference hashes (dHash) of SAMPLES frames taken at
+            evenly spaced points, all grabbed by one ffmpeg call; re-encodes
+            of the same clip (other resolution / bitrate / container) stay
+            within HASH_DISTANCE bits of each other
+
+Two videos are duplicates when their hashes are equal, or when all SAMPLES
+frames were hashed for both, their durations agree, every pair of frames
+is within HASH_DISTANCE bits and at least half of the pairs carry detail.
+A near-uniform frame (a solid colour, a title card) hashes to almost all
+0 bits whatever its colour, so it is no evidence either way.
+
+Fingerprints live in .fingerprints.json at the library root (keyed by path
+relative to it, re-computed when size / mtime change; FingerprintIndex).  Downloads consult
+it through a yt-dlp post-processor: a finished file that is a byte-identical
+copy of one already in the library is replaced by a hard link to it
+(MODE = 'link'), or removed (MODE = 'skip'); a same-content match that is
+not byte-identical is only reported.  dedupe_library() also resolves
+those for the files already there, after a 'report' pass to review.
+
+    dedupe.attach(ydl, out_dir, log_fn)          # before ydl.download()
+    dedupe.dedupe_library('downloads', 'link')   # → (duplicates, bytes freed)
+    python dedupe.py downloads --dry-run
+"""
+
+from __future__ import annotations
+import argparse
+import bisect
+import functools
+import hashlib
+import os
+import re
+import subprocess
+import sys
+from typing import Callable
+
+import json_store
+import video_edit
+from lazy_import import lazy_module
+
+ffmpeg = lazy_module('ffmpeg')
+
+VIDEO_EXTS    = ('.mp4', '.mkv', '.avi', '.mov', '.webm', '.flv')
+MODE          = 'link'      # 'link' | 'skip' | 'off' — what downloads do with an identical copy
+SAMPLES       = 8           # frames hashed per video
+HASH_DISTANCE = 10          # differing bits (of 64) still counted as the same frame
+MIN_DETAIL    = 12          # set (and unset) bits a frame hash needs to count as evidence
+DURATION_TOL  = 0.05        # relative duration difference allowed (at least 1 s)
+
+_HASH_W, _HASH_H = 9, 8     # dHash grid: 9×8 grey pixels → 8×8 comparisons
+_DURATION_RE = re.compile(rb'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)')
+
+
+# ── Fingerprints ──────────────────────────────────────────────────────────────
+
+def file_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def frame_hashes(path: str, duration: float, samples: int = SAMPLES) -> list[int]:
+    """dHashes of *samples* frames spread over *duration* seconds ([] without ffmpeg)."""
+    if duration <= 0 or not video_edit.check_ffmpeg():
+        return []
+    streams = [
+        ffmpeg.input(path, ss=f'{duration * (i + 0.5) / samples:.3f}', t=1)   # decode ≤ 1 s per sample
+        .video.trim(end_frame=1)
+        .filter('scale', _HASH_W, _HASH_H, flags='area')
+        .filter('setsar', 1)
+        for i in range(samples)
+    ]
+    cmd = ffmpeg.compile(
+        ffmpeg.concat(*streams, v=1, a=0)
+        .output('pipe:', format='rawvideo', pix_fmt='gray', fps_mode='passthrough',
+                loglevel='error'))
+    raw = _ffmpeg_output(cmd).stdout
+    size = _HASH_W * _HASH_H
+    return [_dhash(raw[i:i + size]) for i in range(0, len(raw) - size + 1, size)]
+
+
+def _ffmpeg_output(cmd: list[str]) -> subprocess.CompletedProcess:
+    kwargs: dict = {'capture_output': True, 'stdin': subprocess.DEVNULL}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
+    try:
+        return subprocess.run(cmd, timeout=120, **kwargs)
+    except (OSError, subprocess.SubprocessError):
+        return subprocess.CompletedProcess(cmd, -1, b'', b'')
+
+
+def duration_of(path: str) -> float:
+    """Duration via ffprobe, falling back to the header ffmpeg prints."""
+    duration = video_edit.get_duration(path)
+    if duration <= 0 and video_edit.check_ffmpeg():
+        m = _DURATION_RE.search(_ffmpeg_output(['ffmpeg', '-hide_banner', '-i', path]).stderr)
+        if m:
+            h, mi, sec = m.groups()
+            duration = int(h) * 3600 + int(mi) * 60 + float(sec)
+    return duration
+
+
+def _dhash(px: bytes) -> int:
+    bits = 0
+    for y in range(_HASH_H):
+        row = px[y * _HASH_W:(y + 1) * _HASH_W]
+        for x in range(_HASH_W - 1):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    return bits
+
+
+def fingerprint(path: str, duration: float | None = None) -> dict:
+    """Fingerprint of one video; *duration* (e.g. from the info dict) skips a probe."""
+    st = os.stat(path)
+    if not duration:
+        duration = duration_of(path)
+    return {
+        'size':     st.st_size,
+        'mtime':    st.st_mtime,
+        'hash':     file_hash(path),
+        'duration': round(float(duration or 0), 2),
+        'frames':   frame_hashes(path, float(duration or 0)),
+    }
+
+
+def _duration_slack(duration: float) -> float:
+    return max(1.0, DURATION_TOL * duration)
+
+
+def _has_detail(frame: int) -> bool:
+    return MIN_DETAIL <= frame.bit_count() <= 64 - MIN_DETAIL
+
+
+def same_content(a: dict, b: dict) -> bool:
+    if a['hash'] == b['hash']:
+        return True
+    fa, fb = a.get('frames') or [], b.get('frames') or []
+    if len(fa) != SAMPLES or len(fb) != SAMPLES:
+        return False
+    da, db = a.get('duration') or 0, b.get('duration') or 0
+    if abs(da - db) > _duration_slack(max(da, db)):
+        return False
+    detailed = 0
+    for x, y in zip(fa, fb):
+        if (x ^ y).bit_count() > HASH_DISTANCE:
+            return False
+        detailed += _has_detail(x) and _has_detail(y)
+    return detailed >= SAMPLES // 2
+
+
+# ── Library index ─────────────────────────────────────────────────────────────
+
+class FingerprintIndex(json_store.LibraryStore):
+    """JSON-file backed relative path → fingerprint for one library root
+    (thread-safe, loaded on first use)."""
+
+    FILENAME = '.fingerprints.json'
+    indent = None                   # thousands of entries: keep the file compact
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self._dirty = False
+
+    def fingerprint(self, path: str, duration: float | None = None) -> dict:
+        """Cached fingerprint of *path*, re-computed if the file changed."""
+        rel = self._rel(path)
+        st = os.stat(path)
+        with self._lock:
+            fp = self._load().get(rel)
+        if fp and fp.get('size') == st.st_size and fp.get('mtime') == st.st_mtime:
+            return fp
+        return fingerprint(path, duration)
+
+    def claim(self, path: str, fp: dict) -> tuple[str | None, bool]:
+        """Record *path* unless an indexed file is a byte-identical copy.
+
+        Returns (absolute path of an indexed file with the same content or
+        None, whether it is byte-identical); an identical *path* is a
+        duplicate and not recorded.
+        """
+        rel = self._rel(path)
+        similar = None
+        with self._lock:
+            data = self._load()
+            for other, ofp in list(data.items()):
+                if other == rel or not same_content(fp, ofp):
+                    continue
+                other_abs = self._abs(other)
+                if not os.path.isfile(other_abs):
+                    del data[other]             # stale entry: file was removed
+                elif ofp['hash'] == fp['hash']:
+                    return other_abs, True
+                elif similar is None:
+                    similar = other_abs
+            data[rel] = fp
+            self._save(data)
+        return similar, False
+
+    def put(self, path: str, fp: dict) -> None:
+        """Record *path* in memory; flush() writes the file."""
+        with self._lock:
+            self._load()[self._rel(path)] = fp
+            self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._save(self._data)
+
+    def files(self) -> list[str]:
+        """Video files under the root (index file and partial downloads excluded)."""
+        out = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.lower().endswith(VIDEO_EXTS):
+                    out.append(os.path.join(dirpath, name))
+        return sorted(out)
+
+    def prune(self) -> None:
+        """Forget entries whose file no longer exists."""
+        with self._lock:
+            data = self._load()
+            gone = [rel for rel in data if not os.path.isfile(self._abs(rel))]
+            for rel in gone:
+                del data[rel]
+            if gone or self._dirty:
+                self._save(data)
+
+    def _save(self, data: dict) -> bool:
+        if super()._save(data):
+            self._dirty = False
+            return True
+        return False
+
+
+def index_for(root: str) -> FingerprintIndex:
+    """The shared index of library *root* (one per directory per process)."""
+    return json_store.shared(FingerprintIndex, root)
+
+
+def replace_with_link(dup: str, original: str) -> bool:
+    """Make *dup* a hard link to *original* (same data, one copy on disk)."""
+    tmp = dup + '.dedupe'
+    try:
+        os.link(original, tmp)
+        os.replace(tmp, dup)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+
+
+def _resolve(dup: str, original: str, mode: str) -> bool:
+    """Apply *mode* to a duplicate; True if its disk space was given back."""
+    if mode == 'link':
+        return replace_with_link(dup, original)
+    if mode in ('skip', 'delete'):
+        try:
+            os.remove(dup)
+            return True
+        except OSError:
+            return False
+    return False
+
+
+# ── Download pipeline ─────────────────────────────────────────────────────────
+
+@functools.lru_cache(maxsize=None)
+def _pp_class():
+    from yt_dlp.postprocessor.common import PostProcessor
+
+    class DedupePP(PostProcessor):
+        """Check each finished file against the library's fingerprint index:
+        resolve byte-identical copies, report same-content ones."""
+
+        def __init__(self, index: FingerprintIndex, mode: str, log_fn: Callable | None):
+            super().__init__(None)
+            self._index = index
+            self._mode = mode
+            self._log = log_fn
+
+        def run(self, info):
+            path = info.get('filepath')
+            if not path or not path.lower().endswith(VIDEO_EXTS) or not os.path.isfile(path):
+                return [], info
+            try:
+                fp = fingerprint(path, info.get('duration'))
+                original, identical = self._index.claim(path, fp)
+            except Exception as e:
+                self.report_warning(f'dedupe: {e}')
+                return [], info
+            if original and not os.path.samefile(original, path):
+                name = os.path.relpath(original, self._index.root)
+                if not identical:
+                    self._note(f'Có thể trùng với {name} (cùng khung hình) — giữ cả hai, '
+                               f'kiểm tra bằng "Lọc trùng"')
+                elif _resolve(path, original, self._mode):
+                    if self._mode != 'link':
+                        info['filepath'] = original
+                    self._note(f'Trùng với {name} — '
+                               f'{"đã liên kết" if self._mode == "link" else "bỏ qua"}'
+                               f' ({fp["size"] / 1048576:.1f} MB)')
+                else:
+                    self._note(f'Trùng với {name} (không liên kết được, giữ bản mới)')
+            return [], info
+
+        def _note(self, msg: str) -> None:
+            if self._log:
+                self._log(f'[Dedupe] {msg}', 'info')
+            else:
+                self.to_screen(msg)
+
+    return DedupePP
+
+
+def attach(ydl, root: str, log_fn: Callable | None = None, mode: str | None = None):
+    """Check *ydl*'s finished downloads against the fingerprint index of *root*."""
+    mode = mode or MODE
+    if mode != 'off':
+        ydl.add_post_processor(_pp_class()(index_for(root), mode, log_fn), when='after_move')
+    return ydl
+
+
+# ── Existing library ──────────────────────────────────────────────────────────
+
+def dedupe_library(root: str, mode: str = 'link',
+                   log_fn: Callable | None = None) -> tuple[int, int]:
+    """Fingerprint every video under *root* and resolve duplicates.
+
+    The oldest file of each group is kept; the others are hard-linked to it
+    ('link'), deleted ('delete') or only reported ('report').
+
+    Returns: (duplicates found, bytes freed — for 'report', the bytes the
+    other modes would free)
+    """
+    index = index_for(root)
+    index.prune()
+    files = index.files()
+    fps: list[tuple[str, dict]] = []
+    for n, path in enumerate(files, 1):
+        try:
+            fp = index.fingerprint(path)
+        except OSError:
+            continue
+        index.put(path, fp)
+        fps.append((path, fp))
+        if n % 25 == 0:
+            index.flush()
+            if log_fn:
+                log_fn(f'[Dedupe] Đã quét {n}/{len(files)} file...', 'info')
+    index.flush()
+
+    # Oldest first, so each file is only compared with the ones kept before
+    # it: byte-identical ones by hash, the rest within the duration window
+    fps.sort(key=lambda item: item[1]['mtime'])
+    by_hash: dict[str, str] = {}
+    by_duration: list[tuple[float, int]] = []       # sorted (duration, kept index)
+    kept: list[tuple[str, dict]] = []
+    found = freed = 0
+    for path, fp in fps:
+        original = by_hash.get(fp['hash'])
+        identical = original is not None
+        if original is None:
+            d = fp['duration']
+            lo = bisect.bisect_left(by_duration, (d - _duration_slack(d) * 1.1, -1))
+            for kd, k in by_duration[lo:]:
+                if kd > d + _duration_slack(d) * 1.1:
+                    break
+                if same_content(fp, kept[k][1]):
+                    original = kept[k][0]
+                    break
+        if original is None:
+            by_hash[fp['hash']] = path
+            bisect.insort(by_duration, (fp['duration'], len(kept)))
+            kept.append((path, fp))
+            continue
+        if os.path.samefile(original, path):
+            continue                            # already linked
+        found += 1
+        if log_fn:
+            log_fn(f'[Dedupe] {os.path.relpath(path, index.root)} trùng với '
+                   f'{os.path.relpath(original, index.root)} '
+                   f'({"giống hệt" if identical else "cùng khung hình"})', 'info')
+        if mode == 'report' or _resolve(path, original, mode):
+            freed += fp['size']
+    index.prune()
+    return found, freed
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description='Find videos with the same content in a '
+                                             'download library.')
+    ap.add_argument('root', nargs='?', default='downloads')
+    group = ap.add_mutually_exclusive_group()
+    group.add_argument('--delete', action='store_true',
+                       help='delete duplicates instead of hard-linking them')
+    group.add_argument('--dry-run', action='store_true', help='only list duplicates')
+    args = ap.parse_args(argv)
+    mode = 'report' if args.dry_run else 'delete' if args.delete else 'link'
+    found, freed = dedupe_library(args.root, mode, lambda msg, _tag: print(msg))
+    print(f'{found} duplicate(s), {freed / 1048576:.1f} MB '
+          f'{"to free" if args.dry_run else "freed"}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,7 @@ Facebook video download helpers using yt-dlp.
 Supports:
   - Single video / reel / watch URL
   - Profile / reels / videos page (scrapes video URLs from HTML)
+  - Many profile pages at once (scrape_facebook_profiles, concurrent)
   - Video list fetching (metadata preview)
 
 Quality: best available (bestvideo+bestaudio merged to mp4)
@@ -18,16 +19,32 @@ import re
 import io
 import sys
 import json
+import queue
+import threading
+import time
+import concurrent.futures
 from contextlib import contextmanager
-from typing import Callable
+from datetime import datetime
+from typing import Callable, Container, Iterable, Iterator
 
-import requests
-from http.cookiejar import MozillaCookieJar
 import base64
-import yt_dlp
 
+import dedupe
+import http_pool
+import info_cache
+import library_index
+import metrics
+import transfer
+from fb_tokens import store as token_store
+from concurrency import get_controller
+from lazy_import import lazy_module
+from tracing import bind, traced, ydl_phases
 
-# ── Module-level cache for pagination query hash (refreshed per process) ─────
+yt_dlp   = lazy_module('yt_dlp')
+requests = lazy_module('requests')
+
+
+# ── Module-level cache for pagination query hash (persisted in fb_tokens) ───
 _cached_reels_doc_id: str | None = None
 _REELS_PAGINATION_QUERY = 'ProfileCometAppCollectionReelsRendererPaginationQuery'
 
@@ -91,22 +108,37 @@ _FB_COOKIE_CANDIDATES = [
 ]
 
 
+# path → ((mtime, size), valid): a cookie file is only re-read after it changes
+_validated_cookies: dict[str, tuple[tuple[float, int], bool]] = {}
+
+
 def _validate_cookies_file(path: str) -> bool:
     try:
-        if not os.path.exists(path) or os.path.getsize(path) == 0:
-            return False
-        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                if len(line.split('\t')) >= 7:
-                    return True
-        return False
-    except Exception:
+        st = os.stat(path)
+    except OSError:
         return False
+    stamp = (st.st_mtime, st.st_size)
+    cached = _validated_cookies.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    valid = False
+    if st.st_size:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    if len(line.split('\t')) >= 7:
+                        valid = True
+                        break
+        except Exception:
+            valid = False
+    _validated_cookies[path] = (stamp, valid)
+    return valid
 
 
+@traced('cookies', 'facebook')
 def _cookies_opt() -> dict:
     for path in _FB_COOKIE_CANDIDATES:
         if _validate_cookies_file(path):
@@ -114,6 +146,7 @@ def _cookies_opt() -> dict:
     return {}
 
 
+@traced('cookies', 'facebook')
 def _get_cookie_file() -> str | None:
     """Return the first valid cookie file path, or None."""
     for path in _FB_COOKIE_CANDIDATES:
@@ -137,12 +170,14 @@ _QUALITY_FORMATS: dict[str, str] = {
 
 
 # ── Build yt-dlp opts ────────────────────────────────────────────────────────────
+@traced('build_opts', 'facebook')
 def _build_fb_opts(
     out_dir: str,
     quality: str = 'best',
     progress_hook: Callable | None = None,
 ) -> dict:
     fmt = _QUALITY_FORMATS.get(quality, _QUALITY_FORMATS['best'])
+    ctl = get_controller('facebook')
 
     opts: dict = {
         'format':              fmt,
@@ -155,17 +190,21 @@ def _build_fb_opts(
         'nocheckcertificate':  True,
         'retries':             10,
         'fragment_retries':    10,
-        'http_chunk_size':     10 * 1024 * 1024,
         'socket_timeout':      30,
-        'concurrent_fragment_downloads': 8,
+        'concurrent_fragment_downloads': ctl.fragments,
+        'logger':              ctl.logger(metrics.ErrorLogger('facebook')),
+        'progress_hooks':      [ctl.observe, metrics.progress_hook('facebook')],
+        'post_hooks':          [metrics.post_hook('facebook')],
     }
 
+    opts.update(transfer.base_opts('facebook'))
+
     cookie_opts = _cookies_opt()
     if cookie_opts:
         opts.update(cookie_opts)
 
     if progress_hook:
-        opts['progress_hooks'] = [progress_hook]
+        opts['progress_hooks'].append(progress_hook)
 
     return opts
 
@@ -187,13 +226,19 @@ def download_facebook_video(
     opts = _build_fb_opts(out_dir, quality, progress_hook)
 
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+        with transfer.attach(yt_dlp.YoutubeDL(opts), 'facebook') as ydl, ydl_phases(ydl, url):
+            dedupe.attach(ydl, out_dir, log_fn)
+            library_index.attach(ydl, out_dir)
+            path = library_index.existing(ydl, url)
+            if path:
+                return path
+            info = info_cache.extract(ydl, url)
             if info:
                 return ydl.prepare_filename(info)
     except Exception as e:
         if log_fn:
             log_fn(f'[Facebook] Lỗi tải: {e}', 'err')
+    metrics.record_failure('facebook')
     return None
 
 
@@ -222,7 +267,7 @@ def download_facebook_profile(
         log_fn(f'[Facebook] Tìm thấy {len(video_urls)} video, đang tải...', 'info')
 
     ok = 0
-    for url in video_urls:
+    for url in metrics.drain(video_urls):
         fn = download_facebook_video(url, out_dir, quality, progress_hook, log_fn)
         if fn:
             ok += 1
@@ -243,11 +288,23 @@ def download_facebook_multi(
 ) -> tuple[int, int]:
     """Download multiple Facebook video URLs sequentially.
 
+    Profile / reels / videos pages in *urls* are expanded first (scraped
+    concurrently with scrape_facebook_profiles) and their videos downloaded.
+
     Returns: (success_count, total_count)
     """
     os.makedirs(out_dir, exist_ok=True)
+    profiles = [u for u in urls if _is_fb_profile_or_listing(u)]
+    if profiles:
+        if log_fn:
+            log_fn(f'[Facebook] Đang quét {len(profiles)} trang...', 'info')
+        found = [video for _, video in scrape_facebook_profiles(profiles, log_fn=log_fn)]
+        if log_fn:
+            log_fn(f'[Facebook] Tìm thấy {len(found)} video từ {len(profiles)} trang.', 'info')
+        urls = list(dict.fromkeys(
+            [u for u in urls if not _is_fb_profile_or_listing(u)] + found))
     ok = 0
-    for url in urls:
+    for url in metrics.drain(urls):
         fn = download_facebook_video(url, out_dir, quality, progress_hook, log_fn)
         if fn:
             ok += 1
@@ -306,6 +363,79 @@ def fetch_facebook_video_list(url: str, max_videos: int | None = None,
     return result
 
 
+_GRAPHQL_PAGE_SIZE = 24    # items requested per GraphQL pagination call
+_GRAPHQL_MAX_PAGES = 100   # pagination calls per scrape (~2400 videos at 24)
+_GRAPHQL_RETRIES   = 2     # extra tries of one page after 429 / 5xx
+_GRAPHQL_BACKOFF   = 2.0   # seconds before the first retry, doubled after that
+_GRAPHQL_MAX_WAIT  = 30.0  # cap on a server's Retry-After
+
+_BATCH_WORKERS  = 8   # profiles scraped at the same time
+_BATCH_PER_HOST = 4   # requests in flight per host across the whole batch
+
+
+class _BatchClosed(Exception):
+    """Raised inside a scrape once the consumer of its results has gone away."""
+
+
+def scrape_facebook_profiles(
+    profile_urls: Iterable[str],
+    max_videos: int | None = None,
+    workers: int = _BATCH_WORKERS,
+    per_host: int = _BATCH_PER_HOST,
+    log_fn: Callable | None = None,
+    **scrape_opts,
+) -> Iterator[tuple[str, str]]:
+    """Scrape many profile / reels / videos pages concurrently.
+
+    Yields (profile_url, video_url) pairs as they are found, in discovery
+    order across profiles; *max_videos* applies per profile. All scrapes
+    share one cookie-loaded session — so one connection pool and a single
+    doc_id discovery — and at most *per_host* requests are in flight to any
+    host. Closing the iterator early stops the remaining scrapes.
+
+    *scrape_opts* (page_size, max_pages, known_ids, older_than, stop_when)
+    are passed to every _scrape_video_urls call.
+    """
+    profiles = list(dict.fromkeys(u.strip() for u in profile_urls if u.strip()))
+    if not profiles:
+        return
+    session = http_pool.limit_hosts(_scrape_session(), per_host)
+    results: queue.Queue = queue.Queue()
+    closed = threading.Event()
+
+    def _scrape(profile: str) -> None:
+        def _found(url: str) -> None:
+            if closed.is_set():
+                raise _BatchClosed
+            results.put((profile, url))
+        try:
+            _scrape_video_urls(profile, max_videos, on_url_found=_found, session=session,
+                               **scrape_opts)
+        except _BatchClosed:
+            pass
+        except Exception as e:
+            if log_fn:
+                log_fn(f'[Facebook] Lỗi quét {profile}: {e}', 'err')
+        finally:
+            results.put(None)      # this profile is done
+
+    pool = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, min(workers, len(profiles))), thread_name_prefix='fb-scrape')
+    for profile in profiles:
+        pool.submit(bind(_scrape), profile)
+    pending = len(profiles)
+    try:
+        while pending:
+            item = results.get()
+            if item is None:
+                pending -= 1
+            else:
+                yield item
+    finally:
+        closed.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 # ── Internal: scrape video URLs from a Facebook page ─────────────────────────────
 
 _SCRAPE_HEADERS = {
@@ -323,59 +453,329 @@ _SCRAPE_HEADERS = {
 }
 
 
-def _scrape_video_urls(page_url: str, max_videos: int | None = None,
-                       on_url_found: Callable[[str], None] | None = None) -> list[str]:
-    """Scrape video/reel URLs from a Facebook profile page, with cursor pagination.
+# ── doc_id discovery: concurrent JS bundle scan ─────────────────────────────────
+_BUNDLE_CONCURRENCY = 8          # bundles fetched at the same time
+_BUNDLE_CHUNK       = 64 * 1024  # streamed read size
+_BUNDLE_TIMEOUT     = (5, 10)    # connect / read seconds per bundle
+_DOC_ID_CONTEXT     = 500        # chars around the query name searched for the id
+_DOC_ID_RE          = re.compile(rb'\b(\d{15,})\b')
+_QUERY_BYTES        = _REELS_PAGINATION_QUERY.encode()
 
-    Strategy:
-      1. Fetch the profile/reels/videos page HTML with authentication cookies
-      2. Extract reel and video IDs from the initial HTML (~10 items)
-      3. Extract GraphQL pagination tokens (lsd, fb_dtsg, app_collection node ID)
-      4. Discover the Relay pagination query hash from loaded JS bundles (cached)
-      5. Paginate via Facebook's GraphQL API until all videos are retrieved
 
-    If *on_url_found* is provided, it is called for each new URL as discovered.
+def _find_doc_id(js: bytes, complete: bool = True) -> str | None:
+    """Return the doc_id next to the pagination query name in *js*, if present.
+
+    With complete=False *js* is the start of a bundle still streaming in:
+    a number running up to its end may continue in the next chunk, so it
+    is not returned yet.
+    """
+    start = js.find(_QUERY_BYTES)
+    while start != -1:
+        # Search the whole tail rather than a slice: a slice boundary
+        # would cut an id short just like a chunk boundary does
+        m = _DOC_ID_RE.search(js, max(0, start - _DOC_ID_CONTEXT))
+        if m and m.start() < start + _DOC_ID_CONTEXT:
+            if m.end() == len(js) and not complete:
+                return None
+            return m.group(1).decode()
+        start = js.find(_QUERY_BYTES, start + 1)
+    return None
+
+
+def _scan_bundle(session, js_url: str, stop: threading.Event) -> str | None:
+    """Stream one JS bundle, returning the doc_id as soon as it is readable.
+
+    Gives up early (closing the connection) once *stop* is set.
+    """
+    try:
+        with session.get(js_url, headers={'User-Agent': _SCRAPE_HEADERS['User-Agent']},
+                         timeout=_BUNDLE_TIMEOUT, stream=True) as r:
+            if r.status_code != 200:
+                return None
+            buf = bytearray()
+            seen = False
+            for chunk in r.iter_content(_BUNDLE_CHUNK):
+                if stop.is_set():
+                    return None
+                buf += chunk
+                # Search only once the query name has arrived; the id may
+                # still be in a later chunk, so keep checking after that.
+                if not seen:
+                    seen = _QUERY_BYTES in buf[-(len(chunk) + len(_QUERY_BYTES)):]
+                if seen:
+                    doc_id = _find_doc_id(bytes(buf), complete=False)
+                    if doc_id:
+                        return doc_id
+            return _find_doc_id(bytes(buf)) if seen else None
+    except Exception:
+        return None
+
+
+def _discover_doc_id(session, js_urls: list[str]) -> str | None:
+    """Find the Reels pagination doc_id in the page's rsrc.php bundles.
+
+    Bundles are scanned _BUNDLE_CONCURRENCY at a time on a pool of their
+    own. The first doc_id found is returned at once: queued scans are
+    cancelled and in-flight streams bail out at their next chunk, without
+    being waited for.
+    """
+    if not js_urls:
+        return None
+    stop = threading.Event()
+    pool = concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(_BUNDLE_CONCURRENCY, len(js_urls)), thread_name_prefix='fb-bundle')
+    try:
+        futures = [pool.submit(bind(_scan_bundle), session, u, stop) for u in js_urls]
+        for future in concurrent.futures.as_completed(futures):
+            doc_id = future.result()
+            if doc_id:
+                return doc_id
+        return None
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+_doc_id_lock = threading.Lock()
+
+
+def _reels_doc_id(session, js_urls: list[str], stale: str | None = None) -> tuple[str | None, bool]:
+    """Return (doc_id, cached): from memory, then fb_tokens, then the JS bundles.
+
+    Concurrent scrapes share one discovery: the first thread scans the
+    bundles, the others wait for it. *stale* is a doc_id GraphQL just
+    rejected; it is dropped unless another thread already replaced it.
     """
     global _cached_reels_doc_id
+    with _doc_id_lock:
+        if stale:
+            if _cached_reels_doc_id == stale:
+                _cached_reels_doc_id = None
+                token_store.invalidate(doc_id=True)
+            elif _cached_reels_doc_id:
+                return _cached_reels_doc_id, False
+        if not _cached_reels_doc_id and not stale:
+            _cached_reels_doc_id = token_store.doc_id()
+        if _cached_reels_doc_id:
+            return _cached_reels_doc_id, True
+        doc_id = _discover_doc_id(session, js_urls)
+        if doc_id:
+            _cached_reels_doc_id = doc_id
+            token_store.put_doc_id(doc_id)
+        return doc_id, False
+
+
+# ── Page / GraphQL response scanner ──────────────────────────────────────────
+# Every quoted token the scraper needs, as one alternation anchored on '"' so
+# the regex engine only tries it at quote characters (one pass per page
+# instead of one per token). Reel paths get their own pass: '/reel' is a
+# literal prefix the engine can skip ahead to, and it also matches the
+# JSON-escaped '\/reel\/' form.
+_PAGE_TOKEN_RE = re.compile(
+    r'"(?:video_id"\s*:\s*"(?P<video>\d+)"'
+    r'|end_cursor"\s*:\s*"(?P<cursor>[^"]+)"'
+    r'|has_next_page"\s*:\s*(?P<has_next>true|false)'
+    r'|LSD",\[\],\{"token":"(?P<lsd>[^"]+)"\}'
+    r'|DTSGInitData",\[\],\{"token":"(?P<dtsg>[^"]+)"'
+    r'|id"\s*:\s*"(?P<b64>[A-Za-z0-9+/]{20,}={0,2})"'
+    r'|creation_time"\s*:\s*(?P<created>\d+)'
+    r'|(?P<js>https://static[^"]+rsrc\.php[^"]*\.js[^"]*)")'
+)
+_REEL_PATH_RE = re.compile(r'/reel(?:/|\\/)(\d+)')
 
-    cookie_file = _get_cookie_file()
-    session = requests.Session()
 
-    cj: MozillaCookieJar | None = None
+def _b64_needles(needle: bytes) -> tuple[str, ...]:
+    """Base64 text that *needle* must produce at each of the 3 byte alignments."""
+    out = []
+    for k in range(3):
+        enc = base64.b64encode(b'\0' * k + needle).decode()
+        first = -(-k * 8 // 6)                     # first char made only of needle bits
+        last = (k + len(needle)) * 8 // 6          # chars fully inside the needle
+        out.append(enc[first:last])
+    return tuple(out)
+
+
+_COLLECTION_NEEDLES = _b64_needles(b'app_collection')
+
+
+def _is_collection_id(b64: str) -> bool:
+    """True if the base64 node ID decodes to an app_collection node."""
+    # Cheap substring filter first; only candidates are actually decoded
+    if not any(n in b64 for n in _COLLECTION_NEEDLES):
+        return False
+    try:
+        return 'app_collection' in base64.b64decode(b64 + '==').decode('utf-8', errors='replace')
+    except Exception:
+        return False
+
+
+def _scan_page(text: str, with_times: bool = False) -> dict:
+    """Pull everything the scraper uses out of a page or GraphQL response.
+
+    Returns reel / video IDs (document order, deduplicated) and the first
+    end_cursor, has_next_page, LSD, DTSG, app_collection ID and rsrc.php
+    bundle URLs found. With *with_times*, 'times' maps an ID to the first
+    creation_time that follows it before the next ID (the field sits in the
+    same node); otherwise it is empty.
+    """
+    if with_times:
+        item_hits = [(m.start(), m.group(1)) for m in _REEL_PATH_RE.finditer(text)]
+        reels = list(dict.fromkeys(vid for _, vid in item_hits))
+    else:
+        item_hits = []
+        reels = list(dict.fromkeys(_REEL_PATH_RE.findall(text)))
+    out = {'reels': reels, 'videos': [], 'cursor': None, 'has_next': None,
+           'lsd': None, 'dtsg': None, 'collection': None, 'js': [], 'times': {}}
+    videos: dict[str, None] = {}
+    js: dict[str, None] = {}
+    created: list[tuple[int, int]] = []
+    for m in _PAGE_TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == 'video':
+            videos[value] = None
+            if with_times:
+                item_hits.append((m.start(), value))
+        elif kind == 'created':
+            created.append((m.start(), int(value)))
+        elif kind == 'js':
+            js[value] = None
+        elif kind == 'b64':
+            if out['collection'] is None and _is_collection_id(value):
+                out['collection'] = value
+        elif kind == 'has_next':
+            if out['has_next'] is None:
+                out['has_next'] = value == 'true'
+        elif out[kind] is None:
+            out[kind] = value
+    out['videos'] = list(videos)
+    out['js'] = list(js)
+    if with_times and created:
+        out['times'] = _pair_times(item_hits, created)
+    return out
+
+
+def _pair_times(item_hits: list[tuple[int, str]],
+                created: list[tuple[int, int]]) -> dict[str, int]:
+    """Give each ID the first creation_time between it and the next ID."""
+    times: dict[str, int] = {}
+    events = sorted([(pos, 0, vid) for pos, vid in item_hits]
+                    + [(pos, 1, ts) for pos, ts in created])
+    last = None
+    for _, kind, value in events:
+        if kind == 0:
+            last = value
+        elif last is not None:
+            times.setdefault(last, value)
+            last = None
+    return times
+
+
+def _scrape_session():
+    """New requests session on the shared pools, with the Facebook cookies loaded."""
+    session = http_pool.new_session()
+    cookie_file = _get_cookie_file()
     if cookie_file:
         try:
+            from http.cookiejar import MozillaCookieJar
             cj = MozillaCookieJar(cookie_file)
             cj.load(ignore_discard=True, ignore_expires=True)
             session.cookies = cj
         except Exception:
             pass
+    return session
+
+
+@traced('scrape_profile', 'facebook')
+def _scrape_video_urls(
+    page_url: str,
+    max_videos: int | None = None,
+    on_url_found: Callable[[str], None] | None = None,
+    session=None,
+    page_size: int = _GRAPHQL_PAGE_SIZE,
+    max_pages: int = _GRAPHQL_MAX_PAGES,
+    stop_when: Callable[[dict], bool] | None = None,
+    known_ids: Container[str] | None = None,
+    older_than: float | datetime | None = None,
+    state: dict | None = None,
+) -> list[str]:
+    """Scrape video/reel URLs from a Facebook profile page, with cursor pagination.
+
+    Strategy:
+      1. Fetch the profile/reels/videos page HTML with authentication cookies
+      2. Extract reel and video IDs from the initial HTML (~10 items)
+      3. Extract GraphQL pagination tokens (lsd, fb_dtsg, app_collection node ID)
+      4. Discover the Relay pagination query hash from loaded JS bundles
+         (3 and 4 are persisted in fb_tokens.json and reused across runs)
+      5. Paginate via Facebook's GraphQL API, *page_size* items per request,
+         for at most *max_pages* requests
 
-    seen_ids: set[str] = set()
+    If *on_url_found* is provided, it is called for each new URL as discovered.
+    *session* lets batch callers share one cookie-loaded session
+    (see scrape_facebook_profiles); by default a new one is made.
+
+    Early termination (the listing is newest first): scraping stops at the
+    first entry whose ID is in *known_ids*, that was posted before
+    *older_than* (unix time or datetime), or for which *stop_when* returns
+    True. *stop_when* gets {'id', 'url', 'timestamp'}; timestamp is None when
+    the page did not carry one, and such entries never match *older_than*.
+
+    *state* makes a listing resumable across calls: pass the same dict again
+    to continue where the previous call stopped. It is updated with
+    'cursor' / 'skip' (the position to resume from), 'seen' (IDs already
+    returned, so a reel that also shows up as a video is not returned
+    again) and 'done' (True once the end of the listing or a stop
+    condition was reached).
+    """
+    if page_size < 1:
+        raise ValueError(f'page_size must be at least 1, got {page_size}')
+    if max_pages < 0:
+        raise ValueError(f'max_pages must not be negative, got {max_pages}')
+    if session is None:
+        session = _scrape_session()
+    if isinstance(older_than, datetime):
+        older_than = older_than.timestamp()
+
+    seen_ids: set[str] = set(state.get('seen') or ()) if state else set()
     all_urls: list[str] = []
+    resume_cursor = state.get('cursor') if state else None
+    resume_skip = state.get('skip', 0) if state else 0
+    if state and state.get('done'):
+        return []
 
-    def _add_url(url: str) -> None:
-        """Add a video URL, deduplicating by numeric ID."""
-        m = re.search(r'/reel/(\d+)|[?&]v=(\d+)', url)
-        vid_id = (m.group(1) or m.group(2)) if m else url
-        if vid_id not in seen_ids:
+    def _should_stop(vid_id: str, url: str, timestamp: int | None) -> bool:
+        if known_ids is not None and vid_id in known_ids:
+            return True
+        if older_than is not None and timestamp is not None and timestamp < older_than:
+            return True
+        return bool(stop_when and stop_when({'id': vid_id, 'url': url, 'timestamp': timestamp}))
+
+    def _add_found(scan: dict, skip: int = 0) -> tuple[int, bool]:
+        """Add the reel/video URLs from a _scan_page() result, deduplicating by ID.
+
+        Returns (items of this page consumed, stop condition hit).
+        """
+        items = [(r, f'https://www.facebook.com/reel/{r}') for r in scan['reels']]
+        items += [(v, f'https://www.facebook.com/watch/?v={v}') for v in scan['videos']]
+        for index in range(skip, len(items)):
+            if max_videos and len(all_urls) >= max_videos:
+                return index, False
+            vid_id, url = items[index]
+            if vid_id in seen_ids:
+                continue
+            if _should_stop(vid_id, url, scan['times'].get(vid_id)):
+                return index, True
             seen_ids.add(vid_id)
             all_urls.append(url)
             if on_url_found:
                 on_url_found(url)
+        return len(items), False
 
-    def _extract_video_urls(text: str) -> list[str]:
-        """Extract reel/video URLs from HTML or JSON text."""
-        found: list[str] = []
-        local_seen: set[str] = set()
-        for reel_id in re.findall(r'(?:/|\\/)reel(?:/|\\/)(\d+)', text):
-            if reel_id not in local_seen:
-                local_seen.add(reel_id)
-                found.append(f'https://www.facebook.com/reel/{reel_id}')
-        for vid_id in re.findall(r'"video_id"\s*:\s*"(\d+)"', text):
-            if vid_id not in local_seen:
-                local_seen.add(vid_id)
-                found.append(f'https://www.facebook.com/watch/?v={vid_id}')
-        return found
+    def _finish(cursor: str | None, skip: int = 0, done: bool = False) -> list[str]:
+        if state is not None:
+            state.update(cursor=None if done else cursor, skip=0 if done else skip,
+                         seen=sorted(seen_ids), done=done)
+        return all_urls
 
     def _fetch_html(url: str) -> str:
         try:
@@ -393,96 +793,91 @@ def _scrape_video_urls(page_url: str, max_videos: int | None = None,
         primary_url = clean + '/reels/'
         fallback_url = clean + '/videos/'
 
-    # ── Fetch initial page ────────────────────────────────────────────────────
+    # ── Fetch initial page (also needed on resume, for the tokens) ───────────
     html = _fetch_html(primary_url)
     if not html and fallback_url:
         html = _fetch_html(fallback_url)
     if not html and clean != primary_url:
         html = _fetch_html(clean)
     if not html:
-        return []
+        return _finish(resume_cursor, resume_skip)
 
-    for u in _extract_video_urls(html):
-        _add_url(u)
+    with_times = older_than is not None or stop_when is not None
+    page = _scan_page(html, with_times)
 
     # ── Extract pagination metadata ───────────────────────────────────────────
-    cursor_m = re.search(r'"end_cursor"\s*:\s*"([^"]+)"', html)
-    has_next_m = re.search(r'"has_next_page"\s*:\s*(true|false)', html)
-    cursor = cursor_m.group(1) if cursor_m else None
-    has_next = (has_next_m.group(1) == 'true') if has_next_m else bool(cursor)
-
-    if not (cursor and has_next):
-        return all_urls[:max_videos] if max_videos else all_urls
-
-    if max_videos and len(all_urls) >= max_videos:
-        return all_urls[:max_videos]
-
-    # Extract auth tokens needed for GraphQL
-    lsd_m  = re.search(r'"LSD",\[\],\{"token":"([^"]+)"\}', html)
-    dtsg_m = re.search(r'"DTSGInitData",\[\],\{"token":"([^"]+)"', html)
-    lsd     = lsd_m.group(1) if lsd_m else None
-    fb_dtsg = dtsg_m.group(1) if dtsg_m else None
+    if resume_cursor:
+        cursor, has_next, skip = resume_cursor, True, resume_skip
+    else:
+        taken, stopped = _add_found(page, resume_skip)
+        if stopped:
+            return _finish(None, done=True)
+        cursor = page['cursor']
+        has_next = page['has_next'] if page['has_next'] is not None else bool(cursor)
+        if taken < len(page['reels']) + len(page['videos']):
+            return _finish(None, taken)          # max_videos reached inside the HTML page
+        if not (cursor and has_next):
+            return _finish(None, done=True)
+        skip = 0
+
     fb_c_user = next(
         (c.value for c in session.cookies if c.name == 'c_user'), None
     )
-    jazoest = ('2' + ''.join(str(ord(c)) for c in lsd)) if lsd else None
+    user_key = fb_c_user or '0'
+    def _resolve_tokens(use_cache: bool, stale_doc_id: str | None = None):
+        """Return (lsd, fb_dtsg, collection_id, doc_id, cached): persisted values
+        first, then the page HTML. *cached* is True if anything came from the cache."""
+        cached = False
+
+        # Auth tokens needed for GraphQL
+        tokens = token_store.session(user_key) if use_cache else None
+        if tokens:
+            cached = True
+        else:
+            if page['lsd'] and page['dtsg']:
+                tokens = (page['lsd'], page['dtsg'])
+                token_store.put_session(user_key, *tokens)
+        lsd, fb_dtsg = tokens or (None, None)
+
+        # app_collection base64 node ID (identifies the reels feed node)
+        collection_id = token_store.collection(clean) if use_cache else None
+        if collection_id:
+            cached = True
+        else:
+            collection_id = page['collection']
+            if collection_id:
+                token_store.put_collection(clean, collection_id)
 
-    # Extract app_collection base64 node ID (identifies the reels feed node)
-    collection_id: str | None = None
-    for b64 in re.findall(r'"id"\s*:\s*"([A-Za-z0-9+/]{20,}={0,2})"', html):
-        try:
-            decoded = base64.b64decode(b64 + '==').decode('utf-8', errors='replace')
-            if 'app_collection' in decoded:
-                collection_id = b64
-                break
-        except Exception:
-            pass
+        if not (lsd and fb_dtsg and collection_id):
+            return None, None, None, None, cached
 
-    if not (lsd and fb_dtsg and collection_id):
-        return all_urls[:max_videos] if max_videos else all_urls
-
-    # ── Discover Relay pagination query doc_id from JS bundles (cached) ───────
-    if not _cached_reels_doc_id:
-        js_urls = list(set(re.findall(
-            r'"(https://static[^"]+rsrc\.php[^"]*\.js[^"]*)"', html)))
-        for js_url in js_urls:
-            try:
-                rj = session.get(
-                    js_url,
-                    headers={'User-Agent': _SCRAPE_HEADERS['User-Agent']},
-                    timeout=30,
-                )
-                if rj.status_code != 200 or _REELS_PAGINATION_QUERY not in rj.text:
-                    continue
-                js = rj.text
-                for m in re.finditer(re.escape(_REELS_PAGINATION_QUERY), js):
-                    ctx = js[max(0, m.start() - 500):m.start() + 500]
-                    ids = re.findall(r'\b(\d{15,})\b', ctx)
-                    if ids:
-                        _cached_reels_doc_id = ids[0]
-                        break
-                if _cached_reels_doc_id:
-                    break
-            except Exception:
-                continue
+        # Relay pagination query doc_id (shared by all scrapes in the process)
+        doc_id, doc_cached = _reels_doc_id(session, page['js'], stale_doc_id)
+        return lsd, fb_dtsg, collection_id, doc_id, cached or doc_cached
 
-    if not _cached_reels_doc_id:
-        return all_urls[:max_videos] if max_videos else all_urls
+    lsd, fb_dtsg, collection_id, doc_id, cached = _resolve_tokens(use_cache=True)
+    if not (lsd and doc_id):
+        return _finish(cursor, skip)
 
     # ── Paginate via Facebook's GraphQL endpoint ──────────────────────────────
-    post_headers = {
-        'User-Agent':      _SCRAPE_HEADERS['User-Agent'],
-        'Accept-Language': _SCRAPE_HEADERS['Accept-Language'],
-        'Content-Type':    'application/x-www-form-urlencoded',
-        'X-FB-LSD':        lsd,
-        'Origin':          'https://www.facebook.com',
-        'Referer':         primary_url,
-        'Sec-Fetch-Dest':  'empty',
-        'Sec-Fetch-Mode':  'cors',
-        'Sec-Fetch-Site':  'same-origin',
-    }
-
-    for _ in range(100):  # safety cap: max 100 extra pages (~2400 more videos)
+    def _post_headers() -> dict:
+        return {
+            'User-Agent':      _SCRAPE_HEADERS['User-Agent'],
+            'Accept-Language': _SCRAPE_HEADERS['Accept-Language'],
+            'Content-Type':    'application/x-www-form-urlencoded',
+            'X-FB-LSD':        lsd,
+            'Origin':          'https://www.facebook.com',
+            'Referer':         primary_url,
+            'Sec-Fetch-Dest':  'empty',
+            'Sec-Fetch-Mode':  'cors',
+            'Sec-Fetch-Site':  'same-origin',
+        }
+
+    post_headers = _post_headers()
+    jazoest = '2' + ''.join(str(ord(c)) for c in lsd)
+    retries = 0
+
+    for _ in range(max_pages):
         if max_videos and len(all_urls) >= max_videos:
             break
         try:
@@ -498,38 +893,64 @@ def _scrape_video_urls(page_url: str, max_videos: int | None = None,
                 'fb_api_req_friendly_name': _REELS_PAGINATION_QUERY,
                 'variables': json.dumps({
                     'cursor': cursor,
-                    'count':  24,
+                    'count':  page_size,
                     'id':     collection_id,
                     'scale':  2,
                 }),
-                'doc_id': _cached_reels_doc_id,
+                'doc_id': doc_id,
             }
             resp = session.post(
                 'https://www.facebook.com/api/graphql/',
                 data=payload, headers=post_headers, timeout=20,
             )
             if resp.status_code != 200:
+                # Throttling / server trouble says nothing about the tokens:
+                # keep them, back off and retry this page, or stop here
+                # (*state* keeps the cursor for a later call).
+                if ((resp.status_code == 429 or resp.status_code >= 500)
+                        and retries < _GRAPHQL_RETRIES):
+                    delay = _GRAPHQL_BACKOFF * 2 ** retries
+                    try:
+                        delay = min(_GRAPHQL_MAX_WAIT, float(resp.headers['Retry-After']))
+                    except (KeyError, ValueError):
+                        pass
+                    retries += 1
+                    time.sleep(delay)
+                    continue
                 break
+            retries = 0
             text = resp.text
             if text.startswith('for (;;);'):
                 text = text[9:]
-            # Hard error: API rejected request (missing "data" key)
+            # Hard error: API answered 200 without a "data" key (rejected
+            # tokens). If it was sent with cached tokens, drop them and retry
+            # once with fresh ones.
             if '"data"' not in text:
-                break
-
-            for u in _extract_video_urls(text):
-                _add_url(u)
+                if not cached:
+                    break
+                token_store.invalidate(c_user=user_key, profile=clean)
+                lsd, fb_dtsg, collection_id, doc_id, cached = _resolve_tokens(
+                    use_cache=False, stale_doc_id=doc_id)
+                if not (lsd and doc_id):
+                    break
+                post_headers = _post_headers()
+                jazoest = '2' + ''.join(str(ord(c)) for c in lsd)
+                continue
 
-            next_cur_m  = re.search(r'"end_cursor"\s*:\s*"([^"]+)"', text)
-            has_next_m2 = re.search(r'"has_next_page"\s*:\s*(true|false)', text)
-            has_more    = has_next_m2.group(1) == 'true' if has_next_m2 else False
-            cursor = (next_cur_m.group(1) if (next_cur_m and has_more) else None)
-            if not cursor:
-                break
+            result = _scan_page(text, with_times)
+            taken, stopped = _add_found(result, skip)
+            if stopped:
+                return _finish(None, done=True)
+            if taken < len(result['reels']) + len(result['videos']):
+                return _finish(cursor, taken)    # resume inside this page
+            skip = 0
+            if not (result['cursor'] and result['has_next']):
+                return _finish(None, done=True)
+            cursor = result['cursor']
         except Exception:
             break
 
-    return all_urls[:max_videos] if max_videos else all_urls
+    return _finish(cursor, skip)
 
 
 def _extract_single_info(url: str) -> list[dict]:
@@ -556,6 +977,8 @@ def _extract_single_info(url: str) -> list[dict]:
 
                 entries = info.get('entries')
                 items = list(entries) if entries else [info]
+                if not entries:
+                    info_cache.put(info, url)
 
                 for entry in items:
                     if entry is None:
@@ -0,0 +1,150 @@
+"""
+fb_tokens.py
+────────────
+Persistent store for the Facebook GraphQL pagination state, so a new app
+launch (or the next profile) does not have to rediscover it:
+
+  doc_id         Relay query id of the Reels pagination query (found by
+                 scanning the rsrc.php JS bundles — the expensive part)
+  lsd / fb_dtsg  request tokens, keyed by the logged-in c_user
+  collection_id  app_collection node of a profile's reels tab, keyed by page
+
+Entries carry the time they were saved and expire after a TTL; values are
+re-validated on load, so a hand-edited or truncated file just means a cold
+start. When GraphQL rejects a request (no "data" in the reply) the caller
+invalidates what it used and extracts fresh values.
+
+    store.doc_id()                       # None if missing / expired
+    store.put_doc_id('25081…')
+    store.invalidate(c_user='1000…', profile='https://www.facebook.com/x')
+"""
+
+from __future__ import annotations
+import base64
+import os
+import re
+import time
+
+from json_store import JsonStore
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_PATH = os.path.join(_BASE_DIR, 'fb_tokens.json')
+
+_VERSION = 1
+
+DOC_ID_TTL     = 7 * 86400    # changes with Facebook frontend deploys
+SESSION_TTL    = 12 * 3600    # lsd / fb_dtsg are tied to the login session
+COLLECTION_TTL = 30 * 86400   # a profile's reels node does not move
+
+_DOC_ID_RE = re.compile(r'\d{15,}')
+_TOKEN_RE  = re.compile(r'[^\s"]{8,}')
+
+
+def _valid_collection(value: str) -> bool:
+    try:
+        decoded = base64.b64decode(value + '==').decode('utf-8', errors='replace')
+    except Exception:
+        return False
+    return 'app_collection' in decoded
+
+
+def profile_key(page_url: str) -> str:
+    """Normalise a profile URL so /reels/, /videos/ and trailing slashes share a key."""
+    key = page_url.strip().lower().split('?')[0].rstrip('/')
+    for suffix in ('/reels', '/videos'):
+        if key.endswith(suffix):
+            key = key[:-len(suffix)]
+    for host in ('://facebook.com', '://m.facebook.com'):
+        key = key.replace(host, '://www.facebook.com')
+    return key
+
+
+class TokenStore(JsonStore):
+    """JSON-file backed token cache (thread-safe, loaded on first use)."""
+
+    def __init__(self, path: str = STORE_PATH):
+        super().__init__(path)
+
+    # ── doc_id ───────────────────────────────────────────────────────────────
+    def doc_id(self) -> str | None:
+        entry = self._get('doc_id', None, DOC_ID_TTL)
+        value = entry.get('value') if entry else None
+        return value if isinstance(value, str) and _DOC_ID_RE.fullmatch(value) else None
+
+    def put_doc_id(self, doc_id: str) -> None:
+        if _DOC_ID_RE.fullmatch(doc_id or ''):
+            self._put('doc_id', None, {'value': doc_id})
+
+    # ── lsd / fb_dtsg ────────────────────────────────────────────────────────
+    def session(self, c_user: str) -> tuple[str, str] | None:
+        entry = self._get('sessions', c_user, SESSION_TTL)
+        if not entry:
+            return None
+        lsd, dtsg = entry.get('lsd'), entry.get('fb_dtsg')
+        if not (isinstance(lsd, str) and isinstance(dtsg, str)
+                and _TOKEN_RE.fullmatch(lsd) and _TOKEN_RE.fullmatch(dtsg)):
+            return None
+        return lsd, dtsg
+
+    def put_session(self, c_user: str, lsd: str, fb_dtsg: str) -> None:
+        if lsd and fb_dtsg:
+            self._put('sessions', c_user, {'lsd': lsd, 'fb_dtsg': fb_dtsg})
+
+    # ── collection_id ────────────────────────────────────────────────────────
+    def collection(self, profile: str) -> str | None:
+        entry = self._get('collections', profile_key(profile), COLLECTION_TTL)
+        value = entry.get('value') if entry else None
+        return value if isinstance(value, str) and _valid_collection(value) else None
+
+    def put_collection(self, profile: str, collection_id: str) -> None:
+        if collection_id:
+            self._put('collections', profile_key(profile), {'value': collection_id})
+
+    # ── invalidation ─────────────────────────────────────────────────────────
+    def invalidate(self, doc_id: bool = False, c_user: str | None = None,
+                   profile: str | None = None) -> None:
+        """Drop the given entries (e.g. after GraphQL rejected a request)."""
+        with self._lock:
+            data = self._load()
+            changed = False
+            if doc_id and data.pop('doc_id', None) is not None:
+                changed = True
+            if c_user is not None and data['sessions'].pop(c_user, None) is not None:
+                changed = True
+            if profile is not None and data['collections'].pop(profile_key(profile), None) is not None:
+                changed = True
+            if changed:
+                self._save(data)
+
+    # ── internals ────────────────────────────────────────────────────────────
+    def _empty(self) -> dict:
+        return {'version': _VERSION, 'sessions': {}, 'collections': {}}
+
+    def _valid(self, data) -> bool:
+        return (isinstance(data, dict) and data.get('version') == _VERSION
+                and isinstance(data.get('sessions'), dict)
+                and isinstance(data.get('collections'), dict))
+
+    def _get(self, section: str, key: str | None, ttl: float) -> dict | None:
+        with self._lock:
+            data = self._load()
+            entry = data.get(section) if key is None else data[section].get(key)
+        if not isinstance(entry, dict):
+            return None
+        saved = entry.get('saved')
+        if not isinstance(saved, (int, float)) or time.time() - saved > ttl:
+            return None
+        return entry
+
+    def _put(self, section: str, key: str | None, entry: dict) -> None:
+        entry = dict(entry, saved=time.time())
+        with self._lock:
+            data = self._load()
+            if key is None:
+                data[section] = entry
+            else:
+                data[section][key] = entry
+            self._save(data)
+
+
+store = TokenStore()
@@ -0,0 +1,91 @@
+"""
+http_pool.py
+────────────
+Shared connection pools for the requests-based scrapers (Facebook page
+scraping, TikTok secUid lookup).
+
+Every session from new_session() mounts the same HTTPAdapter, so
+keep-alive TLS connections opened by one scrape (or by preconnect() during
+warm-up) are reused by the next one. Cookies stay per session.
+
+A session shared by several scraping threads can be capped per host with
+limit_hosts(session, n), so a batch crawl never has more than n requests
+in flight to www.facebook.com however many profiles run at once.
+"""
+
+from __future__ import annotations
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from lazy_import import lazy_module
+
+requests = lazy_module('requests')
+
+_POOL_CONNECTIONS = 8    # distinct hosts kept
+_POOL_MAXSIZE     = 16   # connections kept per host
+
+_adapter = None
+_lock = threading.Lock()
+
+
+def adapter():
+    """Return the process-wide HTTPAdapter (created on first use)."""
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            from requests.adapters import HTTPAdapter
+            _adapter = HTTPAdapter(pool_connections=_POOL_CONNECTIONS,
+                                   pool_maxsize=_POOL_MAXSIZE)
+        return _adapter
+
+
+def new_session():
+    """Return a fresh requests.Session backed by the shared connection pools."""
+    session = requests.Session()
+    shared = adapter()
+    session.mount('https://', shared)
+    session.mount('http://', shared)
+    return session
+
+
+def limit_hosts(session, per_host: int):
+    """Allow at most *per_host* concurrent requests per host through *session*.
+
+    The slot is held until the response headers arrive; streamed bodies are
+    read outside it.
+    """
+    slots: dict[str, threading.BoundedSemaphore] = {}
+    slots_lock = threading.Lock()
+
+    @contextmanager
+    def _slot(url: str):
+        host = urlsplit(url).hostname or ''
+        with slots_lock:
+            sem = slots.get(host)
+            if sem is None:
+                sem = slots[host] = threading.BoundedSemaphore(per_host)
+        with sem:
+            yield
+
+    send = session.request
+
+    def request(method, url, *args, **kwargs):
+        with _slot(url):
+            return send(method, url, *args, **kwargs)
+
+    session.request = request
+    return session
+
+
+def preconnect(urls: list[str], timeout: float = 5.0) -> int:
+    """Open a keep-alive connection to each URL's host. Returns how many succeeded."""
+    session = new_session()
+    ok = 0
+    for url in urls:
+        try:
+            session.head(url, timeout=timeout, allow_redirects=False)
+            ok += 1
+        except Exception:
+            pass
+    return ok
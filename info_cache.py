@@ -0,0 +1,102 @@
+"""
+info_cache.py
+─────────────
+Keeps the yt-dlp info dicts extracted while searching, so downloading a
+selected card hands them to process_ie_result() instead of extracting the
+video a second time (the same reuse --load-info-json does).
+
+Only *processed* info dicts are kept (extract_info(download=False)): their
+formats carry the cookies the extractor set, so a fresh YoutubeDL can
+download them. Entries are compacted with YoutubeDL.sanitize_info() plus
+dropping what a download never reads (subtitles, comments, thumbnail
+lists, …). Format URLs are signed and expire, so entries live for TTL
+seconds, at most MAX_ENTRIES are kept, and a reuse that fails falls back
+to a normal extraction.
+
+    info_cache.put(info, card_url)          # after a metadata extraction
+    info = info_cache.extract(ydl, url)     # download, reusing if possible
+"""
+
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+
+from lazy_import import lazy_module
+
+yt_dlp = lazy_module('yt_dlp')
+
+TTL         = 30 * 60
+MAX_ENTRIES = 256
+
+# Top-level fields a download does not need (thumbnail, singular, stays)
+_DROP = frozenset({
+    'thumbnails', 'subtitles', 'automatic_captions', 'comments', 'heatmap',
+    'chapters', 'storyboards', 'formats_table',
+})
+
+_lock = threading.Lock()
+_entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()   # url → (saved, info)
+
+
+def _compact(info: dict) -> dict:
+    info = yt_dlp.YoutubeDL.sanitize_info(dict(info), remove_private_keys=True)
+    return {k: v for k, v in info.items() if k not in _DROP}
+
+
+def put(info: dict | None, *urls: str) -> None:
+    """Remember a processed single-video *info* under its URLs and *urls*."""
+    if not info or info.get('_type', 'video') != 'video' or not info.get('formats'):
+        return
+    try:
+        entry = (time.monotonic(), _compact(info))
+    except Exception:
+        return
+    keys = {u for u in (info.get('webpage_url'), info.get('original_url'), *urls) if u}
+    with _lock:
+        for key in keys:
+            _entries[key] = entry
+            _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def get(url: str) -> dict | None:
+    """A copy of the cached info for *url*, or None if missing / expired."""
+    with _lock:
+        entry = _entries.get(url)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > TTL:
+            del _entries[url]
+            return None
+        _entries.move_to_end(url)
+    return dict(entry[1])
+
+
+def drop(url: str) -> None:
+    with _lock:
+        _entries.pop(url, None)
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def extract(ydl, url: str, download: bool = True) -> dict | None:
+    """ydl.extract_info(url, download), reusing the cached info when there is one.
+
+    A reuse that fails (typically expired format URLs) drops the entry and
+    extracts the URL normally.
+    """
+    info = get(url)
+    if info is not None:
+        try:
+            result = ydl.process_ie_result(info, download=download)
+            if result is not None:
+                return result
+        except yt_dlp.utils.DownloadError:
+            pass
+        drop(url)
+    return ydl.extract_info(url, download=download)
@@ -17,10 +17,24 @@ import os
 import re
 import io
 import sys
+import time
+import random
+import itertools
+import threading
+import concurrent.futures
 from contextlib import contextmanager
-from typing import Callable
+from typing import Callable, Iterator
 
-import yt_dlp
+import dedupe
+import info_cache
+import library_index
+import metrics
+import transfer
+from concurrency import MultiProgress, get_controller, is_throttle_error
+from lazy_import import lazy_module
+from tracing import bind, traced, ydl_phases
+
+yt_dlp = lazy_module('yt_dlp')
 
 
 # ── URL validation ──────────────────────────────────────────────────────────────
@@ -57,22 +71,37 @@ _IG_COOKIE_FILE = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), 'instagram_cookies.txt')
 
 
+# path → ((mtime, size), valid): a cookie file is only re-read after it changes
+_validated_cookies: dict[str, tuple[tuple[float, int], bool]] = {}
+
+
 def _validate_cookies_file(path: str) -> bool:
     try:
-        if not os.path.exists(path) or os.path.getsize(path) == 0:
-            return False
-        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                if len(line.split('\t')) >= 7:
-                    return True
+        st = os.stat(path)
+    except OSError:
         return False
-    except Exception:
-        return False
-
-
+    stamp = (st.st_mtime, st.st_size)
+    cached = _validated_cookies.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    valid = False
+    if st.st_size:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    if len(line.split('\t')) >= 7:
+                        valid = True
+                        break
+        except Exception:
+            valid = False
+    _validated_cookies[path] = (stamp, valid)
+    return valid
+
+
+@traced('cookies', 'instagram')
 def _cookies_opt() -> dict:
     if _validate_cookies_file(_IG_COOKIE_FILE):
         return {'cookiefile': _IG_COOKIE_FILE}
@@ -93,12 +122,14 @@ _QUALITY_FORMATS: dict[str, str] = {
 
 
 # ── Build yt-dlp opts ────────────────────────────────────────────────────────────
+@traced('build_opts', 'instagram')
 def _build_ig_opts(
     out_dir: str,
     quality: str = 'best',
     progress_hook: Callable | None = None,
 ) -> dict:
     fmt = _QUALITY_FORMATS.get(quality, _QUALITY_FORMATS['best'])
+    ctl = get_controller('instagram')
 
     opts: dict = {
         'format':              fmt,
@@ -111,17 +142,21 @@ def _build_ig_opts(
         'nocheckcertificate':  True,
         'retries':             10,
         'fragment_retries':    10,
-        'http_chunk_size':     10 * 1024 * 1024,
         'socket_timeout':      30,
-        'concurrent_fragment_downloads': 8,
+        'concurrent_fragment_downloads': ctl.fragments,
+        'logger':              ctl.logger(metrics.ErrorLogger('instagram')),
+        'progress_hooks':      [ctl.observe, metrics.progress_hook('instagram')],
+        'post_hooks':          [metrics.post_hook('instagram')],
     }
 
+    opts.update(transfer.base_opts('instagram'))
+
     cookie_opts = _cookies_opt()
     if cookie_opts:
         opts.update(cookie_opts)
 
     if progress_hook:
-        opts['progress_hooks'] = [progress_hook]
+        opts['progress_hooks'].append(progress_hook)
 
     return opts
 
@@ -143,16 +178,196 @@ def download_instagram_video(
     opts = _build_ig_opts(out_dir, quality, progress_hook)
 
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+        with transfer.attach(yt_dlp.YoutubeDL(opts), 'instagram') as ydl, ydl_phases(ydl, url):
+            dedupe.attach(ydl, out_dir, log_fn)
+            library_index.attach(ydl, out_dir)
+            path = library_index.existing(ydl, url)
+            if path:
+                return path
+            info = info_cache.extract(ydl, url)
             if info:
                 return ydl.prepare_filename(info)
     except Exception as e:
         if log_fn:
             log_fn(f'[Instagram] Lỗi tải: {e}', 'err')
+    metrics.record_failure('instagram')
     return None
 
 
+# ── Concurrent downloads (profile + multi-URL) ────────────────────────────────────
+_IG_WORKERS      = 3      # downloads at the same time (ceiling)
+_LOOKUP_INTERVAL = 1.0    # seconds between post lookups on instagram.com
+_LOOKUP_JITTER   = 0.3    # ± fraction of the interval, so lookups don't tick
+_LOOKUP_MAX      = 8.0    # ... stretched up to this after 429 / 403
+
+
+class _Pacer:
+    """Space out requests to one host: wait() returns about *interval*
+    seconds (± *jitter*) after the previous caller's turn. slow_down()
+    doubles the gap.
+    """
+
+    def __init__(self, interval: float, ceiling: float, jitter: float = 0.0):
+        self.interval = interval
+        self._ceiling = ceiling
+        self._jitter  = jitter
+        self._next    = 0.0
+        self._lock    = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            turn = max(now, self._next)
+            self._next = turn + self.interval * random.uniform(1 - self._jitter, 1 + self._jitter)
+        if turn > now:
+            time.sleep(turn - now)
+
+    def slow_down(self) -> None:
+        with self._lock:
+            self.interval = min(self._ceiling, self.interval * 2)
+
+
+# Second-tier lookups of flat listing cards (fetch_instagram_video_details)
+_details_pacer = _Pacer(_LOOKUP_INTERVAL, _LOOKUP_MAX, _LOOKUP_JITTER)
+
+
+class _WorkerYDLs:
+    """One YoutubeDL per worker thread, all sharing the cookie jar loaded
+    once from _cookies_opt() (session cookies Instagram sets on one worker,
+    or on the profile lister, are seen by the others). The jar is written back once, by close().
+    Finished files are checked against the fingerprint index of *out_dir*
+    and recorded in its library index.
+    """
+
+    def __init__(self, make_opts: Callable[[Callable | None], dict],
+                 progress: MultiProgress | None = None,
+                 out_dir: str | None = None, log_fn: Callable | None = None):
+        self._make_opts = make_opts
+        self._progress  = progress
+        self._out_dir   = out_dir
+        self._log_fn    = log_fn
+        self._local     = threading.local()
+        self._lock      = threading.Lock()
+        self._ydls: list = []
+        self._jar       = None
+        cookiefile = _cookies_opt().get('cookiefile')
+        if cookiefile:
+            try:
+                self._jar = yt_dlp.cookies.YoutubeDLCookieJar(cookiefile)
+                self._jar.load()
+            except Exception:
+                self._jar = None
+
+    def _new(self, hook: Callable | None):
+        opts = self._make_opts(hook)
+        if self._jar is not None:
+            opts.pop('cookiefile', None)      # the jar is saved once, by close()
+        ydl = yt_dlp.YoutubeDL(opts)
+        if self._jar is not None:
+            ydl.cookiejar = self._jar         # before its first request
+        return ydl
+
+    def lister(self):
+        """A YoutubeDL for listing the profile, on the shared cookie jar
+        (the caller closes it)."""
+        return self._new(None)
+
+    def get(self):
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            hook = self._progress.feed(threading.get_ident()) if self._progress else None
+            ydl = transfer.attach(self._new(hook), 'instagram')
+            if self._out_dir:
+                dedupe.attach(ydl, self._out_dir, self._log_fn)
+                library_index.attach(ydl, self._out_dir)
+            self._local.ydl = ydl
+            with self._lock:
+                self._ydls.append(ydl)
+        return ydl
+
+    def done(self) -> None:
+        """The calling worker finished one download."""
+        if self._progress:
+            self._progress.clear(threading.get_ident())
+
+    def close(self) -> None:
+        for ydl in self._ydls:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+        if self._jar is not None:
+            try:
+                self._jar.save()
+            except Exception:
+                pass
+
+
+def _run_download(workers: _WorkerYDLs, pacer: _Pacer, entry: dict | str,
+                  log_fn: Callable | None) -> str | None:
+    """Download one post (a URL or a flat listing entry) on this worker's YoutubeDL."""
+    ydl = workers.get()
+    ydl.params['concurrent_fragment_downloads'] = get_controller('instagram').fragments
+    label = entry if isinstance(entry, str) else entry.get('url') or entry.get('id') or ''
+    fn = library_index.existing(ydl, entry)
+    if fn:
+        workers.done()
+        if log_fn:
+            log_fn(f'[Library] Đã có: {os.path.basename(fn)} — bỏ qua tải', 'info')
+        return fn
+    try:
+        if isinstance(entry, str) or entry.get('_type') == 'url':
+            pacer.wait()    # needs a lookup on instagram.com first
+        with ydl_phases(ydl, label):
+            if isinstance(entry, str):
+                info = info_cache.extract(ydl, entry)
+            else:
+                info = ydl.process_ie_result(dict(entry), download=True)
+        fn = ydl.prepare_filename(info) if info else None
+    except Exception as e:
+        if is_throttle_error(str(e)):
+            pacer.slow_down()
+        if log_fn:
+            log_fn(f'[Instagram] Lỗi tải: {e}', 'err')
+        fn = None
+    finally:
+        workers.done()
+    if not fn:
+        metrics.record_failure('instagram')
+    if log_fn:
+        if fn:
+            log_fn(f'Hoàn thành: {os.path.basename(fn)}', 'ok')
+        else:
+            log_fn(f'Thất bại: {label}', 'err')
+    return fn
+
+
+def _gated(fn: Callable, max_workers: int | None) -> Callable:
+    """Run *fn* inside an adaptive-controller slot unless the pool size is pinned."""
+    if max_workers:
+        return fn
+
+    def _run(*args):
+        with get_controller('instagram').slot():
+            return fn(*args)
+    return _run
+
+
+def _iter_profile_entries(ydl, profile_url: str, max_videos: int | None,
+                          info: dict | None = None) -> Iterator[dict]:
+    """Yield the profile's entries as the listing pages arrive (nothing is downloaded).
+
+    *info* is the unprocessed (process=False) profile info if already extracted.
+    """
+    if info is None:
+        info = ydl.extract_info(profile_url, download=False, process=False)
+    if not info:
+        return
+    entries = info.get('entries') if info.get('_type') in ('playlist', 'multi_video') else [info]
+    entries = (e for e in entries or () if e)
+    yield from itertools.islice(entries, max_videos) if max_videos else entries
+
+
 def download_instagram_profile(
     profile_url: str,
     out_dir: str = 'downloads',
@@ -160,150 +375,212 @@ def download_instagram_profile(
     max_videos: int | None = None,
     progress_hook: Callable | None = None,
     log_fn: Callable | None = None,
+    max_workers: int | None = None,
 ) -> tuple[int, int]:
     """Download videos from an Instagram profile.
 
-    Returns: (success_count, total_count)
+    The profile is listed flat (one page of posts at a time) and each post is
+    downloaded by a small worker pool: at most _IG_WORKERS at once, fewer
+    while the adaptive controller holds Instagram back, or exactly
+    *max_workers* if given. Post lookups on instagram.com are paced about
+    _LOOKUP_INTERVAL apart and the gap doubles after a 429 / 403.
+
+    Returns: (success_count, total_count) — one count per listed post.
     """
     os.makedirs(out_dir, exist_ok=True)
-    opts = _build_ig_opts(out_dir, quality, progress_hook)
-    opts['outtmpl'] = os.path.join(out_dir, '%(uploader)s', '%(title)s.%(ext)s')
-    opts['ignoreerrors'] = True
-    if max_videos:
-        opts['playlistend'] = max_videos
-
-    ok = err = 0
-
-    def _hook(d: dict) -> None:
-        nonlocal ok, err
-        if d.get('status') == 'finished':
-            ok += 1
-            if log_fn:
-                fname = d.get('filename', '')
-                if fname:
-                    log_fn(f'Hoàn thành: {os.path.basename(fname)}', 'ok')
-        elif d.get('status') == 'error':
-            err += 1
-        if progress_hook:
-            progress_hook(d)
-
-    opts['progress_hooks'] = [_hook]
-
-    total = 0
+    get_controller('instagram', log_fn)
+
+    def _opts(hook: Callable | None) -> dict:
+        opts = _build_ig_opts(out_dir, quality, hook)
+        opts['outtmpl'] = os.path.join(out_dir, '%(uploader)s', '%(title)s.%(ext)s')
+        return opts
+
+    workers = _WorkerYDLs(_opts, MultiProgress(progress_hook) if progress_hook else None,
+                          out_dir, log_fn)
+    pacer = _Pacer(_LOOKUP_INTERVAL, _LOOKUP_MAX, _LOOKUP_JITTER)
+    download = _gated(_run_download, max_workers)
+    lock = threading.Lock()
+    counts = {'ok': 0, 'total': 0}
+
+    def _task(entry: dict) -> None:
+        metrics.queue_done()
+        if download(workers, pacer, entry, log_fn):
+            with lock:
+                counts['ok'] += 1
+
+    pool_size = max_workers or _IG_WORKERS
+    backlog = threading.BoundedSemaphore(pool_size * 2)   # don't list far ahead of the pool
+
+    def _release(_future) -> None:
+        backlog.release()
+
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(profile_url, download=True)
-            entries = info.get('entries') if info else None
-            if entries is not None:
-                total = len(list(entries))
+        with workers.lister() as lister, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=pool_size) as pool:
+            for entry in _iter_profile_entries(lister, profile_url, max_videos):
+                backlog.acquire()
+                counts['total'] += 1
+                metrics.queue_add()
+                pool.submit(bind(_task), entry).add_done_callback(_release)
     except Exception as e:
+        metrics.record_failure('instagram')
         if log_fn:
             log_fn(f'[Instagram] Lỗi tải profile: {e}', 'err')
+    finally:
+        workers.close()
 
-    return ok, total
+    return counts['ok'], counts['total']
 
 
-def download_instagram_multi(
+def download_instagram_urls(
     urls: list[str],
     out_dir: str = 'downloads',
     quality: str = 'best',
     progress_hook: Callable | None = None,
     log_fn: Callable | None = None,
-) -> tuple[int, int]:
-    """Download multiple Instagram video URLs sequentially.
+    max_workers: int | None = None,
+) -> list[str | None]:
+    """Download several Instagram URLs concurrently.
 
-    Returns: (success_count, total_count)
+    Same pool as download_instagram_profile: up to _IG_WORKERS at once (or
+    exactly *max_workers*), one cookie jar for all workers and jittered
+    pacing of the instagram.com lookups.
+
+    Returns: output filepath (or None on failure) per URL, in input order.
     """
     os.makedirs(out_dir, exist_ok=True)
-    ok = 0
-    for url in urls:
-        fn = download_instagram_video(url, out_dir, quality, progress_hook, log_fn)
-        if fn:
-            ok += 1
-            if log_fn:
-                log_fn(f'Hoàn thành: {os.path.basename(fn)}', 'ok')
-        else:
-            if log_fn:
-                log_fn(f'Thất bại: {url}', 'err')
-    return ok, len(urls)
+    if not urls:
+        return []
+    get_controller('instagram', log_fn)
+    workers = _WorkerYDLs(lambda hook: _build_ig_opts(out_dir, quality, hook),
+                          MultiProgress(progress_hook) if progress_hook else None,
+                          out_dir, log_fn)
+    pacer = _Pacer(_LOOKUP_INTERVAL, _LOOKUP_MAX, _LOOKUP_JITTER)
+    download = _gated(_run_download, max_workers)
+
+    def _task(url: str) -> str | None:
+        metrics.queue_done()
+        return download(workers, pacer, url, log_fn)
+
+    metrics.queue_add(len(urls))
+    try:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(max_workers or _IG_WORKERS, len(urls))) as pool:
+            return list(pool.map(bind(_task), urls))
+    finally:
+        workers.close()
 
 
-def fetch_instagram_video_list(url: str, max_videos: int | None = None,
-                               on_result: Callable[[dict], None] | None = None) -> list[dict]:
-    """Fetch video metadata from an Instagram URL (post, reel, or profile).
+def download_instagram_multi(
+    urls: list[str],
+    out_dir: str = 'downloads',
+    quality: str = 'best',
+    progress_hook: Callable | None = None,
+    log_fn: Callable | None = None,
+    max_workers: int | None = None,
+) -> tuple[int, int]:
+    """Download multiple Instagram video URLs concurrently (see download_instagram_urls).
 
-    Returns list of dicts: {url, title, thumbnail, view_count, duration, uploader,
-                            like_count, comment_count}
+    Returns: (success_count, total_count)
     """
+    files = download_instagram_urls(urls, out_dir, quality, progress_hook, log_fn, max_workers)
+    return sum(1 for f in files if f), len(urls)
+
+
+def _listing_opts() -> dict:
+    """yt-dlp options for metadata-only listing (no download, quiet)."""
     opts: dict = {
         'quiet':              True,
         'no_warnings':        True,
         'skip_download':      True,
         'nocheckcertificate': True,
-        'ignoreerrors':       True,
         'logger':             _NullLogger(),
     }
-    cookie_opts = _cookies_opt()
-    if cookie_opts:
-        opts.update(cookie_opts)
-    if max_videos:
-        opts['playlistend'] = max_videos
+    opts.update(_cookies_opt())
+    return opts
 
-    results: list[dict] = []
+
+def _to_result(entry: dict, url: str) -> dict:
+    """Map one yt-dlp info / flat entry dict to a result dict.
+
+    'flat' is True for profile listing entries, which carry only what the
+    listing page has (see fetch_instagram_video_details).
+    """
+    thumb = ''
+    if entry.get('thumbnails'):
+        thumb = entry['thumbnails'][-1].get('url', '')
+    elif entry.get('thumbnail'):
+        thumb = entry['thumbnail']
+    return {
+        'url':           url,
+        'title':         entry.get('title') or 'Không rõ',
+        'thumbnail':     thumb,
+        'view_count':    entry.get('view_count') or 0,
+        'duration':      entry.get('duration') or 0,
+        'uploader':      entry.get('uploader') or '',
+        'like_count':    entry.get('like_count') or 0,
+        'comment_count': entry.get('comment_count') or 0,
+        'flat':          entry.get('_type') == 'url',
+    }
+
+
+def fetch_instagram_video_details(url: str) -> dict | None:
+    """Full metadata for one post — the second tier after a flat listing.
+
+    Lookups are paced like the download pool's (_details_pacer).
+    """
+    _details_pacer.wait()
     try:
         with _suppress_stderr():
-            with yt_dlp.YoutubeDL(opts) as ydl:
+            with yt_dlp.YoutubeDL(_listing_opts()) as ydl:
                 info = ydl.extract_info(url, download=False)
+    except Exception as e:
+        if is_throttle_error(str(e)):
+            _details_pacer.slow_down()
+        return None
+    if info and info.get('entries'):     # carousel post: first video
+        info = next((e for e in info['entries'] if e), None)
+    info_cache.put(info, url)
+    return _to_result(info, info.get('webpage_url') or url) if info else None
+
+
+def fetch_instagram_video_list(url: str, max_videos: int | None = None,
+                               on_result: Callable[[dict], None] | None = None) -> list[dict]:
+    """Fetch video metadata from an Instagram URL (post, reel, or profile).
+
+    Profiles are listed flat, one page of posts at a time, without looking
+    up each post: the cards get what the listing carries and 'flat': True,
+    and fetch_instagram_video_details fills in the rest on demand.
+
+    Returns list of dicts: {url, title, thumbnail, view_count, duration, uploader,
+                            like_count, comment_count, flat}
+    """
+    results: list[dict] = []
+
+    def _emit(d: dict) -> None:
+        results.append(d)
+        if on_result:
+            on_result(d)
+
+    try:
+        with _suppress_stderr():
+            with yt_dlp.YoutubeDL(_listing_opts()) as ydl:
+                info = ydl.extract_info(url, download=False, process=False)
                 if not info:
                     return results
-
-                entries = info.get('entries')
-                if entries:
-                    for entry in entries:
-                        if entry is None:
-                            continue
-                        thumb = ''
-                        if entry.get('thumbnails'):
-                            thumb = entry['thumbnails'][-1].get('url', '')
-                        elif entry.get('thumbnail'):
-                            thumb = entry['thumbnail']
-
-                        d = {
-                            'url':           entry.get('webpage_url')
-                                             or entry.get('url') or url,
-                            'title':         entry.get('title') or 'Không rõ',
-                            'thumbnail':     thumb,
-                            'view_count':    entry.get('view_count') or 0,
-                            'duration':      entry.get('duration') or 0,
-                            'uploader':      entry.get('uploader') or '',
-                            'like_count':    entry.get('like_count') or 0,
-                            'comment_count': entry.get('comment_count') or 0,
-                        }
-                        results.append(d)
-                        if on_result:
-                            on_result(d)
-                else:
-                    thumb = ''
-                    if info.get('thumbnails'):
-                        thumb = info['thumbnails'][-1].get('url', '')
-                    elif info.get('thumbnail'):
-                        thumb = info['thumbnail']
-
-                    d = {
-                        'url':           info.get('webpage_url')
-                                         or info.get('url') or url,
-                        'title':         info.get('title') or 'Không rõ',
-                        'thumbnail':     thumb,
-                        'view_count':    info.get('view_count') or 0,
-                        'duration':      info.get('duration') or 0,
-                        'uploader':      info.get('uploader') or '',
-                        'like_count':    info.get('like_count') or 0,
-                        'comment_count': info.get('comment_count') or 0,
-                    }
-                    results.append(d)
-                    if on_result:
-                        on_result(d)
+                if info.get('_type') not in ('playlist', 'multi_video'):
+                    try:
+                        # Format selection only (no request): lets the download reuse it
+                        info = ydl.process_ie_result(info, download=False) or info
+                        info_cache.put(info, url)
+                    except Exception:
+                        pass
+                    _emit(_to_result(info, info.get('webpage_url') or url))
+                    return results
+                for entry in _iter_profile_entries(ydl, url, max_videos, info):
+                    _emit(_to_result(entry, entry.get('webpage_url')
+                                     or entry.get('url') or url))
     except Exception:
-        pass
+        pass    # a later page failed — keep what was already listed
 
     return results
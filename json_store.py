@@ -0,0 +1,107 @@
+"""
+json_store.py
+─────────────
+The small JSON files the app keeps its caches and indexes in: fb_tokens.json
+and tt_ids.json next to the app, .video_ids.json and .fingerprints.json at
+the root of a download library.
+
+A JsonStore holds its file's contents in memory, loaded on first use and
+guarded by one lock; subclasses read and change them through _load() and
+write them back with _save() while holding that lock. A missing, truncated
+or hand-broken file loads as _empty(). When the file cannot be written
+(read-only install dir or library) the in-memory copy is kept, so the app
+still works, just without persistence.
+
+A LibraryStore is the FILENAME file at a library root, keyed by paths
+relative to that root; shared() gives one instance per class and root.
+
+    class Cache(JsonStore): ...
+    index = json_store.shared(library_index.VideoIdIndex, 'downloads')
+"""
+
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import TypeVar
+
+
+class JsonStore:
+    """JSON-file backed dict (thread-safe, loaded on first use)."""
+
+    indent: int | None = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data: dict | None = None
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Forget everything and remove the file."""
+        with self._lock:
+            self._data = self._empty()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _empty(self) -> dict:
+        return {}
+
+    def _valid(self, data) -> bool:
+        return isinstance(data, dict)
+
+    def _load(self) -> dict:
+        if self._data is None:
+            data = None
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                pass
+            self._data = data if self._valid(data) else self._empty()
+        return self._data
+
+    def _save(self, data: dict) -> bool:
+        """Replace the file with *data* in one step; False if it could not be written."""
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=self.indent, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            return True
+        except OSError:
+            return False   # read-only location: keep the in-memory copy only
+
+
+class LibraryStore(JsonStore):
+    """The FILENAME store at the root of a download library, keyed by
+    '/'-separated paths relative to that root."""
+
+    FILENAME = ''
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        super().__init__(os.path.join(self.root, self.FILENAME))
+
+    def _rel(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, '/')
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.root, *rel.split('/'))
+
+
+S = TypeVar('S', bound=LibraryStore)
+
+_shared: dict[tuple[type, str], LibraryStore] = {}
+_shared_lock = threading.Lock()
+
+
+def shared(cls: type[S], root: str) -> S:
+    """The *cls* store of library *root* (one per class and directory per process)."""
+    key = (cls, os.path.abspath(root))
+    with _shared_lock:
+        store = _shared.get(key)
+        if store is None:
+            store = _shared[key] = cls(root)
+        return store
@@ -0,0 +1,50 @@
+"""
+lazy_import.py
+──────────────
+Deferred imports for heavy dependencies (yt_dlp, requests, numpy, PIL,
+ffmpeg-python) so the GUI window opens before they are loaded.
+
+    yt_dlp = lazy_module('yt_dlp')      # nothing executed yet
+    yt_dlp.YoutubeDL(opts)              # first attribute access runs the import
+
+The proxy resolves every attribute through importlib.import_module, so the
+real import happens once, under the interpreter's import lock (safe when
+several worker threads touch the module at the same time), and patches made
+to the real module are visible through it.
+
+Because the module name is only a string, PyInstaller cannot see these
+imports — keep every name passed here in the spec files' hiddenimports.
+"""
+
+from __future__ import annotations
+import importlib
+import sys
+from types import ModuleType
+
+
+class _LazyModule(ModuleType):
+    """Module stand-in that imports the real module on first attribute access."""
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self.__name__), attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+def lazy_module(name: str) -> ModuleType:
+    """Return *name* if already imported, otherwise a proxy that imports it on use."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return _LazyModule(name)
+
+
+def is_loaded(name: str) -> bool:
+    """True if *name* has actually been imported."""
+    return name in sys.modules
+
+
+def load(name: str) -> ModuleType:
+    """Import *name* now (e.g. from a background warm-up thread)."""
+    return importlib.import_module(name)
@@ -0,0 +1,188 @@
+"""
+library_index.py
+────────────────
+Library-wide (platform, video ID) → file index, so downloading a video that
+is already in the library costs no network call at all.
+
+Output templates are title based (%(title)s.%(ext)s, %(uploader)s/… for
+profiles), so yt-dlp's own "already downloaded" check only fires after a
+full extraction, and only when the title still produces the same name.
+The index is keyed by yt-dlp's archive ID instead ("TikTok 7301…",
+"Instagram C0ffee…", "Youtube dQw4w9WgXcQ"), which yt-dlp can compute
+from the URL alone:
+
+  single / multi URLs   existing(ydl, url) before extraction → the file
+  profile / playlist    the index is the YoutubeDL's match_filter, so
+                        listed entries already on disk are skipped before
+                        their extraction (skipped(ydl) counts them)
+
+Entries live in .video_ids.json at the library root (paths relative to it,
+a json_store.LibraryStore) and are recorded by an after_move post-processor once a file is final,
+under the ID of the video and, when the URL it was asked for resolves to
+another one (facebook.com/reel/… is handed to the Facebook extractor,
+vm.tiktok.com/… to TikTok), under that URL's ID too.
+An entry whose file has been deleted or moved away no longer counts and
+is dropped, so the video is downloaded again.
+
+    library_index.attach(ydl, out_dir)
+    path = library_index.existing(ydl, url)      # None → download as usual
+"""
+
+from __future__ import annotations
+import functools
+import os
+from collections.abc import Mapping
+
+import json_store
+from lazy_import import lazy_module
+
+yt_dlp = lazy_module('yt_dlp')
+
+
+class VideoIdIndex(json_store.LibraryStore):
+    """JSON-file backed archive ID → path relative to *root* (thread-safe,
+    loaded on first use)."""
+
+    FILENAME = '.video_ids.json'
+
+    def find(self, archive_id: str | None) -> str | None:
+        """Absolute path of the file recorded for *archive_id*, if it still exists."""
+        if not archive_id:
+            return None
+        with self._lock:
+            rel = self._load().get(archive_id)
+            if rel is None:
+                return None
+            path = self._abs(rel)
+            if os.path.isfile(path):
+                return path
+            del self._data[archive_id]
+            self._save(self._data)
+        return None
+
+    def record(self, archive_id: str, path: str) -> None:
+        rel = self._rel(path)
+        with self._lock:
+            data = self._load()
+            if data.get(archive_id) != rel:
+                data[archive_id] = rel
+                self._save(data)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+
+class _Filter:
+    """One YoutubeDL's match_filter: reject videos already in the library.
+
+    yt-dlp asks it about each playlist entry before extracting it
+    (incomplete=True) and about each video before downloading it. Flat
+    entries are only asked about when their extractor returns single
+    videos (TikTok, YouTube); Instagram and Facebook entries are checked
+    by their callers with existing() instead. Rejected videos get no
+    "finished" hook, so they are counted for the callers' totals
+    (skipped()) — by archive ID, as yt-dlp asks more than once per video.
+    """
+
+    def __init__(self, ydl, index: VideoIdIndex):
+        self.ydl = ydl
+        self.index = index
+        self.listed: set[str] = set()      # dropped from a playlist before extraction
+        self.processed: set[str] = set()   # extracted, then not downloaded
+
+    def __call__(self, info: Mapping, *, incomplete=False) -> str | None:
+        if info.get('_type') not in (None, 'video', 'url', 'url_transparent'):
+            return None           # a playlist itself
+        try:
+            aid = archive_id(self.ydl, info)
+            path = self.index.find(aid)
+        except Exception:
+            return None
+        if path is None:
+            return None
+        # incomplete is True for listing entries, a set of field names
+        # before format selection, False before the download
+        (self.listed if incomplete is True else self.processed).add(aid)
+        return f'{info.get("id") or aid}: đã có trong thư viện ({os.path.basename(path)})'
+
+
+def index_for(root: str) -> VideoIdIndex:
+    """The shared index of library *root* (one per directory per process)."""
+    return json_store.shared(VideoIdIndex, root)
+
+
+def archive_id(ydl, target: str | Mapping) -> str | None:
+    """yt-dlp archive ID of a URL or a (flat) info dict, without network access.
+
+    Same lookup yt-dlp's extract_info() does for --download-archive: the
+    first extractor suitable for the URL and the ID in its URL pattern.
+    For a short link (vm.tiktok.com/…) that is the link's own code, which
+    the index knows once a download through that link has been recorded.
+    """
+    if isinstance(target, Mapping):      # playlist entries come as ChainMaps
+        if target.get('id') and (target.get('extractor_key') or target.get('ie_key')):
+            return ydl._make_archive_id(target)
+        target = target.get('url') or target.get('webpage_url') or ''
+    for key, ie in ydl._ies.items():
+        if ie.suitable(target):
+            temp_id = ie.get_temp_id(target)
+            return yt_dlp.utils.make_archive_id(key, temp_id) if temp_id else None
+    return None
+
+
+def existing(ydl, target: str | Mapping) -> str | None:
+    """The library file of *target* if it was downloaded before, else None."""
+    filt = ydl.params.get('match_filter')
+    if not isinstance(filt, _Filter):
+        return None
+    try:
+        return filt.index.find(archive_id(ydl, target))
+    except Exception:
+        return None
+
+
+def skipped(ydl) -> tuple[int, int]:
+    """(listed, processed): videos *ydl* did not download because they are
+    already in the library. Listed ones were dropped from their playlist
+    before extraction, so they are also missing from its processed entries."""
+    filt = ydl.params.get('match_filter')
+    if not isinstance(filt, _Filter):
+        return 0, 0
+    return len(filt.listed), len(filt.processed - filt.listed)
+
+
+@functools.lru_cache(maxsize=None)
+def _pp_class():
+    from yt_dlp.postprocessor.common import PostProcessor
+
+    class LibraryIndexPP(PostProcessor):
+        """Record where each finished video ended up."""
+
+        def __init__(self, index: VideoIdIndex):
+            super().__init__(None)
+            self._index = index
+
+        def run(self, info):
+            path = info.get('filepath')
+            if not (path and os.path.isfile(path)):
+                return [], info
+            ids = {self._downloader._make_archive_id(info)}
+            if info.get('original_url'):
+                try:
+                    ids.add(archive_id(self._downloader, info['original_url']))
+                except Exception:
+                    pass
+            for aid in ids - {None}:
+                self._index.record(aid, path)
+            return [], info
+
+    return LibraryIndexPP
+
+
+def attach(ydl, root: str):
+    """Skip videos already in the index of *root* and keep it up to date."""
+    index = index_for(root)
+    ydl.params['match_filter'] = _Filter(ydl, index)
+    ydl.add_post_processor(_pp_class()(index), when='after_move')
+    return ydl
@@ -0,0 +1,290 @@
+"""
+metrics.py
+──────────
+Process-wide live metrics for downloads, ffmpeg runs and the UI loop.
+
+Feeds:
+  - progress_hook(platform)   yt-dlp progress_hooks → per-job speed / bytes
+  - post_hook(platform)       yt-dlp post_hooks     → one success per finished video
+  - record_failure(platform)                         → one failed job, called where
+                                                        the download_* function gives up
+  - record_playlist(platform, info)                  → its entries that failed
+  - drain(items), queue_add() / queue_done()        → pending jobs in a batch
+  - ffmpeg_line() / ffmpeg_finished()               → encode fps from ffmpeg stats
+  - ui_frame(seconds)                               → render-loop frame time
+
+Read it back with snapshot() (dashboard page) or render_prometheus() /
+start_exporter(port) (text exposition format for a Prometheus scraper).
+"""
+
+from __future__ import annotations
+import re
+import sys
+import threading
+import time
+from typing import Callable
+
+PLATFORMS = ('tiktok', 'youtube', 'facebook', 'instagram')
+
+_JOB_STALE = 10.0   # seconds without progress before a job stops counting as active
+_FPS_RE    = re.compile(rb'fps=\s*([\d.]+)')
+
+_lock = threading.Lock()
+
+_jobs: dict[str, dict] = {}                      # filename → live job state
+_bytes_total: dict[str, int]   = {p: 0 for p in PLATFORMS}
+_ok:          dict[str, int]   = {p: 0 for p in PLATFORMS}
+_failed:      dict[str, int]   = {p: 0 for p in PLATFORMS}
+_queue_depth = 0
+
+_ffmpeg = {'active': 0, 'fps': 0.0, 'runs_ok': 0, 'runs_failed': 0, 'seconds': 0.0}
+_ui     = {'frame': 0.0, 'frame_max': 0.0}
+
+
+# ── Download feeds ───────────────────────────────────────────────────────────
+
+def progress_hook(platform: str) -> Callable[[dict], None]:
+    """Return a yt-dlp progress hook that records speed and bytes for *platform*."""
+    def _hook(d: dict) -> None:
+        key = d.get('filename') or d.get('tmpfilename') or ''
+        status = d.get('status')
+        now = time.monotonic()
+        with _lock:
+            if status == 'downloading':
+                job = _jobs.get(key)
+                if job is None:
+                    job = _jobs[key] = {'platform': platform, 'name': key,
+                                        'done': 0, 'total': 0, 'speed': 0.0}
+                done = d.get('downloaded_bytes') or 0
+                if done > job['done']:
+                    _bytes_total[platform] = _bytes_total.get(platform, 0) + done - job['done']
+                job['done']    = done
+                job['total']   = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+                job['speed']   = d.get('speed') or 0.0
+                job['updated'] = now
+            elif status in ('finished', 'error'):
+                _jobs.pop(key, None)
+    return _hook
+
+
+def post_hook(platform: str) -> Callable[[str], None]:
+    """Return a yt-dlp post hook: called once per fully processed video."""
+    def _hook(_filename: str) -> None:
+        with _lock:
+            _ok[platform] = _ok.get(platform, 0) + 1
+    return _hook
+
+
+def record_failure(platform: str, n: int = 1) -> None:
+    with _lock:
+        _failed[platform] = _failed.get(platform, 0) + n
+
+
+def record_playlist(platform: str, info: dict | None) -> None:
+    """Count the failed entries of a playlist processed with ignoreerrors.
+
+    yt-dlp keeps a None in info['entries'] for each entry it gave up on;
+    the successful ones were already counted by post_hook().
+    """
+    failed = _failed_entries(info or {})
+    if failed:
+        record_failure(platform, failed)
+
+
+def _failed_entries(info: dict) -> int:
+    n = 0
+    for entry in info.get('entries') or ():
+        if entry is None:
+            n += 1
+        elif entry.get('_type') == 'playlist':     # channel tabs
+            n += _failed_entries(entry)
+    return n
+
+
+class ErrorLogger:
+    """Quiet yt-dlp logger: ERROR reports go to stderr, like yt-dlp does
+    with quiet=True, everything else is dropped.
+
+    It does not count failures: an ERROR line may be followed by a retry
+    or a fallback that succeeds, so the download_* functions record the
+    final outcome themselves (record_failure / record_playlist).
+    """
+
+    def __init__(self, platform: str):
+        self.platform = platform
+
+    def debug(self, msg):
+        pass
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        print(msg, file=sys.stderr)
+
+
+def drain(items):
+    """Iterate *items*, counting the ones not yet started as queued jobs."""
+    items = list(items)
+    left = len(items)
+    queue_add(left)
+    try:
+        for item in items:
+            queue_done()
+            left -= 1
+            yield item
+    finally:
+        queue_done(left)
+
+
+def queue_add(n: int = 1) -> None:
+    global _queue_depth
+    with _lock:
+        _queue_depth += n
+
+
+def queue_done(n: int = 1) -> None:
+    global _queue_depth
+    with _lock:
+        _queue_depth = max(0, _queue_depth - n)
+
+
+# ── ffmpeg / UI feeds ────────────────────────────────────────────────────────
+
+def ffmpeg_started() -> None:
+    with _lock:
+        _ffmpeg['active'] += 1
+
+
+def ffmpeg_line(line: bytes) -> None:
+    """Parse one ffmpeg stats line (``frame=… fps=…``) and update the fps gauge."""
+    m = _FPS_RE.search(line)
+    if m:
+        try:
+            fps = float(m.group(1))
+        except ValueError:
+            return
+        with _lock:
+            _ffmpeg['fps'] = fps
+
+
+def ffmpeg_finished(ok: bool, seconds: float) -> None:
+    with _lock:
+        _ffmpeg['active'] = max(0, _ffmpeg['active'] - 1)
+        _ffmpeg['runs_ok' if ok else 'runs_failed'] += 1
+        _ffmpeg['seconds'] += seconds
+
+
+def ui_frame(seconds: float) -> None:
+    """Record one render-loop iteration (exponential moving average)."""
+    with _lock:
+        _ui['frame'] = seconds if not _ui['frame'] else _ui['frame'] * 0.9 + seconds * 0.1
+        _ui['frame_max'] = max(_ui['frame_max'] * 0.99, seconds)
+
+
+# ── Read side ────────────────────────────────────────────────────────────────
+
+def snapshot() -> dict:
+    """Return a consistent copy of all current values."""
+    now = time.monotonic()
+    with _lock:
+        for key in [k for k, j in _jobs.items() if now - j.get('updated', now) > _JOB_STALE]:
+            _jobs.pop(key, None)
+        jobs = [dict(j) for j in _jobs.values()]
+        platforms = {}
+        for p in sorted(set(PLATFORMS) | set(_ok) | set(_failed) | set(_bytes_total)):
+            active = [j for j in jobs if j['platform'] == p]
+            platforms[p] = {
+                'ok':     _ok.get(p, 0),
+                'failed': _failed.get(p, 0),
+                'bytes':  _bytes_total.get(p, 0),
+                'active': len(active),
+                'speed':  sum(j['speed'] for j in active),
+            }
+        return {
+            'jobs':        sorted(jobs, key=lambda j: j['speed'], reverse=True),
+            'platforms':   platforms,
+            'speed':       sum(j['speed'] for j in jobs),
+            'queue_depth': _queue_depth,
+            'ffmpeg':      dict(_ffmpeg),
+            'ui':          dict(_ui),
+        }
+
+
+def render_prometheus() -> str:
+    """Render the current values in Prometheus text exposition format."""
+    s = snapshot()
+    out: list[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, float]]):
+        out.append(f'# HELP {name} {help_text}')
+        out.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            out.append(f'{name}{labels} {value if isinstance(value, int) else float(value)!r}')
+
+    plats = s['platforms'].items()
+    metric('tt_download_speed_bytes', 'gauge', 'Current aggregate download speed.',
+           [(f'{{platform="{p}"}}', v['speed']) for p, v in plats])
+    metric('tt_download_bytes_total', 'counter', 'Bytes downloaded.',
+           [(f'{{platform="{p}"}}', v['bytes']) for p, v in plats])
+    metric('tt_downloads_total', 'counter', 'Finished downloads by result.',
+           [(f'{{platform="{p}",result="ok"}}', v['ok']) for p, v in plats]
+           + [(f'{{platform="{p}",result="error"}}', v['failed']) for p, v in plats])
+    metric('tt_active_downloads', 'gauge', 'Downloads currently transferring.',
+           [(f'{{platform="{p}"}}', v['active']) for p, v in plats])
+    metric('tt_queue_depth', 'gauge', 'Jobs waiting to start.', [('', s['queue_depth'])])
+    ff = s['ffmpeg']
+    metric('tt_ffmpeg_fps', 'gauge', 'Encode fps of the latest ffmpeg run.', [('', ff['fps'])])
+    metric('tt_ffmpeg_active', 'gauge', 'Running ffmpeg processes.', [('', ff['active'])])
+    metric('tt_ffmpeg_runs_total', 'counter', 'ffmpeg runs by result.',
+           [('{result="ok"}', ff['runs_ok']), ('{result="error"}', ff['runs_failed'])])
+    metric('tt_ffmpeg_seconds_total', 'counter', 'Wall time spent in ffmpeg.', [('', ff['seconds'])])
+    metric('tt_ui_frame_seconds', 'gauge', 'Render-loop frame time (moving average).',
+           [('', s['ui']['frame'])])
+    return '\n'.join(out) + '\n'
+
+
+# ── Exporter ─────────────────────────────────────────────────────────────────
+
+_server = None
+
+
+def start_exporter(port: int = 9464, host: str = '0.0.0.0') -> str:
+    """Serve /metrics on *host*:*port* in a daemon thread (idempotent). Returns the URL."""
+    global _server
+    if _server is None:
+        # http.server pulls in http.client / email — keep it off the import path
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True,
+                         name='metrics-exporter').start()
+    bound_host, bound_port = _server.server_address[:2]
+    return f'http://{bound_host}:{bound_port}/metrics'
+
+
+def stop_exporter() -> None:
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -0,0 +1,292 @@
+"""
+results_store.py
+────────────────
+Columnar store for search results (the video grid).
+
+Every fetch_*_video_list() hands back one small dict per video; a 10 000
+video profile kept as 10 000 dicts costs a dict, nine boxed values and a
+repeated uploader string per row.  ResultStore keeps one column per field
+instead:
+
+  view_count / like_count /      array('q')   — contiguous, so NumPy sorts /
+  comment_count / repost_count                  filters them (values())
+  duration                       array('d')     without touching Python ints
+  uploader / platform            array('I')   — codes into an interned pool
+  flat                           bytearray
+  url / title / thumbnail        list[str]
+
+store[i] is a Result: a two-slot view that reads and writes like the old
+dict (video["title"], video.get("like_count", 0), video[key] = value), so
+card code does not care where the values live.
+
+query() answers the grid's sort / filter controls without re-fetching:
+numeric sorts are a NumPy argsort over a column, and text filters look up
+a token index (lower-cased, accent-folded words of title and uploader,
+kept up to date as rows are added or updated) with prefix matching, so
+"viet" finds "Việt Nam" and "dan" finds "dance".
+
+    store = ResultStore()
+    store.append(d, platform="tiktok")     # d: a fetch_*_video_list dict
+    store[0]["title"], len(store)
+    store.query("view_count", text="dance")   # row indices, most viewed first
+"""
+
+from __future__ import annotations
+import bisect
+import re
+import threading
+import unicodedata
+from array import array
+from typing import Iterator
+
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")
+
+# field → array typecode (numeric columns)
+NUMERIC: dict[str, str] = {
+    "view_count":    "q",
+    "like_count":    "q",
+    "comment_count": "q",
+    "repost_count":  "q",
+    "duration":      "d",
+}
+TEXT     = ("url", "title", "thumbnail")
+INTERNED = ("uploader", "platform")
+FIELDS   = TEXT + INTERNED + tuple(NUMERIC) + ("flat",)
+SEARCHED = ("title", "uploader")       # fields covered by the token index
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokens(text: str) -> set[str]:
+    """Lower-cased, accent-folded words of *text* ("Việt Nam!" → {"viet", "nam"})."""
+    text = text.casefold()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text.replace("đ", "d"))
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return set(_WORD_RE.findall(text))
+
+
+class ResultStore:
+    """Append-only result columns (one writer thread, any number of readers).
+
+    Rows become visible to len() / iteration only once every column has
+    its value, so the render thread never sees a half-appended row.
+    """
+
+    def __init__(self):
+        self._n = 0
+        self._lock = threading.Lock()
+        self._num: dict[str, array] = {k: array(t) for k, t in NUMERIC.items()}
+        self._text: dict[str, list[str]] = {k: [] for k in TEXT}
+        self._codes: dict[str, array] = {k: array("I") for k in INTERNED}
+        self._pool: list[str] = []              # code → string
+        self._pool_idx: dict[str, int] = {}     # string → code
+        self._flat = bytearray()
+        self._extra: dict[int, dict] = {}       # row → keys outside FIELDS
+        self._postings: dict[str, array] = {}   # token → rows containing it
+        self._vocab: list[str] = []             # sorted tokens (prefix lookups)
+        self._vocab_dirty = False
+
+    # ── Writing ───────────────────────────────────────────────────────────────
+
+    def append(self, video: dict, platform: str = "") -> int:
+        """Add one result dict; returns its row index."""
+        with self._lock:
+            i = self._n
+            for k in TEXT:
+                self._text[k].append(video.get(k) or "")
+            for k in INTERNED:
+                value = platform if k == "platform" and platform else video.get(k)
+                self._codes[k].append(self._intern(value or ""))
+            for k, col in self._num.items():
+                col.append(_number(video.get(k), col.typecode))
+            self._flat.append(1 if video.get("flat") else 0)
+            extra = {k: v for k, v in video.items() if k not in FIELDS}
+            if extra:
+                self._extra[i] = extra
+            self._index(i, self._row_tokens(i), set())
+            self._n = i + 1
+        return i
+
+    def set(self, i: int, key: str, value) -> None:
+        """Update one field of row *i* (e.g. after a detail fetch)."""
+        with self._lock:
+            if key in SEARCHED:
+                old = self._row_tokens(i)
+                self._set(i, key, value)
+                self._index(i, self._row_tokens(i), old)
+            else:
+                self._set(i, key, value)
+
+    def _set(self, i: int, key: str, value) -> None:
+        if key in self._num:
+            col = self._num[key]
+            col[i] = _number(value, col.typecode)
+        elif key in self._text:
+            self._text[key][i] = value or ""
+        elif key in self._codes:
+            self._codes[key][i] = self._intern(value or "")
+        elif key == "flat":
+            self._flat[i] = 1 if value else 0
+        else:
+            self._extra.setdefault(i, {})[key] = value
+
+    def _row_tokens(self, i: int) -> set[str]:
+        return tokens(f"{self._text['title'][i]} {self._pool[self._codes['uploader'][i]]}")
+
+    def _index(self, i: int, new: set[str], old: set[str]) -> None:
+        for tok in old - new:
+            self._postings[tok].remove(i)
+        for tok in new - old:
+            rows = self._postings.get(tok)
+            if rows is None:
+                rows = self._postings[tok] = array("I")
+                self._vocab_dirty = True
+            rows.append(i)
+
+    def _intern(self, s: str) -> int:
+        code = self._pool_idx.get(s)
+        if code is None:
+            code = self._pool_idx[s] = len(self._pool)
+            self._pool.append(s)
+        return code
+
+    # ── Reading ───────────────────────────────────────────────────────────────
+
+    def value(self, i: int, key: str, default=None):
+        if key in self._num:
+            return self._num[key][i]
+        if key in self._text:
+            return self._text[key][i]
+        if key in self._codes:
+            return self._pool[self._codes[key][i]]
+        if key == "flat":
+            return bool(self._flat[i])
+        return self._extra.get(i, {}).get(key, default)
+
+    def column(self, key: str) -> array:
+        """The raw column for a numeric field (live; see values() for NumPy)."""
+        return self._num[key]
+
+    def values(self, key: str):
+        """A NumPy copy of a numeric column.
+
+        Copied under the lock: an array exporting its buffer cannot grow, so
+        a long-lived np.frombuffer() view would break the next append().
+        """
+        col = self._num[key]
+        dtype = np.float64 if col.typecode == "d" else np.int64
+        with self._lock:
+            return np.frombuffer(col, dtype=dtype, count=self._n).copy()
+
+    def match(self, text: str):
+        """Sorted rows whose title / uploader has a word starting with each
+        word of *text* (None = no filter)."""
+        words = tokens(text)
+        if not words:
+            return None
+        found = None
+        with self._lock:
+            if self._vocab_dirty:
+                self._vocab = sorted(self._postings)
+                self._vocab_dirty = False
+            for word in sorted(words, key=len, reverse=True):
+                lo = bisect.bisect_left(self._vocab, word)
+                hi = bisect.bisect_left(self._vocab, word + "\U0010ffff", lo)
+                parts = [np.frombuffer(self._postings[t], dtype=np.uint32).copy()
+                         for t in self._vocab[lo:hi] if self._postings[t]]
+                rows = np.unique(np.concatenate(parts)) if parts else np.empty(0, np.uint32)
+                found = rows if found is None else np.intersect1d(found, rows,
+                                                                  assume_unique=True)
+                if not len(found):
+                    break
+        return found
+
+    def query(self, sort: str | None = None, descending: bool = True,
+              text: str = "") -> list[int]:
+        """Row indices to show: filtered by *text*, ordered by numeric *sort*
+        (None = listing order).  Ties keep listing order."""
+        rows = self.match(text)
+        if sort is None:
+            return (rows.tolist() if rows is not None else list(range(self._n)))
+        keys = self.values(sort)
+        if rows is not None:
+            keys = keys[rows]
+        order = np.argsort(-keys if descending else keys, kind="stable")
+        return (rows[order] if rows is not None else order).tolist()
+
+    def codes(self, key: str) -> tuple[array, list[str]]:
+        """(per-row codes, code → string pool) of an interned field."""
+        return self._codes[key], self._pool
+
+    def row(self, i: int) -> dict:
+        """Row *i* as a plain dict."""
+        d = {k: self.value(i, k) for k in FIELDS}
+        d.update(self._extra.get(i, {}))
+        return d
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> Result:
+        if not -self._n <= i < self._n:
+            raise IndexError(i)
+        return Result(self, i % self._n)
+
+    def __iter__(self) -> Iterator[Result]:
+        for i in range(self._n):
+            yield Result(self, i)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (excluding shared strings)."""
+        n = sum(c.itemsize * len(c) for c in self._num.values())
+        n += sum(c.itemsize * len(c) for c in self._codes.values())
+        n += len(self._flat) + 8 * self._n * len(TEXT)
+        return n
+
+
+class Result:
+    """Dict-like view of one ResultStore row."""
+
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: ResultStore, i: int):
+        self._store = store
+        self._i = i
+
+    @property
+    def index(self) -> int:
+        return self._i
+
+    def __getitem__(self, key: str):
+        value = self._store.value(self._i, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default=None):
+        return self._store.value(self._i, key, default)
+
+    def __setitem__(self, key: str, value) -> None:
+        self._store.set(self._i, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in FIELDS or key in self._store._extra.get(self._i, ())
+
+    def to_dict(self) -> dict:
+        return self._store.row(self._i)
+
+    def __repr__(self) -> str:
+        return f"Result({self._i}, {self.get('url')!r})"
+
+
+_MISSING = object()
+
+
+def _number(value, typecode: str):
+    try:
+        return float(value or 0) if typecode == "d" else int(value or 0)
+    except (TypeError, ValueError):
+        return 0
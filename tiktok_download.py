@@ -1,10 +1,26 @@
-import yt_dlp
 import os
 import re
-import io
-import sys
-from contextlib import contextmanager
-import requests
+import heapq
+import random
+import threading
+import time
+import itertools
+import concurrent.futures
+from typing import Callable, Iterator
+
+import dedupe
+import http_pool
+import info_cache
+import library_index
+import metrics
+import transfer
+from concurrency import MAX_WORKERS, MultiProgress, get_controller, is_throttle_error
+from lazy_import import lazy_module
+from tracing import bind, traced, ydl_phases
+from tt_ids import cache as id_cache, username_of
+
+yt_dlp   = lazy_module('yt_dlp')
+requests = lazy_module('requests')
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -19,25 +35,16 @@ def is_tiktok_url(url: str) -> bool:
     return bool(_TT_URL_RE.match(url.strip()))
 
 
-@contextmanager
-def _suppress_stderr():
-    """Temporarily redirect stderr to devnull (suppress yt-dlp ERROR lines)."""
-    old = sys.stderr
-    sys.stderr = io.StringIO()
-    try:
-        yield
-    finally:
-        sys.stderr = old
-
-
 # ── Shared yt-dlp options for TikTok (applied to all functions) ───────────────
 # TikTok cookie file — auto-detected from project folder
 _TT_COOKIE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tiktok_cookies.txt')
 
 
+@traced('build_opts', 'tiktok')
 def _build_tt_opts(output_path: str, extra: dict | None = None,
                    progress_hook=None) -> dict:
     cookies = _TT_COOKIE_FILE if os.path.exists(_TT_COOKIE_FILE) else None
+    ctl = get_controller('tiktok')
     opts: dict = {
         'format':       'bestvideo+bestaudio/best',  # prefer separate streams → higher quality
         'outtmpl':      os.path.join(output_path, '%(title)s.%(ext)s'),
@@ -50,13 +57,17 @@ def _build_tt_opts(output_path: str, extra: dict | None = None,
         'nocheckcertificate': True,
         'retries':            10,
         'fragment_retries':   10,
-        'http_chunk_size':    10 * 1024 * 1024,  # 10 MB chunks
         'socket_timeout':     30,
+        'concurrent_fragment_downloads': ctl.fragments,
+        'logger':             ctl.logger(metrics.ErrorLogger('tiktok')),
+        'progress_hooks':     [ctl.observe, metrics.progress_hook('tiktok')],
+        'post_hooks':         [metrics.post_hook('tiktok')],
     }
+    opts.update(transfer.base_opts('tiktok'))
     if cookies:
         opts['cookiefile'] = cookies
     if progress_hook:
-        opts['progress_hooks'] = [progress_hook]
+        opts['progress_hooks'].append(progress_hook)
     if extra:
         opts.update(extra)
     return opts
@@ -71,13 +82,46 @@ class _NullLogger:
     def error(self, msg): pass
 
 
+_CANDIDATE_VIDEOS  = 10   # profile videos tried for a channel_id
+_CANDIDATE_WORKERS = 4    # ... at the same time
+
+
+@traced('resolve_secuid', 'tiktok')
 def _resolve_channel_id(profile_url: str) -> str | None:
     """Try to obtain a TikTok channel_id so we can use 'tiktokuser:<id>'.
 
+    Results are cached per username in tt_ids.json (one lookup per week).
+    """
+    username = username_of(profile_url)
+    if username:
+        entry = id_cache.get(username)
+        if entry and entry.get('channel_id'):
+            return entry['channel_id']
+    channel_id = _lookup_channel_id(profile_url)
+    if channel_id and username:
+        id_cache.put(username, channel_id=channel_id)
+    return channel_id
+
+
+def _channel_id_from_video(video_url: str, opts: dict) -> str | None:
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(video_url, download=False)
+    except Exception:
+        return None
+    if info:
+        return info.get('channel_id') or info.get('uploader_id')
+    return None
+
+
+def _lookup_channel_id(profile_url: str) -> str | None:
+    """Look up a channel_id for a profile (uncached).
+
     Strategy:
       1. Fetch the profile HTML and look for secUid in embedded JSON.
-      2. If not found, try each video URL on the page until one yields a
-         channel_id (some videos may be login-gated).
+      2. If not found, try the video URLs on the page concurrently; the
+         first one that yields a channel_id wins (some videos may be
+         login-gated).
     """
     cookies_file = _TT_COOKIE_FILE if os.path.exists(_TT_COOKIE_FILE) else None
 
@@ -90,7 +134,7 @@ def _resolve_channel_id(profile_url: str) -> str | None:
         'Accept-Language': 'en-US,en;q=0.9',
     }
 
-    session = requests.Session()
+    session = http_pool.new_session()
     if cookies_file:
         try:
             from http.cookiejar import MozillaCookieJar
@@ -132,18 +176,21 @@ def _resolve_channel_id(profile_url: str) -> str | None:
             opts['cookiefile'] = cookies_file
 
         # Try up to 10 videos — some may be age-gated / login-required
-        for vid_id in unique_vids[:10]:
-            video_url = f'https://www.tiktok.com/@_/video/{vid_id}'
-            try:
-                with _suppress_stderr():
-                    with yt_dlp.YoutubeDL(opts) as ydl:
-                        info = ydl.extract_info(video_url, download=False)
-                        if info:
-                            cid = info.get('channel_id') or info.get('uploader_id')
-                            if cid:
-                                return cid
-            except Exception:
-                continue
+        candidates = [f'https://www.tiktok.com/@_/video/{v}'
+                      for v in unique_vids[:_CANDIDATE_VIDEOS]]
+        if not candidates:
+            return None
+        pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(_CANDIDATE_WORKERS, len(candidates)),
+            thread_name_prefix='tt-secuid')
+        try:
+            futures = [pool.submit(_channel_id_from_video, u, opts) for u in candidates]
+            for fut in concurrent.futures.as_completed(futures):
+                cid = fut.result()
+                if cid:
+                    return cid
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
     except Exception:
         pass
 
@@ -164,164 +211,458 @@ def download_tiktok_video(url, output_path='downloads', progress_hook=None):
 
     try:
         with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            if info:
-                filename = ydl.prepare_filename(info)
+            transfer.attach(ydl, 'tiktok')
+            dedupe.attach(ydl, output_path)
+            library_index.attach(ydl, output_path)
+            filename = _fetch(ydl, url)
+            if filename:
                 return filename
     except Exception:
         pass
+    metrics.record_failure('tiktok')
     return None
 
 
-def download_from_profile(profile_url, output_path='downloads', max_videos=None,
-                          progress_hook=None, log_fn=None):
+def _fetch(ydl, url: str) -> str | None:
+    """Download *url* with *ydl*; yt-dlp errors propagate to the caller.
+
+    A video already in the library index is answered without a request.
     """
-    Tải tất cả video từ một profile TikTok
+    path = library_index.existing(ydl, url)
+    if path:
+        return path
+    with ydl_phases(ydl, url):
+        info = info_cache.extract(ydl, url)
+    return ydl.prepare_filename(info) if info else None
+
+
+# ── Multi-URL download ────────────────────────────────────────────────────────
+_MULTI_RETRIES = 2      # extra attempts per URL after the first failure
+_RETRY_BASE    = 2.0    # seconds; doubled per attempt, with jitter
+
+# Errors that another attempt will not fix
+_PERMANENT_MARKERS = (
+    'unsupported url', 'is private', 'not available',
+    'has been removed', 'does not exist',
+)
 
-    Args:
-        profile_url: Link profile TikTok (vd: https://www.tiktok.com/@username)
-        output_path: Thư mục lưu video
-        max_videos: Số lượng video tối đa tải (None = tất cả)
-        progress_hook: callback yt-dlp progress (optional)
-        log_fn: optional logging callback (text, tag) – for UI feedback
+
+def _retry_delay(attempt: int, message: str) -> float | None:
+    """Seconds to wait before retrying after *message*, or None to give up."""
+    text = message.lower()
+    if attempt >= _MULTI_RETRIES or any(m in text for m in _PERMANENT_MARKERS):
+        return None
+    delay = _RETRY_BASE * (2 ** attempt) * (1 + random.random())
+    if is_throttle_error(text):
+        delay *= 3      # the controller has halved the workers too
+    return delay
+
+
+class _RetryQueue:
+    """Work queue where failed URLs come back after a delay.
+
+    Items are (ready_at, seq, url, attempt) on a heap: fresh URLs are ready
+    immediately, retries only once their backoff has passed, so a worker
+    never sleeps on one URL while others are waiting.
+    """
+
+    def __init__(self, urls: list[str]):
+        self._seq   = itertools.count()
+        self._heap  = [(0.0, next(self._seq), u, 0) for u in urls]
+        self._left  = len(urls)         # URLs not finished yet (queued or running)
+        self._cond  = threading.Condition()
+        self.closed = False
+
+    def get(self) -> tuple[str, int] | None:
+        """Block until a URL is due; None once every URL is finished."""
+        with self._cond:
+            while True:
+                if self.closed or self._left == 0:
+                    return None
+                if self._heap:
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        _, _, url, attempt = heapq.heappop(self._heap)
+                        metrics.queue_done()
+                        return url, attempt
+                else:
+                    wait = None
+                self._cond.wait(wait)
+
+    def retry(self, url: str, attempt: int, delay: float) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), url, attempt))
+            metrics.queue_add()
+            self._cond.notify()
+
+    def done(self) -> None:
+        with self._cond:
+            self._left -= 1
+            if self._left == 0:
+                self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            metrics.queue_done(len(self._heap))
+            self._heap.clear()
+            self._cond.notify_all()
+
+
+def download_tiktok_multi(
+    urls: list[str],
+    output_path: str = 'downloads',
+    progress_hook: Callable | None = None,
+    log_fn: Callable | None = None,
+    max_workers: int | None = None,
+) -> tuple[int, int]:
+    """Download several TikTok video URLs concurrently.
+
+    Each worker thread keeps one YoutubeDL (cookies, HTTP connections and
+    extractor state are set up once, not per URL). With max_workers=None
+    the number of simultaneous downloads follows the adaptive controller;
+    an explicit value pins it. A failed URL is retried up to _MULTI_RETRIES
+    times with exponential backoff — longer after 429 / 403 — while the
+    other URLs keep downloading. *progress_hook* receives the combined
+    progress of all files in flight.
+
+    Returns: (success_count, total_count)
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return 0, 0
+    os.makedirs(output_path, exist_ok=True)
+    ctl = get_controller('tiktok', log_fn)
+    progress = MultiProgress(progress_hook) if progress_hook else None
+    pool_size = min(max_workers or MAX_WORKERS, len(urls))
+    if log_fn:
+        log_fn(f'[TikTok] Đang tải {len(urls)} URL '
+               f'(workers={max_workers or f"auto ({ctl.workers})"})...', 'info')
+
+    work = _RetryQueue(urls)
+    metrics.queue_add(len(urls))
+    lock = threading.Lock()
+    counts = {'ok': 0, 'failed': 0}
+    ydls: list = []
+
+    def _report(url: str, filename: str | None) -> None:
+        with lock:
+            counts['ok' if filename else 'failed'] += 1
+            finished = counts['ok'] + counts['failed']
+        if not filename:
+            metrics.record_failure('tiktok')
+        if not log_fn:
+            return
+        if filename:
+            log_fn(f'Hoàn thành: {os.path.basename(filename)}', 'ok')
+        else:
+            log_fn(f'Thất bại: {url}', 'err')
+        log_fn(f'[TikTok] {finished}/{len(urls)} xong '
+               f'({counts["ok"]} thành công, {counts["failed"]} lỗi)', 'info')
+
+    def _attempt(ydl, url: str) -> tuple[str | None, str]:
+        ydl.params['concurrent_fragment_downloads'] = ctl.fragments
+        try:
+            if max_workers:
+                return _fetch(ydl, url), ''
+            with ctl.slot():
+                return _fetch(ydl, url), ''
+        except Exception as e:
+            return None, str(e)
+
+    def _worker() -> None:
+        try:
+            _work_loop()
+        except Exception:
+            work.close()    # don't leave the other workers waiting on our URL
+            raise
+
+    def _work_loop() -> None:
+        ydl = None
+        worker = threading.get_ident()
+        while True:
+            item = work.get()
+            if item is None:
+                break
+            url, attempt = item
+            if ydl is None:
+                ydl = transfer.attach(yt_dlp.YoutubeDL(_build_tt_opts(
+                    output_path, progress_hook=progress.feed(worker) if progress else None)), 'tiktok')
+                dedupe.attach(ydl, output_path, log_fn)
+                library_index.attach(ydl, output_path)
+                with lock:
+                    ydls.append(ydl)
+            filename, error = _attempt(ydl, url)
+            if progress:
+                progress.clear(worker)
+            if not filename and error:
+                ctl.record_error(error)
+                delay = _retry_delay(attempt, error)
+                if delay is not None and not work.closed:
+                    if log_fn:
+                        log_fn(f'[TikTok] Thử lại sau {delay:.0f}s '
+                               f'({attempt + 1}/{_MULTI_RETRIES}): {url}', 'warn')
+                    work.retry(url, attempt + 1, delay)
+                    continue
+            _report(url, filename)
+            work.done()
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=pool_size) as pool:
+            for future in [pool.submit(bind(_worker)) for _ in range(pool_size)]:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+    finally:
+        work.close()
+        for ydl in ydls:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+    return counts['ok'], len(urls)
+
+
+_SECUID_ERROR = 'Unable to extract secondary user ID'
+
+
+def _is_profile_url(url: str) -> bool:
+    return bool(username_of(url)) and '/video/' not in url and '/photo/' not in url
+
+
+def _extract_lazy(ydl, url: str) -> dict | None:
+    """extract_info(process=False) that raises instead of reporting errors.
+
+    For a profile this runs the part that can fail (profile page, secUid)
+    but leaves the entries as an unstarted generator.
+    """
+    params = ydl.params
+    saved = params.get('ignoreerrors'), params.get('logger')
+    params['ignoreerrors'], params['logger'] = False, _NullLogger()
+    try:
+        return ydl.extract_info(url, download=False, process=False)
+    finally:
+        params['ignoreerrors'], params['logger'] = saved
+
+
+def _preflight(ydl, url: str, log_fn=None) -> dict | None:
+    """Extract *url* unprocessed in whichever form works: as given, or
+    'tiktokuser:<channel_id>' when yt-dlp cannot get the profile's secUid.
+
+    Profiles that need the fallback are remembered in tt_ids.json, so later
+    runs go straight to it instead of failing the @user form first. Errors
+    other than the secUid one are raised.
     """
     def _info(msg):
         if log_fn:
             log_fn(msg, "info")
 
-    def _do_download(url, suppress_stderr=False):
-        extra: dict = {
-            'outtmpl': os.path.join(output_path, '%(uploader)s', '%(title)s.%(ext)s'),
-            'ignoreerrors': True,   # skip unavailable videos in profile
-        }
-        if max_videos:
-            extra['playlistend'] = max_videos
-        if suppress_stderr:
-            extra['logger'] = _NullLogger()
-        opts = _build_tt_opts(output_path, extra=extra, progress_hook=progress_hook)
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            return info is not None
-
-    os.makedirs(output_path, exist_ok=True)
+    username = username_of(url) if _is_profile_url(url) else None
+    cached = id_cache.get(username) if username else None
+    if cached and cached.get('form') == 'tiktokuser' and cached.get('channel_id'):
+        try:
+            return _extract_lazy(ydl, f"tiktokuser:{cached['channel_id']}")
+        except Exception:
+            id_cache.drop(username)        # stale id — start over
 
-    # ── 1. Normal attempt (suppress stderr to avoid ERROR leaking) ───────
     try:
-        with _suppress_stderr():
-            return _do_download(profile_url, suppress_stderr=True)
+        return _extract_lazy(ydl, url)
     except Exception as e:
-        err_msg = str(e)
-        if 'Unable to extract secondary user ID' not in err_msg:
-            # Unrelated error – give up
-            return False
+        if _SECUID_ERROR not in str(e):
+            raise
 
-    # ── 2. Fallback: resolve channel_id ──────────────────────────────────
     _info("[TikTok] secUid không trích xuất được — đang thử lấy channel_id…")
-    channel_id = _resolve_channel_id(profile_url)
+    channel_id = _resolve_channel_id(url)
     if not channel_id:
         _info("[TikTok] Không tìm được channel_id. Hãy thử dùng link video thay vì profile.")
-        return False
-
+        return None
     alt_url = f"tiktokuser:{channel_id}"
     _info(f"[TikTok] Dùng channel_id fallback: {alt_url}")
+    info = _extract_lazy(ydl, alt_url)
+    if info and username:
+        id_cache.put(username, channel_id=channel_id, form='tiktokuser')
+    return info
+
+
+def download_from_profile(profile_url, output_path='downloads', max_videos=None,
+                          progress_hook=None, log_fn=None):
+    """
+    Tải tất cả video từ một profile TikTok
+
+    Args:
+        profile_url: Link profile TikTok (vd: https://www.tiktok.com/@username)
+        output_path: Thư mục lưu video
+        max_videos: Số lượng video tối đa tải (None = tất cả)
+        progress_hook: callback yt-dlp progress (optional)
+        log_fn: optional logging callback (text, tag) – for UI feedback
+
+    The working URL form is settled by _preflight before anything is
+    downloaded, and its (still lazy) result is processed by the same
+    YoutubeDL — the profile is extracted once.
+    """
+    os.makedirs(output_path, exist_ok=True)
+    extra: dict = {
+        'outtmpl': os.path.join(output_path, '%(uploader)s', '%(title)s.%(ext)s'),
+        'ignoreerrors': True,   # skip unavailable videos in profile
+    }
+    if max_videos:
+        extra['playlistend'] = max_videos
+    opts = _build_tt_opts(output_path, extra=extra, progress_hook=progress_hook)
 
     try:
-        return _do_download(alt_url)
+        with transfer.attach(yt_dlp.YoutubeDL(opts), 'tiktok') as ydl, ydl_phases(ydl, profile_url):
+            dedupe.attach(ydl, output_path, log_fn)
+            library_index.attach(ydl, output_path)
+            info = _preflight(ydl, profile_url, log_fn)
+            if info:
+                result = ydl.process_ie_result(info, download=True)
+                metrics.record_playlist('tiktok', result)
+                if result is not None:
+                    return True
     except Exception:
         pass
+    metrics.record_failure('tiktok')
     return False
 
 
-def fetch_tiktok_video_list(url: str, max_videos: int | None = None,
-                            on_result=None) -> list[dict]:
-    """Fetch video metadata from a TikTok URL (video or profile).
+def _to_result(entry: dict, url: str) -> dict:
+    """Map one yt-dlp info / flat entry dict to a result dict.
 
-    Returns list of dicts: {url, title, thumbnail, view_count, duration, uploader}
+    'flat' is True for profile listing entries, which carry only what the
+    listing API returns (see fetch_tiktok_video_details).
     """
-    cookies = _TT_COOKIE_FILE if os.path.exists(_TT_COOKIE_FILE) else None
+    thumb = ""
+    if entry.get("thumbnails"):
+        thumb = entry["thumbnails"][-1].get("url", "")
+    elif entry.get("thumbnail"):
+        thumb = entry["thumbnail"]
+    return {
+        "url":           url,
+        "title":         entry.get("title") or "Không rõ",
+        "thumbnail":     thumb,
+        "view_count":    entry.get("view_count") or 0,
+        "duration":      entry.get("duration") or 0,
+        "uploader":      entry.get("uploader") or "",
+        "like_count":    entry.get("like_count") or 0,
+        "comment_count": entry.get("comment_count") or 0,
+        "repost_count":  entry.get("repost_count") or entry.get("share_count") or 0,
+        "flat":          entry.get("_type") == "url",
+    }
 
-    def _try_extract(target_url):
-        opts = {
-            "quiet":              True,
-            "no_warnings":        True,
-            "skip_download":      True,
-            "nocheckcertificate": True,
-            "ignoreerrors":       True,
-            "logger":             _NullLogger(),
-        }
-        if cookies:
-            opts["cookiefile"] = cookies
-        if max_videos:
-            opts["playlistend"] = max_videos
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            return ydl.extract_info(target_url, download=False)
-
-    def _parse_info(info, on_result_cb=None):
-        results = []
-        if not info:
-            return results
-        entries = info.get("entries")
-        if entries:
-            for entry in entries:
-                if entry is None:
-                    continue
-                thumb = ""
-                if entry.get("thumbnails"):
-                    thumb = entry["thumbnails"][-1].get("url", "")
-                elif entry.get("thumbnail"):
-                    thumb = entry["thumbnail"]
-                d = {
-                    "url":           entry.get("url") or entry.get("webpage_url") or "",
-                    "title":         entry.get("title") or "Không rõ",
-                    "thumbnail":     thumb,
-                    "view_count":    entry.get("view_count") or 0,
-                    "duration":      entry.get("duration") or 0,
-                    "uploader":      entry.get("uploader") or "",
-                    "like_count":    entry.get("like_count") or 0,
-                    "comment_count": entry.get("comment_count") or 0,
-                    "repost_count":  entry.get("repost_count") or entry.get("share_count") or 0,
-                }
-                results.append(d)
-                if on_result_cb:
-                    on_result_cb(d)
-        else:
-            thumb = ""
-            if info.get("thumbnails"):
-                thumb = info["thumbnails"][-1].get("url", "")
-            elif info.get("thumbnail"):
-                thumb = info["thumbnail"]
-            d = {
-                "url":           info.get("webpage_url") or url,
-                "title":         info.get("title") or "Không rõ",
-                "thumbnail":     thumb,
-                "view_count":    info.get("view_count") or 0,
-                "duration":      info.get("duration") or 0,
-                "uploader":      info.get("uploader") or "",
-                "like_count":    info.get("like_count") or 0,
-                "comment_count": info.get("comment_count") or 0,
-                "repost_count":  info.get("repost_count") or info.get("share_count") or 0,
-            }
+
+def _parse_info(info: dict | None, url: str, on_result_cb=None) -> list[dict]:
+    """Turn a yt-dlp info dict (single video or playlist) into result dicts."""
+    results = []
+    if not info:
+        return results
+    entries = info.get("entries")
+    if entries:
+        for entry in entries:
+            if entry is None:
+                continue
+            d = _to_result(entry, entry.get("url") or entry.get("webpage_url") or "")
             results.append(d)
             if on_result_cb:
                 on_result_cb(d)
-        return results
+    else:
+        d = _to_result(info, info.get("webpage_url") or url)
+        results.append(d)
+        if on_result_cb:
+            on_result_cb(d)
+    return results
+
+
+def _listing_opts() -> dict:
+    """yt-dlp options for metadata-only listing (no download, quiet)."""
+    opts = {
+        "quiet":              True,
+        "no_warnings":        True,
+        "skip_download":      True,
+        "nocheckcertificate": True,
+        "logger":             _NullLogger(),
+    }
+    if os.path.exists(_TT_COOKIE_FILE):
+        opts["cookiefile"] = _TT_COOKIE_FILE
+    return opts
 
-    # Try normal extraction
+
+def _iter_entries(ydl, info: dict | None, url: str,
+                  max_videos: int | None) -> Iterator[dict]:
+    """Yield result dicts from an unprocessed (process=False) info dict."""
+    # Short links (vm.tiktok.com / vt.tiktok.com) come back as url results
+    for _ in range(3):
+        if not info or info.get("_type") not in ("url", "url_transparent"):
+            break
+        info = ydl.extract_info(info["url"], ie_key=info.get("ie_key"),
+                                download=False, process=False)
+    if not info:
+        return
+    if info.get("_type") != "playlist":
+        try:
+            # Format selection only (no request): lets the download reuse it
+            info = ydl.process_ie_result(info, download=False) or info
+            info_cache.put(info, url)
+        except Exception:
+            pass
+        yield _to_result(info, info.get("webpage_url") or url)
+        return
+    # The user extractor's entries are a generator that downloads one API
+    # page at a time; islice stops it before fetching past max_videos.
+    entries = (e for e in info.get("entries") or () if e)
     try:
-        with _suppress_stderr():
-            info = _try_extract(url)
-            return _parse_info(info, on_result)
-    except Exception as e:
-        if 'Unable to extract secondary user ID' not in str(e):
-            return []
+        for entry in itertools.islice(entries, max_videos or None):
+            yield _to_result(entry, entry.get("url") or entry.get("webpage_url") or "")
+    except Exception:
+        return      # a later page failed — keep what was already listed
 
-    # Fallback: resolve channel_id
-    channel_id = _resolve_channel_id(url)
-    if not channel_id:
-        return []
 
+def iter_tiktok_videos(url: str, max_videos: int | None = None) -> Iterator[dict]:
+    """Yield result dicts for a TikTok video or profile as they are listed.
+
+    Profiles stream page by page: the first results arrive after the first
+    API page instead of after the whole profile, and no page beyond
+    *max_videos* is requested. Falls back to 'tiktokuser:<channel_id>' when
+    yt-dlp cannot extract the secUid (see _preflight).
+    """
+    with yt_dlp.YoutubeDL(_listing_opts()) as ydl:
+        try:
+            info = _preflight(ydl, url)
+        except Exception:
+            return
+        yield from _iter_entries(ydl, info, url, max_videos)
+
+
+def fetch_tiktok_video_details(url: str) -> dict | None:
+    """Full metadata for one video — the second tier after a flat listing.
+
+    Profile listings only carry what the listing API returns; call this for
+    the entries the user actually looks at or selects.
+    """
+    try:
+        with yt_dlp.YoutubeDL(_listing_opts()) as ydl:
+            info = ydl.extract_info(url, download=False)
+    except Exception:
+        return None
+    info_cache.put(info, url)
+    return _to_result(info, info.get("webpage_url") or url) if info else None
+
+
+def fetch_tiktok_video_list(url: str, max_videos: int | None = None,
+                            on_result=None) -> list[dict]:
+    """Fetch video metadata from a TikTok URL (video or profile).
+
+    *on_result* is called for each video as soon as its page is listed.
+    Profile entries are flat (no formats); see fetch_tiktok_video_details.
+
+    Returns list of dicts: {url, title, thumbnail, view_count, duration, uploader, flat}
+    """
+    results: list[dict] = []
     try:
-        info = _try_extract(f"tiktokuser:{channel_id}")
-        return _parse_info(info, on_result)
+        for d in iter_tiktok_videos(url, max_videos):
+            results.append(d)
+            if on_result:
+                on_result(d)
     except Exception:
-        return []
+        pass
+    return results
@@ -4,16 +4,14 @@ import queue
 import time
 import threading
 import subprocess
-import urllib.request
+from collections import deque
 from io import BytesIO
 from datetime import datetime
 
-import numpy as np
-from PIL import Image
 import dearpygui.dearpygui as dpg
 
-from tiktok_download import (download_tiktok_video, download_from_profile,
-                              is_tiktok_url, fetch_tiktok_video_list)
+from tiktok_download import (download_tiktok_video, download_tiktok_multi, download_from_profile,
+                              is_tiktok_url, fetch_tiktok_video_list, fetch_tiktok_video_details)
 from youtube_download import (download_youtube_video, download_youtube_playlist,
                                download_youtube_multi, download_youtube_channel,
                                QUALITY_OPTIONS, get_youtube_runtime_context,
@@ -23,8 +21,22 @@ from facebook_download import (download_facebook_video, download_facebook_multi,
                                 is_facebook_url, fetch_facebook_video_list)
 from instagram_download import (download_instagram_video, download_instagram_profile,
                                  download_instagram_multi,
-                                 is_instagram_url, fetch_instagram_video_list)
+                                 is_instagram_url, fetch_instagram_video_list,
+                                 fetch_instagram_video_details)
+import dedupe
+import library_index
 import video_edit
+import metrics
+from concurrency import get_controller
+from results_store import Result, ResultStore
+from lazy_import import lazy_module
+from tracing import Trace
+import warmup
+
+# Heavy imports deferred until first use (thumbnails / logo fallback)
+np         = lazy_module("numpy")
+Image      = lazy_module("PIL.Image")
+urlrequest = lazy_module("urllib.request")
 
 # ── Layout constants ───────────────────────────────────────────────────────────
 _SIDEBAR_W = 145
@@ -37,14 +49,41 @@ _CARD_W    = 220   # video card total width
 _CARD_H    = 215   # video card total height  — spacer(6)+thumb(108)+title(17)+views(17)+stats(17)+sel(17)+IS between items
 _GRID_BATCH = 24   # cards rendered per batch (initial + each "load more")
 
+# Second-tier metadata for cards that came from a flat listing (platform → fetcher)
+_DETAIL_FETCHERS = {
+    "tiktok":    fetch_tiktok_video_details,
+    "instagram": fetch_instagram_video_details,
+}
+# Grid sort options (label → numeric result field, None = listing order)
+_SORT_KEYS = {
+    "Thứ tự gốc":  None,
+    "Lượt xem":    "view_count",
+    "Lượt thích":  "like_count",
+    "Bình luận":   "comment_count",
+    "Chia sẻ":     "repost_count",
+    "Thời lượng":  "duration",
+}
+_TRACE_DIR  = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces")
+_TRACE_KEEP = 20            # newest trace files kept when saving is on
+
 # ── Navigation items (page_id, label with icon) ───────────────────────────────
 _NAV_ITEMS = [
     ("download", "Tải Video"),
     ("library",  "Thư Viện"),
     ("edit",     "Chỉnh Sửa"),
     ("batch",    "Batch Edit"),
+    ("metrics",  "Giám Sát"),
 ]
 
+# page_id → App builder method; only "download" is built at startup
+_PAGE_BUILDERS = {
+    "download": "_build_download_page",
+    "library":  "_build_library_page",
+    "edit":     "_build_edit_page",
+    "batch":    "_build_batch_page",
+    "metrics":  "_build_metrics_page",
+}
+
 # ── Color palette  (R, G, B, A  —  0‑255) ─────────────────────────────────────
 _CA      = (238,  29,  82, 255)   # accent (TikTok pink-red)
 _CA_H    = (200,  24,  70, 255)   # accent hover
@@ -84,7 +123,7 @@ class App:
         self._current_edit_tab: str         = "Resize"   # tracks selected tab
         self._current_dl_platform: str      = "tiktok"   # tracks active download platform
         # ── Search / Grid state ───────────────────────────────────────────
-        self._search_results: list[dict]    = []          # fetched video info dicts
+        self._search_results: ResultStore   = ResultStore()  # fetched videos (columnar)
         self._search_selected: set[int]     = set()       # indices of selected videos
         self._thumb_textures: dict[int, str] = {}         # index → texture tag
         self._thumb_counter: int            = 0           # unique texture tag counter
@@ -92,7 +131,18 @@ class App:
         self._grid_rendered_count: int      = 0            # how many cards currently rendered
         self._grid_current_row_tag: str | None = None      # tag of current (possibly incomplete) row
         self._grid_cols: int                = 4            # columns per row (recalculated on search)
+        self._grid_order: list[int] | None  = None         # result rows in grid order (None = listing order)
+        self._grid_sort: str | None         = None         # numeric field the grid is sorted by
+        self._grid_desc: bool               = True         # sort direction
+        self._grid_filter: str              = ""           # keyword filter (title / uploader)
+        self._grid_view_pending: bool       = False        # a view update is queued for the render thread
         self._searching: bool               = False       # search in progress flag
+        self._search_gen: int               = 0           # bumped per search (drops stale detail fetches)
+        self._detail_queue: deque[int]      = deque()     # flat cards waiting for full metadata
+        self._detail_pending: set[int]      = set()       # indices queued or being fetched
+        self._detail_lock                   = threading.Lock()
+        self._detail_running: bool          = False       # detail worker thread alive
+        self._detail_unseen: set[int]       = set()       # rendered flat cards not scrolled to yet
         self._merge_items: list[str]        = []          # merge listbox items
         self._batch_items: list[str]        = []          # batch listbox items
         # ── Library state ─────────────────────────────────────────────────
@@ -101,6 +151,8 @@ class App:
         self._lib_current_folder: str       = ""          # currently selected folder
         self._lib_files: list[dict]         = []          # cached file info dicts
         self._lib_selected: set[int]        = set()       # indices of selected rows
+        self._lib_deduping: bool            = False       # library dedupe scan running
+        self._save_traces: bool             = False       # also write Chrome trace JSON per task
 
     # ─────────────────────────────────────────────────────────────────────────
     def _load_window_config(self):
@@ -178,9 +230,26 @@ class App:
         # Using dpg.render_dearpygui_frame() instead of start_dearpygui()
         # guarantees _process_log_queue() runs reliably each frame without
         # depending on fragile set_frame_callback re-registration.
+        last_frame = time.perf_counter()
+        last_metrics = 0.0
+        last_visible = 0.0
+        warm_started = False
         while dpg.is_dearpygui_running():
             self._process_log_queue()
+            if self._current_page == "metrics" and last_frame - last_metrics >= 0.5:
+                last_metrics = last_frame
+                self._refresh_metrics_page()
+            if self._detail_unseen and last_frame - last_visible >= 0.25:
+                last_visible = last_frame
+                self._queue_visible_details()
             dpg.render_dearpygui_frame()
+            if not warm_started:
+                # First frame is on screen — warm caches in the background
+                warm_started = True
+                warmup.start(self._warmup_log)
+            now = time.perf_counter()
+            metrics.ui_frame(now - last_frame)
+            last_frame = now
         dpg.destroy_context()
 
     # ── Fonts ──────────────────────────────────────────────────────────────────
@@ -352,11 +421,17 @@ class App:
         if not logo_path:
             return
         try:
-            img = Image.open(logo_path).convert("RGBA")
-            img = img.resize((50, 50), Image.Resampling.LANCZOS)
-            # Flatten to float list [R,G,B,A, R,G,B,A, ...] in 0.0-1.0 range
-            data = (np.array(img).astype(np.float32) / 255.0).flatten().tolist()
-            w, h = img.size
+            # DPG's own loader (png/jpg/bmp) keeps PIL + numpy off the startup path;
+            # the image is scaled to 50×50 when drawn.
+            loaded = dpg.load_image(logo_path)
+            if loaded:
+                w, h, _channels, data = loaded
+            else:   # e.g. .ico — fall back to PIL
+                img = Image.open(logo_path).convert("RGBA")
+                img = img.resize((50, 50), Image.Resampling.LANCZOS)
+                # Flatten to float list [R,G,B,A, R,G,B,A, ...] in 0.0-1.0 range
+                data = (np.array(img).astype(np.float32) / 255.0).flatten().tolist()
+                w, h = img.size
             with dpg.texture_registry():
                 dpg.add_static_texture(w, h, data, tag="logo_texture")
             self._logo_texture = "logo_texture"
@@ -425,9 +500,15 @@ class App:
                 self._nav_btns[page_id] = f"nav_{page_id}"
                 dpg.add_spacer(height=4)
 
+            # ── Warm-up readiness ────────────────────────────────────────────
+            dpg.add_spacer(height=12)
+            dpg.add_text("○ Đang khởi động…", tag="warm_status",
+                         color=_CF3, indent=12)
+
     def _switch_page(self, page_id: str):
         if page_id == self._current_page:
             return
+        self._ensure_page(page_id)
         for pid, tag in self._pages.items():
             (dpg.show_item if pid == page_id else dpg.hide_item)(tag)
         if self._current_page:
@@ -440,10 +521,20 @@ class App:
         with dpg.child_window(tag="content_host", width=w, height=h,
                               border=False, no_scrollbar=True):
             dpg.bind_item_theme("content_host", "th_main")
+            # Other pages are built on first visit (see _ensure_page)
             self._build_download_page(w, h)
-            self._build_library_page(w, h)
-            self._build_edit_page(w, h)
-            self._build_batch_page(w, h)
+
+    def _ensure_page(self, page_id: str):
+        """Build *page_id* inside content_host if it has not been built yet."""
+        if page_id in self._pages:
+            return
+        w = dpg.get_item_width("content_host")
+        h = dpg.get_item_height("content_host")
+        dpg.push_container_stack("content_host")
+        try:
+            getattr(self, _PAGE_BUILDERS[page_id])(w, h)
+        finally:
+            dpg.pop_container_stack()
 
     # ── Shared: page header bar ────────────────────────────────────────────────
     def _hdr(self, title: str, subtitle: str):
@@ -524,6 +615,20 @@ class App:
                     dpg.add_spacer(width=20)
                     dpg.add_text("", tag="dl_sel_count", color=_CA)
 
+                dpg.add_spacer(height=4)
+                with dpg.group(horizontal=True, indent=16):
+                    dpg.add_text("SẮP XẾP:", color=_CF2)
+                    dpg.add_combo(tag="dl_sort", items=list(_SORT_KEYS),
+                                  default_value="Thứ tự gốc", width=120,
+                                  callback=self._on_grid_sort)
+                    dpg.add_button(label="▼ Giảm", tag="dl_sort_dir", width=70,
+                                   callback=self._toggle_grid_dir)
+                    dpg.add_spacer(width=20)
+                    dpg.add_text("LỌC:", color=_CF2)
+                    dpg.add_input_text(tag="dl_filter", width=260,
+                                       hint="Từ khóa trong tiêu đề / tác giả...",
+                                       callback=self._on_grid_filter)
+
                 dpg.add_spacer(height=4)
 
                 # ── Video grid (scrollable) ───────────────────────────────
@@ -644,13 +749,17 @@ class App:
                 return
 
             # Clear state and prepare grid for streaming
-            self._search_results = []
+            with self._detail_lock:
+                self._search_gen += 1
+                self._detail_queue.clear()
+                self._detail_pending.clear()
+            self._detail_unseen.clear()
+            self._search_results = ResultStore()
             self._search_selected.clear()
             self._log_queue.put(("ui", self._prepare_grid_for_streaming))
 
             def on_result(video: dict):
-                video["platform"] = platform
-                self._search_results.append(video)
+                self._search_results.append(video, platform=platform)
                 self._log_queue.put(("ui", self._render_cards))
 
             # Fetch with streaming callback
@@ -701,6 +810,7 @@ class App:
         self._thumb_loaded.clear()
         self._grid_rendered_count = 0
         self._grid_current_row_tag = None
+        self._grid_order = None
 
         # Recalculate column count from current grid width
         try:
@@ -745,37 +855,113 @@ class App:
                 user_data=idx, indent=14)
             dpg.bind_item_theme(img_btn, "th_thumb_btn")
 
-            title = (video.get("title") or "")[:26]
-            dpg.add_text(title, color=_CF, indent=4)
-
-            views = video.get("view_count", 0)
-            dur = video.get("duration", 0)
-            info_parts = [self._format_views(views)]
-            if dur:
-                m, s = divmod(int(dur), 60)
-                info_parts.append(f"{m}:{s:02d}")
-            dpg.add_text("  ·  ".join(info_parts),
-                         color=_CF2, indent=4)
-
-            likes    = video.get("like_count", 0)
-            comments = video.get("comment_count", 0)
-            shares   = video.get("repost_count", 0)
-            stat_parts: list[str] = []
-            if likes:
-                stat_parts.append(f"Like:{self._fmt_n(likes)}")
-            if comments:
-                stat_parts.append(f"Cmt:{self._fmt_n(comments)}")
-            if shares:
-                stat_parts.append(f"Share:{self._fmt_n(shares)}")
-            dpg.add_text(
-                "  ".join(stat_parts) if stat_parts else "",
-                color=_CF2, indent=4)
+            title, info, stats = self._card_lines(video)
+            dpg.add_text(title, tag=f"vtitle_{idx}", color=_CF, indent=4)
+            dpg.add_text(info, tag=f"vinfo_{idx}", color=_CF2, indent=4)
+            dpg.add_text(stats, tag=f"vstat_{idx}", color=_CF2, indent=4)
 
             dpg.add_text(
                 "✓ Đã chọn" if is_sel else "",
                 tag=f"vsel_{idx}", color=_CL_OK, indent=4)
 
-        dpg.add_spacer(width=4, parent=parent)
+        dpg.add_spacer(width=4, tag=f"vgap_{idx}", parent=parent)
+
+    def _card_lines(self, video: Result) -> tuple[str, str, str]:
+        """Title, views · duration, and like / comment / share lines of a card."""
+        title = (video.get("title") or "")[:26]
+
+        views = video.get("view_count", 0)
+        dur = video.get("duration", 0)
+        info_parts = [self._format_views(views)]
+        if dur:
+            m, s = divmod(int(dur), 60)
+            info_parts.append(f"{m}:{s:02d}")
+
+        likes    = video.get("like_count", 0)
+        comments = video.get("comment_count", 0)
+        shares   = video.get("repost_count", 0)
+        stat_parts: list[str] = []
+        if likes:
+            stat_parts.append(f"Like:{self._fmt_n(likes)}")
+        if comments:
+            stat_parts.append(f"Cmt:{self._fmt_n(comments)}")
+        if shares:
+            stat_parts.append(f"Share:{self._fmt_n(shares)}")
+        return title, "  ·  ".join(info_parts), "  ".join(stat_parts)
+
+    # ── Lazy second-tier metadata ─────────────────────────────────────────────
+
+    def _queue_visible_details(self):
+        """Queue detail fetches for flat cards that have scrolled into view.
+
+        Polled from the render loop: cards are only fetched once the user
+        sees them (or selects them), not for every card the grid renders.
+        Runs on render thread.
+        """
+        visible = [idx for idx in self._detail_unseen
+                   if dpg.does_item_exist(f"vcard_{idx}")
+                   and dpg.is_item_visible(f"vcard_{idx}")]
+        if visible:
+            self._detail_unseen.difference_update(visible)
+            self._queue_details(sorted(visible))
+
+    def _queue_details(self, indices: list[int], urgent: bool = False):
+        """Fetch full metadata for flat cards in *indices* in the background.
+
+        Cards are queued once visible; *urgent* (a selection) jumps the
+        queue. One worker at a time, so a long profile doesn't turn into a
+        burst of per-video requests.
+        """
+        with self._detail_lock:
+            for idx in indices:
+                if idx >= len(self._search_results):
+                    continue
+                video = self._search_results[idx]
+                if not video.get("flat") or video.get("platform") not in _DETAIL_FETCHERS:
+                    continue
+                if idx in self._detail_pending:
+                    if urgent and idx in self._detail_queue:
+                        self._detail_queue.remove(idx)
+                        self._detail_queue.appendleft(idx)
+                    continue
+                self._detail_pending.add(idx)
+                if urgent:
+                    self._detail_queue.appendleft(idx)
+                else:
+                    self._detail_queue.append(idx)
+            if self._detail_queue and not self._detail_running:
+                self._detail_running = True
+                threading.Thread(target=self._detail_worker, daemon=True).start()
+
+    def _detail_worker(self):
+        """Background thread: drain the detail queue, updating cards in place."""
+        while True:
+            with self._detail_lock:
+                if not self._detail_queue:
+                    self._detail_running = False
+                    return
+                idx = self._detail_queue.popleft()
+                gen = self._search_gen
+                video = self._search_results[idx]
+            details = _DETAIL_FETCHERS[video["platform"]](video["url"])
+            with self._detail_lock:
+                self._detail_pending.discard(idx)
+                if gen != self._search_gen or not details:
+                    continue
+                for key, value in details.items():
+                    if value or key == "flat":
+                        video[key] = value
+            self._log_queue.put(("ui", lambda i=idx: self._refresh_card(i)))
+
+    def _refresh_card(self, idx: int):
+        """Re-draw a card's text after its metadata changed.  Runs on render thread."""
+        if idx >= len(self._search_results):
+            return
+        title, info, stats = self._card_lines(self._search_results[idx])
+        for tag, text in ((f"vtitle_{idx}", title), (f"vinfo_{idx}", info),
+                          (f"vstat_{idx}", stats)):
+            if dpg.does_item_exist(tag):
+                dpg.set_value(tag, text)
 
     def _render_cards(self, max_count: int | None = None):
         """Render un-rendered video cards.  Idempotent — safe to call repeatedly.
@@ -784,7 +970,7 @@ class App:
         During streaming (self._searching), auto-caps at _GRID_BATCH * 5 cards.
         Runs on render thread.
         """
-        total = len(self._search_results)
+        total = self._grid_total()
         start = self._grid_rendered_count
 
         if max_count is not None:
@@ -797,7 +983,7 @@ class App:
             end = min(end, _GRID_BATCH * 5)
 
         # Always update count label
-        dpg.set_value("dl_result_count", f"{total} video tìm thấy")
+        dpg.set_value("dl_result_count", self._result_count_label())
 
         if start >= end:
             return
@@ -809,22 +995,29 @@ class App:
         cols = self._grid_cols
         placeholder = [0.15, 0.15, 0.15, 1.0] * (_THUMB_W * _THUMB_H)
 
+        order = self._grid_order
         new_indices: list[int] = []
-        for idx in range(start, end):
-            col_in_row = idx % cols
+        for pos in range(start, end):
+            col_in_row = pos % cols
 
             if col_in_row == 0:
                 # Add spacer after previous row (skip for very first row)
-                if idx > 0:
+                if pos > 0:
                     dpg.add_spacer(height=4, parent="dl_grid")
                 # Create new horizontal row group
-                row_tag = f"vrow_{idx // cols}"
+                row_tag = f"vrow_{pos // cols}"
                 dpg.add_group(tag=row_tag, horizontal=True,
                               parent="dl_grid", indent=8)
                 self._grid_current_row_tag = row_tag
 
-            self._create_video_card(idx, self._grid_current_row_tag, placeholder)
-            new_indices.append(idx)
+            idx = order[pos] if order is not None else pos
+            if dpg.does_item_exist(f"vcard_{idx}"):
+                # Card built before a sort / filter change: move it, keep its thumbnail
+                dpg.move_item(f"vcard_{idx}", parent=self._grid_current_row_tag)
+                dpg.move_item(f"vgap_{idx}", parent=self._grid_current_row_tag)
+            else:
+                self._create_video_card(idx, self._grid_current_row_tag, placeholder)
+                new_indices.append(idx)
 
         self._grid_rendered_count = end
 
@@ -848,10 +1041,15 @@ class App:
                       f"{sel_count} đã chọn" if sel_count else "")
         self._update_dl_btn_label()
 
-        # Load thumbnails for newly rendered cards
+        # Load thumbnails for newly rendered cards; flat entries get their full
+        # metadata once scrolled into view (_queue_visible_details)
         if new_indices:
             threading.Thread(target=self._load_thumbnails_range,
                              args=(new_indices,), daemon=True).start()
+            results = self._search_results
+            self._detail_unseen.update(
+                idx for idx in new_indices
+                if results.value(idx, "flat") and results.value(idx, "platform") in _DETAIL_FETCHERS)
 
     def _finalize_search_grid(self):
         """Called after streaming search completes.  Renders any remaining
@@ -864,12 +1062,17 @@ class App:
             dpg.set_value("dl_result_count", "Không tìm thấy video")
             return
 
+        # Sort / filter chosen while streaming: lay the grid out in that order now
+        if self._grid_view_active():
+            self._apply_grid_view()
+            return
+
         # Render next batch of un-rendered cards (with load-more for the rest)
         remaining = total - self._grid_rendered_count
         if remaining > 0:
             self._render_cards(_GRID_BATCH)
 
-        dpg.set_value("dl_result_count", f"{total} video tìm thấy")
+        dpg.set_value("dl_result_count", self._result_count_label())
         self._update_dl_btn_label()
 
     def _rebuild_video_grid(self):
@@ -882,7 +1085,87 @@ class App:
                          parent="dl_grid", color=_CF3, indent=20)
             dpg.set_value("dl_result_count", "Không tìm thấy video")
             return
-        self._render_cards(_GRID_BATCH)
+        self._apply_grid_view()
+
+    # ── Client-side sort / filter ─────────────────────────────────────────────
+
+    def _grid_total(self) -> int:
+        """Cards in the current view (after the keyword filter)."""
+        if self._grid_order is not None:
+            return len(self._grid_order)
+        return len(self._search_results)
+
+    def _grid_view_active(self) -> bool:
+        return self._grid_sort is not None or bool(self._grid_filter.strip())
+
+    def _result_count_label(self) -> str:
+        total = len(self._search_results)
+        if self._grid_order is not None and self._grid_filter.strip():
+            return f"{len(self._grid_order)}/{total} video khớp"
+        return f"{total} video tìm thấy"
+
+    def _on_grid_sort(self, sender, app_data):
+        self._grid_sort = _SORT_KEYS.get(app_data)
+        self._grid_view_changed()
+
+    def _toggle_grid_dir(self):
+        self._grid_desc = not self._grid_desc
+        dpg.configure_item("dl_sort_dir", label="▼ Giảm" if self._grid_desc else "▲ Tăng")
+        if self._grid_sort is not None:
+            self._grid_view_changed()
+
+    def _on_grid_filter(self, sender, app_data):
+        self._grid_filter = app_data or ""
+        self._grid_view_changed()
+
+    def _grid_view_changed(self):
+        """Queue one re-layout for the render thread (keystrokes coalesce).
+        While a search is streaming the new view is applied when it finishes."""
+        if self._searching or not len(self._search_results) or self._grid_view_pending:
+            return
+        self._grid_view_pending = True
+
+        def _apply():
+            self._grid_view_pending = False
+            self._apply_grid_view()
+
+        self._log_queue.put(("ui", _apply))
+
+    def _apply_grid_view(self):
+        """Re-order / filter the grid from the result store without re-fetching.
+
+        Cards that were already built are moved into their new positions
+        (thumbnail and selection intact); only cards shown for the first
+        time are created.  Runs on render thread.
+        """
+        shown = max(self._grid_rendered_count, _GRID_BATCH)
+        if self._grid_view_active():
+            self._grid_order = self._search_results.query(
+                self._grid_sort, self._grid_desc, self._grid_filter)
+        else:
+            self._grid_order = None
+
+        # Park built cards in a hidden group, then drop the old rows
+        if not dpg.does_item_exist("dl_grid_park"):
+            dpg.add_group(tag="dl_grid_park", parent="dl_grid", show=False)
+        park = dpg.get_alias_id("dl_grid_park")
+        for child in dpg.get_item_children("dl_grid", slot=1) or []:
+            if child == park:
+                continue
+            for item in dpg.get_item_children(child, slot=1) or []:
+                alias = dpg.get_item_alias(item) or ""
+                if alias.startswith(("vcard_", "vgap_")):
+                    dpg.move_item(item, parent=park)
+            dpg.delete_item(child)
+        self._grid_rendered_count = 0
+        self._grid_current_row_tag = None
+
+        if not self._grid_total():
+            dpg.add_text("Không có video khớp bộ lọc.",
+                         parent="dl_grid", color=_CF3, indent=20)
+            dpg.set_value("dl_result_count", self._result_count_label())
+            return
+        self._render_cards(shown)
 
     def _toggle_video_select(self, idx: int):
         """Toggle selection of a video card."""
@@ -901,6 +1184,8 @@ class App:
                 dpg.bind_item_theme(card_tag, "th_vcard_sel")
             if dpg.does_item_exist(sel_tag):
                 dpg.set_value(sel_tag, "✓ Đã chọn")
+            self._detail_unseen.discard(idx)
+            self._queue_details([idx], urgent=True)
 
         sel_count = len(self._search_selected)
         dpg.set_value("dl_sel_count",
@@ -908,8 +1193,9 @@ class App:
         self._update_dl_btn_label()
 
     def _select_all_videos(self):
-        """Select all videos in search results."""
-        for idx in range(len(self._search_results)):
+        """Select all videos in search results (those passing the filter)."""
+        order = self._grid_order
+        for idx in (order if order is not None else range(len(self._search_results))):
             if idx not in self._search_selected:
                 self._search_selected.add(idx)
                 card_tag = f"vcard_{idx}"
@@ -957,10 +1243,10 @@ class App:
             if not tex_tag:
                 continue
             try:
-                req = urllib.request.Request(
+                req = urlrequest.Request(
                     thumb_url,
                     headers={"User-Agent": "Mozilla/5.0"})
-                with urllib.request.urlopen(req, timeout=10) as resp:
+                with urlrequest.urlopen(req, timeout=10) as resp:
                     img_bytes = resp.read()
                 img = Image.open(BytesIO(img_bytes)).convert("RGBA")
                 img = img.resize((_THUMB_W, _THUMB_H), Image.Resampling.LANCZOS)
@@ -1068,6 +1354,11 @@ class App:
                             # Spacer to push buttons right
                             dpg.add_spacer(width=200)
 
+                            dpg.add_button(
+                                label="Lọc trùng", tag="lib_dedupe_btn",
+                                width=100,
+                                callback=self._lib_dedupe)
+                            dpg.add_spacer(width=8)
                             btn_del = dpg.add_button(
                                 label="Xóa video", tag="lib_del_btn",
                                 width=100,
@@ -1219,7 +1510,8 @@ class App:
         if os.path.isdir(scan_path):
             try:
                 for entry in sorted(os.scandir(scan_path), key=lambda e: e.name.lower()):
-                    if not entry.is_file():
+                    if not entry.is_file() or entry.name in (
+                            dedupe.FingerprintIndex.FILENAME, library_index.VideoIdIndex.FILENAME):
                         continue
                     stat = entry.stat()
                     ext = os.path.splitext(entry.name)[1].lower()
@@ -1285,6 +1577,51 @@ class App:
                 ts = datetime.fromtimestamp(finfo["mtime"]).strftime("%H:%M:%S %d/%m/%Y")
                 dpg.add_text(ts, color=_CF2)
 
+    def _lib_dedupe(self):
+        """List videos with the same content anywhere under the library root
+        (the same clip downloaded from TikTok, Instagram and Facebook), then
+        hard-link them to the oldest copy once the user confirms."""
+        if self._lib_deduping:
+            self._log("Đang lọc trùng, vui lòng chờ...", "info")
+            return
+        self._lib_deduping = True
+        root = self._lib_root
+
+        def _confirm(found: int, size: int) -> bool:
+            import tkinter as tk
+            from tkinter import messagebox
+            tk_root = tk.Tk()
+            tk_root.withdraw()
+            try:
+                return messagebox.askyesno(
+                    "Lọc trùng",
+                    f"Tìm thấy {found} video trùng ({self._format_size(size)}), "
+                    f"danh sách ở khung log.\n\n"
+                    f"Thay các bản trùng bằng liên kết tới bản cũ nhất?",
+                    parent=tk_root)
+            finally:
+                tk_root.destroy()
+
+        def _worker():
+            self._log(f"[Dedupe] Đang quét {root}...", "info")
+            try:
+                found, size = dedupe.dedupe_library(root, "report", self._log)
+                if not found:
+                    self._log("[Dedupe] Không có video trùng.", "ok")
+                elif not _confirm(found, size):
+                    self._log(f"[Dedupe] {found} video trùng — đã hủy, không thay đổi file nào.",
+                              "info")
+                else:
+                    found, freed = dedupe.dedupe_library(root, "link")
+                    self._log(f"[Dedupe] {found} video trùng, giải phóng "
+                              f"{self._format_size(freed)}.", "ok")
+            except Exception as e:
+                self._log(f"[Dedupe] Lỗi: {e}", "err")
+            finally:
+                self._lib_deduping = False
+            self._log_queue.put(("ui", self._lib_refresh_folders))
+        threading.Thread(target=_worker, daemon=True).start()
+
     def _lib_toggle_select(self, idx: int, checked: bool):
         if checked:
             self._lib_selected.add(idx)
@@ -1873,6 +2210,126 @@ class App:
                 dpg.add_spacer(height=6)
                 dpg.add_text("", tag="batch_status", color=_CF2, indent=16)
 
+    # ── Metrics page ───────────────────────────────────────────────────────────
+    def _build_metrics_page(self, w: int, h: int):
+        with dpg.child_window(tag="pg_metrics", width=w, height=h,
+                              border=False, no_scrollbar=True):
+            dpg.bind_item_theme("pg_metrics", "th_main")
+            dpg.hide_item("pg_metrics")
+            self._pages["metrics"] = "pg_metrics"
+            self._hdr("Giám Sát",
+                      "Tốc độ tải, hàng đợi, tỉ lệ lỗi, FFmpeg và UI theo thời gian thực")
+
+            with dpg.child_window(tag="metrics_scroll", width=w, height=h - _HDR_H,
+                                  border=False, no_scrollbar=True):
+                dpg.bind_item_theme("metrics_scroll", "th_main")
+                dpg.add_spacer(height=10)
+
+                # Overview
+                with dpg.child_window(height=150, border=True, indent=16):
+                    dpg.add_text("TỔNG QUAN", color=_CF2, indent=16)
+                    dpg.add_spacer(height=6)
+                    for tag, label in (("met_speed",  "Tốc độ tổng:"),
+                                       ("met_queue",  "Hàng đợi:"),
+                                       ("met_ffmpeg", "FFmpeg:"),
+                                       ("met_frame",  "Khung hình UI:")):
+                        with dpg.group(horizontal=True):
+                            dpg.add_text(label, color=_CF2, indent=16)
+                            dpg.add_text("—", tag=tag)
+
+                dpg.add_spacer(height=10)
+
+                # Per-platform counters
+                dpg.add_text("THEO NỀN TẢNG", color=_CF2, indent=16)
+                dpg.add_spacer(height=6)
+                with dpg.table(tag="met_table", header_row=True,
+                               borders_innerH=True, borders_outerH=True,
+                               borders_innerV=False, borders_outerV=False,
+                               indent=16):
+                    dpg.add_table_column(label="Nền tảng")
+                    dpg.add_table_column(label="Thành công")
+                    dpg.add_table_column(label="Lỗi")
+                    dpg.add_table_column(label="Tỉ lệ lỗi")
+                    dpg.add_table_column(label="Đang tải")
+                    dpg.add_table_column(label="Tốc độ")
+                    for p in metrics.PLATFORMS:
+                        with dpg.table_row():
+                            dpg.add_text(p.capitalize())
+                            for col in ("ok", "failed", "rate", "active", "speed"):
+                                dpg.add_text("0", tag=f"met_{p}_{col}", color=_CF2)
+
+                dpg.add_spacer(height=10)
+
+                # Active jobs
+                dpg.add_text("ĐANG TẢI", color=_CF2, indent=16)
+                dpg.add_spacer(height=6)
+                dpg.add_input_text(tag="met_jobs", multiline=True, readonly=True,
+                                   width=-16, height=160, indent=16,
+                                   hint="Không có tác vụ nào")
+
+                dpg.add_spacer(height=10)
+
+                # Prometheus exporter
+                with dpg.child_window(height=80, border=True, indent=16):
+                    dpg.add_text("PROMETHEUS EXPORTER", color=_CF2, indent=16)
+                    dpg.add_spacer(height=6)
+                    with dpg.group(horizontal=True):
+                        dpg.add_text("Cổng:", color=_CF2, indent=16)
+                        dpg.add_input_text(tag="met_port", default_value="9464",
+                                           width=80)
+                        dpg.add_button(label="Bật exporter", tag="met_export_btn",
+                                       width=120, callback=self._start_metrics_exporter)
+                        dpg.add_text("", tag="met_export_url", color=_CF2)
+
+                dpg.add_spacer(height=6)
+                dpg.add_checkbox(
+                    label=f"Lưu trace JSON của mỗi tác vụ vào traces/ "
+                          f"(giữ {_TRACE_KEEP} file mới nhất)",
+                    tag="met_save_traces", default_value=self._save_traces, indent=16,
+                    callback=lambda s, a: setattr(self, "_save_traces", bool(a)))
+
+    # ── Metrics logic ──────────────────────────────────────────────────────────
+    def _start_metrics_exporter(self):
+        port = dpg.get_value("met_port").strip()
+        if not port.isdigit():
+            self._log("Cổng exporter không hợp lệ.", "err"); return
+        try:
+            url = metrics.start_exporter(int(port))
+        except OSError as e:
+            self._log(f"Không thể mở exporter: {e}", "err"); return
+        dpg.set_value("met_export_url", url)
+        dpg.configure_item("met_export_btn", enabled=False)
+        self._log(f"[Metrics] Exporter: {url}", "ok")
+
+    def _refresh_metrics_page(self):
+        """Copy a metrics snapshot into the dashboard (render thread only)."""
+        snap = metrics.snapshot()
+        dpg.set_value("met_speed", f"{self._format_size(int(snap['speed']))}/s "
+                                   f"({len(snap['jobs'])} tác vụ)")
+        dpg.set_value("met_queue", f"{snap['queue_depth']} chờ")
+        ff = snap["ffmpeg"]
+        dpg.set_value("met_ffmpeg",
+                      f"{ff['fps']:.1f} fps | đang chạy {ff['active']} | "
+                      f"OK {ff['runs_ok']}  ✗ {ff['runs_failed']}")
+        ui = snap["ui"]
+        dpg.set_value("met_frame",
+                      f"{ui['frame'] * 1000:.1f} ms (max {ui['frame_max'] * 1000:.1f} ms)")
+        for p, v in snap["platforms"].items():
+            if not dpg.does_item_exist(f"met_{p}_ok"):
+                continue
+            done = v["ok"] + v["failed"]
+            dpg.set_value(f"met_{p}_ok",     str(v["ok"]))
+            dpg.set_value(f"met_{p}_failed", str(v["failed"]))
+            dpg.set_value(f"met_{p}_rate",   f"{v['failed'] / done * 100:.0f}%" if done else "—")
+            dpg.set_value(f"met_{p}_active", str(v["active"]))
+            dpg.set_value(f"met_{p}_speed",  f"{self._format_size(int(v['speed']))}/s")
+        lines = []
+        for j in snap["jobs"][:20]:
+            pct = f"{j['done'] / j['total'] * 100:5.1f}%" if j["total"] else "  ?  "
+            lines.append(f"[{j['platform']}] {pct}  {self._format_size(int(j['speed']))}/s"
+                         f"  {os.path.basename(j['name'])}")
+        dpg.set_value("met_jobs", "\n".join(lines))
+
     # ── Log panel ──────────────────────────────────────────────────────────────
     def _build_log_panel(self, h: int):
         with dpg.child_window(tag="log_panel", width=_LOG_W, height=h,
@@ -2043,6 +2500,32 @@ class App:
         self._log_queue.put(("log",    f"[{ts}] {icon_map.get(tag, '•')} {text}", color))
         self._log_queue.put(("status", text[:80]))
 
+    def _warmup_log(self, text: str, tag: str = "info"):
+        """Warm-up progress → Activity Log + sidebar readiness text."""
+        self._log(text, tag)
+        state = warmup.status()
+        done = sum(1 for v in state.values() if v in ("done", "failed"))
+        if done == len(state):
+            label, color = "● Sẵn sàng", _CL_OK
+        else:
+            label, color = f"○ Khởi động {done}/{len(state)}", _CF3
+        self._log_queue.put(("ui", lambda: (
+            dpg.set_value("warm_status", label),
+            dpg.configure_item("warm_status", color=color),
+        )))
+
+    def _report_trace(self, trace: Trace):
+        """Log a per-stage timing summary; save the Chrome trace JSON if enabled."""
+        for line in trace.summary():
+            self._log(line, "info")
+        if not self._save_traces:
+            return
+        try:
+            path = trace.save(_TRACE_DIR, keep=_TRACE_KEEP)
+            self._log(f"[Trace] Đã lưu: {path}", "info")
+        except Exception as e:
+            self._log(f"[Trace] Không thể lưu trace: {e}", "err")
+
     def _clear_log(self):
         """Clear all log items.  Called from button callback (render thread)."""
         self._live_progress_tag = None
@@ -2070,12 +2553,15 @@ class App:
         dpg.set_item_width("log_content",   _LOG_W - 16)
         dpg.set_item_height("log_content",  vh - 60)
 
-        for pg in ["pg_dl", "pg_lib", "pg_edit", "pg_batch"]:
-            dpg.set_item_width(pg, cw)
-            dpg.set_item_height(pg, vh)
-        for sc in ["dl_scroll", "lib_scroll", "edit_scroll", "batch_scroll"]:
-            dpg.set_item_width(sc, cw)
-            dpg.set_item_height(sc, vh - _HDR_H)
+        for pg in ["pg_dl", "pg_lib", "pg_edit", "pg_batch", "pg_metrics"]:
+            if dpg.does_item_exist(pg):     # pages are built lazily
+                dpg.set_item_width(pg, cw)
+                dpg.set_item_height(pg, vh)
+        for sc in ["dl_scroll", "lib_scroll", "edit_scroll", "batch_scroll",
+                   "metrics_scroll"]:
+            if dpg.does_item_exist(sc):
+                dpg.set_item_width(sc, cw)
+                dpg.set_item_height(sc, vh - _HDR_H)
         
         # Save window dimensions for next session
         self._save_window_config()
@@ -2421,9 +2907,14 @@ class App:
 
     def _worker(self, targets, out, act: int):
         started    = time.perf_counter()
+        trace      = Trace(f"Activity #{act}").start()
         last_pct   = -1
         last_prog_t = 0.0   # monotonic time of last progress enqueue
 
+        # Route adaptive-concurrency decisions into the Activity Log
+        for _platform in ("youtube", "tiktok", "facebook", "instagram"):
+            get_controller(_platform, self._log)
+
         def _prog_hook(d):
             """yt-dlp progress callback → all DPG mutations via queue (thread-safe).
 
@@ -2500,13 +2991,10 @@ class App:
                         "ok" if ok else "err")
 
                 elif kind == "tt_multi":
-                    for url in payload:
-                        self._log(f"[TikTok] Đang tải: {url}", "info")
-                        fn = download_tiktok_video(url, out, _prog_hook)
-                        self._log(
-                            f"Hoàn thành: {os.path.basename(fn)}" if fn
-                            else f"Thất bại: {url}",
-                            "ok" if fn else "err")
+                    ok_n, total = download_tiktok_multi(payload, out, _prog_hook, self._log)
+                    self._log(
+                        f"Hoàn thành: {ok_n}/{total} video.",
+                        "ok" if ok_n > 0 else "err")
 
                 # ── YouTube ───────────────────────────────────────────────────
                 elif kind == "yt_single":
@@ -2582,7 +3070,7 @@ class App:
                     ok_n, total = download_instagram_profile(
                         url, out, quality, max_v, _prog_hook, self._log)
                     self._log(
-                        f"Profile hoàn thành: {ok_n} video đã tải.",
+                        f"Profile hoàn thành: {ok_n}/{total} video đã tải.",
                         "ok" if ok_n > 0 else "err")
 
                 elif kind == "ig_multi":
@@ -2599,6 +3087,7 @@ class App:
         finally:
             elapsed = time.perf_counter() - started
             self._log(f"[Activity #{act}] Kết thúc tác vụ tải ({elapsed:.1f}s)", "ok")
+            self._report_trace(trace)
             # All DPG mutations go through the queue — never call DPG from here.
             self._log_queue.put(("ui", lambda: dpg.set_value("dl_prog", 1.0)))
             time.sleep(1.5)   # briefly show full bar (worker thread sleep is fine)
@@ -2622,6 +3111,7 @@ class App:
 
     def _edit_worker(self, tab: str, inp: str, out):
         started = time.perf_counter()
+        trace   = Trace(f"Edit {tab}").start()
         try:
             self._log_queue.put(("ui", lambda: dpg.set_value("edit_prog", 0.15)))
             if "Resize" in tab:
@@ -2702,6 +3192,7 @@ class App:
         except Exception as e:
             self._log(f"Lỗi edit: {e}", "err")
         finally:
+            self._report_trace(trace)
             time.sleep(1.0)
             self._log_queue.put(("ui", lambda: (
                 dpg.configure_item("edit_btn", enabled=True),
@@ -2729,6 +3220,7 @@ class App:
     def _batch_worker(self, files: list, op: str, out_dir: str):
         ok_count = err_count = 0
         total = len(files)
+        trace = Trace(f"Batch {op}").start()
         try:
             for i, inp in enumerate(files):
                 name     = os.path.basename(inp)
@@ -2820,6 +3312,7 @@ class App:
                 f"Batch xong: {ok_count}/{total} thành công,"
                 f" {err_count} lỗi.",
                 "ok" if err_count == 0 else "err")
+            self._report_trace(trace)
             self._log_queue.put(("ui", lambda ok=_ok, er=_err, t=_tot: (
                 dpg.configure_item("batch_btn", enabled=True),
                 dpg.set_value("batch_status",
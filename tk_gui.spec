@@ -1,4 +1,5 @@
 # -*- mode: python ; coding: utf-8 -*-
+from PyInstaller.utils.hooks import collect_submodules
 
 
 a = Analysis(
@@ -6,7 +7,18 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # Modules loaded through lazy_import.lazy_module() are invisible to the
+    # import analysis — list them here.
+    hiddenimports=[
+        *collect_submodules('yt_dlp'),
+        'requests',
+        'ffmpeg',
+        'numpy',
+        'PIL.Image',
+        'urllib.request',
+        'http.cookiejar',
+        'http.server',
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,317 @@
+"""
+tracing.py
+──────────
+Lightweight per-stage timing for download and edit tasks.
+
+A Trace collects spans (name, start, duration, thread) while it is active:
+
+    trace = Trace('Activity #3')
+    with trace.activate():
+        with span('cookies'):
+            ...
+    trace.summary()                 # → lines for the log panel
+    trace.save('traces', keep=20)   # → Chrome trace JSON (chrome://tracing / Perfetto)
+
+Behaviour:
+  ✓ span() is a no-op when no trace is active (negligible overhead)
+  ✓ The active trace lives in a contextvar; bind() carries it into pool threads
+  ✓ ydl_phases() splits one yt-dlp extract_info() call into
+    extract → format_select → prepare → transfer → postprocess:<PP> → finalize
+"""
+
+from __future__ import annotations
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+_current: contextvars.ContextVar['Trace | None'] = contextvars.ContextVar(
+    'tracing_current', default=None)
+
+
+class Trace:
+    """A collection of timed spans for one user-visible task."""
+
+    def __init__(self, label: str):
+        self.label  = label
+        self.spans: list[dict] = []
+        self._t0    = time.perf_counter()
+        self._wall0 = time.time()
+        self._lock  = threading.Lock()
+
+    # ── Recording ────────────────────────────────────────────────────────────
+    @contextmanager
+    def activate(self):
+        """Make this trace the current one for the enclosed block."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def start(self) -> 'Trace':
+        """Make this trace current for the rest of the calling thread.
+
+        Meant for worker threads, which own their context and need no reset.
+        """
+        _current.set(self)
+        return self
+
+    def add(self, name: str, start: float, end: float,
+            cat: str = '', args: dict | None = None) -> None:
+        """Record a finished span (start / end are time.perf_counter values)."""
+        entry = {
+            'name':  name,
+            'cat':   cat,
+            'start': start - self._t0,
+            'dur':   max(0.0, end - start),
+            'tid':   threading.get_ident(),
+            'tname': threading.current_thread().name,
+        }
+        if args:
+            entry['args'] = args
+        with self._lock:
+            self.spans.append(entry)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    # ── Reporting ────────────────────────────────────────────────────────────
+    def totals(self) -> list[tuple[str, int, float]]:
+        """Return (name, count, total seconds) per span name, slowest first."""
+        agg: dict[str, list] = {}
+        with self._lock:
+            for s in self.spans:
+                row = agg.setdefault(s['name'], [0, 0.0])
+                row[0] += 1
+                row[1] += s['dur']
+        return sorted(((n, c, t) for n, (c, t) in agg.items()),
+                      key=lambda r: r[2], reverse=True)
+
+    def summary(self, limit: int = 8) -> list[str]:
+        """Short human-readable breakdown, one line per stage."""
+        wall = self.elapsed
+        lines = [f'[Trace] {self.label}: {wall:.2f}s total']
+        for name, count, total in self.totals()[:limit]:
+            pct = total / wall * 100 if wall > 0 else 0.0
+            times = f' ×{count}' if count > 1 else ''
+            lines.append(f'  {name:<22} {total:7.2f}s {pct:5.1f}%{times}')
+        return lines
+
+    def to_chrome(self) -> dict:
+        """Return the trace in Chrome trace-event format."""
+        pid = os.getpid()
+        events: list[dict] = [{
+            'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+            'args': {'name': self.label},
+        }]
+        named: set[int] = set()
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            if s['tid'] not in named:
+                named.add(s['tid'])
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                               'tid': s['tid'], 'args': {'name': s['tname']}})
+            ev = {
+                'name': s['name'],
+                'cat':  s['cat'] or 'task',
+                'ph':   'X',
+                'ts':   round(s['start'] * 1e6, 1),
+                'dur':  round(s['dur'] * 1e6, 1),
+                'pid':  pid,
+                'tid':  s['tid'],
+            }
+            if 'args' in s:
+                ev['args'] = s['args']
+            events.append(ev)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'label': self.label, 'started': self._wall0}}
+
+    def save(self, directory: str, keep: int | None = None) -> str:
+        """Write Chrome trace JSON into *directory* and return the file path.
+
+        With *keep*, older trace files beyond the newest *keep* are deleted.
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(self._wall0))
+        safe = ''.join(c if c.isalnum() else '_' for c in self.label).strip('_')
+        path = os.path.join(directory, f'{stamp}_{safe or "trace"}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome(), f)
+        if keep is not None:
+            _prune(directory, path, keep)
+        return path
+
+
+def _prune(directory: str, newest: str, keep: int) -> None:
+    """Delete all .json files in *directory* but *newest* and the most
+    recently written others, *keep* in all."""
+    try:
+        files = [e for e in os.scandir(directory)
+                 if e.is_file() and e.name.endswith('.json')
+                 and os.path.abspath(e.path) != os.path.abspath(newest)]
+    except OSError:
+        return
+    files.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for e in files[max(0, keep - 1):]:
+        try:
+            os.remove(e.path)
+        except OSError:
+            pass
+
+
+# ── Span helpers ─────────────────────────────────────────────────────────────
+
+def current() -> Trace | None:
+    """Return the active trace, or None."""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, cat: str = '', **args):
+    """Time the enclosed block as *name* on the active trace (if any)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter(), cat, args or None)
+
+
+def traced(name: str, cat: str = ''):
+    """Decorator form of span()."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if _current.get() is None:
+                return fn(*a, **kw)
+            with span(name, cat):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+def bind(fn: Callable) -> Callable:
+    """Wrap *fn* so it runs with the caller's trace context (for thread pools)."""
+    ctx = contextvars.copy_context()
+
+    def _bound(*a, **kw):
+        return ctx.copy().run(fn, *a, **kw)
+    return _bound
+
+
+# ── yt-dlp phases ────────────────────────────────────────────────────────────
+
+class _PhaseClock:
+    """Turns marker callbacks into consecutive, non-overlapping spans."""
+
+    def __init__(self, trace: Trace, label: str):
+        self._trace = trace
+        self._label = label
+        self._name: str | None = None
+        self._start = 0.0
+        self._lock  = threading.Lock()
+
+    def enter(self, name: str | None) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            if self._name is not None and self._name != name:
+                self._trace.add(self._name, self._start, now, 'ytdlp',
+                                {'target': self._label} if self._label else None)
+            if self._name != name:
+                self._name, self._start = name, now
+
+
+@functools.lru_cache(maxsize=None)
+def _marker_class():
+    from yt_dlp.postprocessor.common import PostProcessor
+
+    class TracePhasePP(PostProcessor):
+        """No-op post-processor whose only job is to report when a stage starts."""
+
+        def __init__(self, clock: _PhaseClock, phase: str | None):
+            super().__init__(None)
+            self._clock = clock
+            self._phase = phase
+
+        def run(self, info):
+            self._clock.enter(self._phase)
+            return [], info
+
+    return TracePhasePP
+
+
+# (yt-dlp stage, phase that starts there)
+_MARKERS = (
+    ('pre_process',  'format_select'),
+    ('video',        'prepare'),
+    ('before_dl',    'transfer'),
+    ('post_process', 'finalize'),
+    ('after_video',  'extract'),     # next playlist entry (closed on exit)
+)
+_MARKER_KEY = 'TracePhase'
+
+
+@contextmanager
+def ydl_phases(ydl, label: str = ''):
+    """Attach phase markers to *ydl* for the enclosed extract_info() call.
+
+    The markers are removed again on exit, so the same YoutubeDL can be
+    traced once per URL when it is reused for several downloads.
+
+    Merge / conversion post-processors show up as ``postprocess:<Name>``.
+    Does nothing when no trace is active.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield ydl
+        return
+    clock = _PhaseClock(trace, label)
+    marker = _marker_class()
+    markers = []
+    for when, phase in _MARKERS:
+        pp = marker(clock, phase)
+        ydl.add_post_processor(pp, when=when)
+        markers.append((when, pp))
+
+    def _pp_hook(d):
+        name = d.get('postprocessor') or 'pp'
+        if name == _MARKER_KEY:
+            return
+        if d.get('status') == 'started':
+            clock.enter(f'postprocess:{name}')
+        elif d.get('status') == 'finished':
+            clock.enter('finalize')
+
+    ydl.add_postprocessor_hook(_pp_hook)
+    clock.enter('extract')
+    try:
+        yield ydl
+    finally:
+        clock.enter(None)
+        _detach(ydl, markers, _pp_hook)
+
+
+def _detach(ydl, markers, hook) -> None:
+    """Remove what ydl_phases attached, so a reused YoutubeDL can be traced again."""
+    pps = getattr(ydl, '_pps', {})
+    for when, pp in markers:
+        if pp in pps.get(when, ()):
+            pps[when].remove(pp)
+    for stage in pps.values():
+        for pp in stage:
+            hooks = getattr(pp, '_progress_hooks', None)
+            if hooks and hook in hooks:
+                hooks.remove(hook)
+    hooks = getattr(ydl, '_postprocessor_hooks', None)
+    if hooks and hook in hooks:
+        hooks.remove(hook)
@@ -0,0 +1,133 @@
+"""
+transfer.py
+───────────
+Shared transfer-engine settings for TikTok / Instagram / Facebook downloads.
+
+yt-dlp downloads a progressive (plain HTTP) file over one connection.  When
+aria2c is installed, larger files are split across several connections
+instead; how many is decided per video from its size, just before the
+download starts:
+
+  size < NATIVE_BELOW     native yt-dlp, one request (an aria2c process
+                          costs more than it saves on a few MB)
+  larger / unknown        aria2c, one connection per PIECE bytes, capped
+                          by the platform's per-server limit
+
+DASH / HLS fragments stay on yt-dlp's native downloader, which fetches
+`concurrent_fragment_downloads` of them at a time (set by the adaptive
+controller).  Without aria2c everything stays native and nothing changes.
+
+    opts.update(transfer.base_opts('tiktok'))
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        transfer.attach(ydl, 'tiktok')
+        ydl.download([url])
+"""
+
+from __future__ import annotations
+import functools
+import math
+import shutil
+
+MiB = 1024 * 1024
+
+NATIVE_BELOW = 4 * MiB       # smaller files: single native request
+PIECE        = 2 * MiB       # bytes per aria2c connection
+CHUNK_SIZE   = 10 * MiB      # native http_chunk_size for larger files
+
+# Connections per server: TikTok / Instagram CDNs answer 403 / 429 sooner
+_CONNECTIONS: dict[str, int] = {
+    'tiktok':    4,
+    'instagram': 4,
+    'facebook':  8,
+}
+
+
+# ── aria2c auto-detection ──────────────────────────────────────────────────────
+_aria2c_available: bool | None = None
+
+
+def has_aria2c() -> bool:
+    """Check if aria2c is available on PATH (cached)."""
+    global _aria2c_available
+    if _aria2c_available is None:
+        _aria2c_available = shutil.which('aria2c') is not None
+    return _aria2c_available
+
+
+# ── Plans ─────────────────────────────────────────────────────────────────────
+
+def connections_for(size: int | None, platform: str) -> int:
+    """Connections to use for a file of *size* bytes (None = unknown)."""
+    limit = _CONNECTIONS.get(platform, 4)
+    if size is None:
+        return limit
+    if size < NATIVE_BELOW:
+        return 1
+    return max(1, min(limit, math.ceil(size / PIECE)))
+
+
+def plan(size: int | None, platform: str, aria2c: bool | None = None) -> dict:
+    """yt-dlp params for downloading a file of *size* bytes on *platform*."""
+    if aria2c is None:
+        aria2c = has_aria2c()
+    n = connections_for(size, platform)
+    if not aria2c or n == 1:
+        return {
+            'external_downloader':      None,
+            'external_downloader_args': None,
+            'http_chunk_size':          CHUNK_SIZE if size is None or size > CHUNK_SIZE else None,
+        }
+    split_mb = max(1, math.ceil((size or n * PIECE) / n / MiB))
+    return {
+        'external_downloader': {'http': 'aria2c'},
+        'external_downloader_args': {
+            'aria2c': [
+                f'--max-connection-per-server={n}',
+                f'--split={n}',
+                f'--min-split-size={split_mb}M',
+            ],
+        },
+        'http_chunk_size': None,
+    }
+
+
+def base_opts(platform: str) -> dict:
+    """Transfer options for a platform's opts builder (size not known yet)."""
+    return {k: v for k, v in plan(None, platform).items() if v is not None}
+
+
+def _info_size(info: dict) -> int | None:
+    """Largest file yt-dlp is about to fetch for *info* (per requested format)."""
+    formats = info.get('requested_formats') or [info]
+    sizes = [f.get('filesize') or f.get('filesize_approx') for f in formats]
+    sizes = [int(s) for s in sizes if s]
+    return max(sizes) if sizes else None
+
+
+@functools.lru_cache(maxsize=None)
+def _tuner_class():
+    from yt_dlp.postprocessor.common import PostProcessor
+
+    class TransferTunePP(PostProcessor):
+        """Re-plan the transfer for each video once its size is known."""
+
+        def __init__(self, platform: str):
+            super().__init__(None)
+            self._platform = platform
+
+        def run(self, info):
+            params = self._downloader.params
+            for key, value in plan(_info_size(info), self._platform).items():
+                if value is None:
+                    params.pop(key, None)
+                else:
+                    params[key] = value
+            return [], info
+
+    return TransferTunePP
+
+
+def attach(ydl, platform: str):
+    """Tune *ydl*'s transfer settings per video from the selected format's size."""
+    ydl.add_post_processor(_tuner_class()(platform), when='before_dl')
+    return ydl
@@ -0,0 +1,70 @@
+"""
+tt_ids.py
+─────────
+Persistent per-username cache for TikTok profile lookups, so the slow
+secUid / channel_id fallback runs once per profile per week instead of on
+every profile download or listing.
+
+Entries live in tt_ids.json next to the app, keyed by lower-cased
+username, and expire after TTL seconds:
+
+    {'channel_id': 'MS4wLjABAAAA…', 'saved': 1760000000.0}
+
+    cache.get('someone')                 # fresh entry dict or None
+    cache.put('someone', channel_id=cid) # merge fields, restamp
+    cache.drop('someone')                # e.g. after the id stopped working
+"""
+
+from __future__ import annotations
+import os
+import re
+import time
+
+from json_store import JsonStore
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(_BASE_DIR, 'tt_ids.json')
+
+TTL = 7 * 86400
+
+_USERNAME_RE = re.compile(r'tiktok\.com/@([\w.\-]+)', re.IGNORECASE)
+
+
+def username_of(url: str) -> str | None:
+    """Return the lower-cased @username in a TikTok profile / video URL."""
+    m = _USERNAME_RE.search(url or '')
+    return m.group(1).lower() if m else None
+
+
+class ProfileCache(JsonStore):
+    """JSON-file backed username → lookup results (thread-safe, loaded on first use)."""
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = TTL):
+        super().__init__(path)
+        self.ttl = ttl
+
+    def get(self, username: str) -> dict | None:
+        with self._lock:
+            entry = self._load().get(username)
+        if not isinstance(entry, dict):
+            return None
+        saved = entry.get('saved')
+        if not isinstance(saved, (int, float)) or time.time() - saved > self.ttl:
+            return None
+        return dict(entry)
+
+    def put(self, username: str, **fields) -> None:
+        with self._lock:
+            data = self._load()
+            entry = data.get(username) if isinstance(data.get(username), dict) else {}
+            entry.update(fields, saved=time.time())
+            data[username] = entry
+            self._save(data)
+
+    def drop(self, username: str) -> None:
+        with self._lock:
+            if self._load().pop(username, None) is not None:
+                self._save(self._data)
+
+
+cache = ProfileCache()
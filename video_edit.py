@@ -1,8 +1,19 @@
 import os
+import re
 import shutil
 import subprocess
 import sys
-import ffmpeg
+import time
+from collections import deque
+
+import metrics
+from lazy_import import lazy_module
+from tracing import span
+
+ffmpeg = lazy_module('ffmpeg')
+
+
+_LINE_SPLIT = re.compile(rb'[\r\n]')
 
 
 # ── FFmpeg availability check ─────────────────────────────────────────────────
@@ -18,7 +29,10 @@ def check_ffmpeg() -> bool:
 
 
 def _run(stream) -> None:
-    """Run an ffmpeg stream graph, suppressing the console window on Windows."""
+    """Run an ffmpeg stream graph, suppressing the console window on Windows.
+
+    Stats lines on stderr are streamed into `metrics` (live encode fps).
+    """
     if not check_ffmpeg():
         raise RuntimeError(
             'FFmpeg không được tìm thấy. Cài đặt FFmpeg và thêm vào PATH.'
@@ -27,13 +41,34 @@ def _run(stream) -> None:
     kwargs: dict = {'stdout': subprocess.DEVNULL, 'stderr': subprocess.PIPE}
     if sys.platform == 'win32':
         kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
-    proc = subprocess.run(cmd, check=False, **kwargs)
-    if proc.returncode != 0:
-        stderr_text = (proc.stderr or b'').decode(errors='replace').strip()
+    tail: deque[bytes] = deque(maxlen=3)
+    started = time.perf_counter()
+    metrics.ffmpeg_started()
+    returncode = -1
+    try:
+        with span('ffmpeg', 'ffmpeg', output=os.path.basename(cmd[-1])):
+            with subprocess.Popen(cmd, **kwargs) as proc:
+                buf = b''
+                while True:
+                    chunk = proc.stderr.read1(8192)
+                    if not chunk:
+                        break
+                    # Progress lines end with \r, log lines with \n
+                    *lines, buf = _LINE_SPLIT.split(buf + chunk)
+                    for line in lines:
+                        if line.strip():
+                            metrics.ffmpeg_line(line)
+                            tail.append(line)
+                if buf.strip():
+                    tail.append(buf)
+                returncode = proc.wait()
+    finally:
+        metrics.ffmpeg_finished(returncode == 0, time.perf_counter() - started)
+    if returncode != 0:
         # Keep only the last 3 lines for a concise error
-        lines = stderr_text.splitlines()[-3:]
+        lines = [ln.decode(errors='replace').strip() for ln in tail]
         raise RuntimeError(
-            f'FFmpeg lỗi (code {proc.returncode}): {chr(10).join(lines)}'
+            f'FFmpeg lỗi (code {returncode}): {chr(10).join(lines)}'
         )
 
 
@@ -0,0 +1,168 @@
+"""
+warmup.py
+─────────
+Background warm-up started once the window is visible.
+
+Moves one-off costs off the first user request:
+  ✓ imports    yt_dlp + the TikTok / YouTube / Facebook / Instagram
+               extractor modules, requests, ffmpeg-python, PIL / numpy
+  ✓ tools      check_ffmpeg() and _has_aria2c() (PATH lookups, cached)
+  ✓ cookies    cookie file validation and the YouTube browser-cookie probe
+  ✓ http       keep-alive connections to the scraper hosts (http_pool)
+
+Stages run in order on one daemon thread; every cache they fill is the
+same one the download code reads, so nothing changes functionally when a
+request arrives before warm-up is done — it just pays the cost itself.
+
+    warmup.start(log_fn)          # idempotent
+    warmup.status()               # {'imports': 'done', 'cookies': 'running', ...}
+    warmup.wait('imports', 2.0)   # block until a stage finished (or timeout)
+"""
+
+from __future__ import annotations
+import threading
+import time
+from typing import Callable
+
+from lazy_import import load
+
+_EXTRACTORS = ('TikTok', 'TikTokUser', 'Youtube', 'YoutubeTab',
+               'Facebook', 'FacebookReel', 'Instagram', 'InstagramUser')
+_MODULES    = ('requests', 'ffmpeg', 'numpy', 'PIL.Image', 'urllib.request')
+_PRECONNECT = ('https://www.tiktok.com/', 'https://www.facebook.com/')
+
+
+def _warm_imports() -> str:
+    load('yt_dlp')
+    extractor = load('yt_dlp.extractor')
+    for name in _EXTRACTORS:
+        try:
+            ie = extractor.get_info_extractor(name)
+            getattr(ie, 'real_class', ie)   # import the real extractor module
+        except Exception:
+            pass
+    for name in _MODULES:
+        try:
+            load(name)
+        except ImportError:
+            pass
+    return f'{len(_EXTRACTORS)} extractors'
+
+
+def _warm_tools() -> str:
+    import video_edit
+    import youtube_download
+    ffmpeg_ok = video_edit.check_ffmpeg()
+    aria2c_ok = youtube_download._has_aria2c()
+    return f"ffmpeg={'có' if ffmpeg_ok else 'không'} aria2c={'có' if aria2c_ok else 'không'}"
+
+
+def _warm_cookies() -> str:
+    import facebook_download
+    import instagram_download
+    import youtube_download
+    found = []
+    if youtube_download._cookies_opt():
+        found.append('youtube')
+    if facebook_download._get_cookie_file():
+        found.append('facebook')
+    if instagram_download._cookies_opt():
+        found.append('instagram')
+    return ', '.join(found) or 'không có cookies'
+
+
+def _warm_http() -> str:
+    import http_pool
+    ok = http_pool.preconnect(list(_PRECONNECT))
+    return f'{ok}/{len(_PRECONNECT)} host'
+
+
+STAGES: tuple[tuple[str, Callable[[], str]], ...] = (
+    ('imports', _warm_imports),
+    ('tools',   _warm_tools),
+    ('cookies', _warm_cookies),
+    ('http',    _warm_http),
+)
+
+
+class WarmUp:
+    """Runs STAGES once on a daemon thread and records per-stage state."""
+
+    def __init__(self, log_fn: Callable | None = None):
+        self.log_fn = log_fn
+        self.state: dict[str, str]     = {name: 'pending' for name, _ in STAGES}
+        self.durations: dict[str, float] = {}
+        self._events = {name: threading.Event() for name, _ in STAGES}
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='warmup')
+            self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        return all(ev.is_set() for ev in self._events.values())
+
+    def wait(self, stage: str | None = None, timeout: float | None = None) -> bool:
+        """Wait for *stage* (or every stage). Returns True if it finished."""
+        if stage is not None:
+            return self._events[stage].wait(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for ev in self._events.values():
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not ev.wait(left):
+                return False
+        return True
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        for name, fn in STAGES:
+            self.state[name] = 'running'
+            t0 = time.perf_counter()
+            try:
+                detail = fn()
+                self.state[name] = 'done'
+                tag = 'info'
+            except Exception as e:
+                detail = str(e)
+                self.state[name] = 'failed'
+                tag = 'err'
+            self.durations[name] = time.perf_counter() - t0
+            self._events[name].set()
+            self._log(f'[Warm-up] {name}: {detail} ({self.durations[name]:.2f}s)', tag)
+        self._log(f'[Warm-up] Sẵn sàng ({time.perf_counter() - started:.1f}s)', 'ok')
+
+    def _log(self, text: str, tag: str) -> None:
+        if self.log_fn:
+            try:
+                self.log_fn(text, tag)
+            except Exception:
+                pass
+
+
+_instance: WarmUp | None = None
+_lock = threading.Lock()
+
+
+def start(log_fn: Callable | None = None) -> WarmUp:
+    """Start the process-wide warm-up (once) and return it."""
+    global _instance
+    with _lock:
+        if _instance is None:
+            _instance = WarmUp(log_fn)
+            _instance.start()
+        return _instance
+
+
+def status() -> dict[str, str]:
+    """Per-stage state: pending / running / done / failed ('not started' if never started)."""
+    if _instance is None:
+        return {name: 'not started' for name, _ in STAGES}
+    return dict(_instance.state)
+
+
+def wait(stage: str | None = None, timeout: float | None = None) -> bool:
+    if _instance is None:
+        return False
+    return _instance.wait(stage, timeout)
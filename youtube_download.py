@@ -12,10 +12,10 @@ Supports:
 Quality options: best, 2160p, 1440p, 1080p, 720p, 480p, 360p, audio-only
 
 Performance features:
-  ✓ Concurrent fragment downloads (N=8 internal threads)
+  ✓ Concurrent fragment downloads (N adapted per platform, starts at 8)
   ✓ aria2c external downloader (auto-detected, 16 connections)
   ✓ Download resume for interrupted transfers
-  ✓ Concurrent multi-URL downloading (ThreadPoolExecutor)
+  ✓ Concurrent multi-URL downloading (ThreadPoolExecutor, AIMD-tuned workers)
   ✓ Optimized format sorting: resolution → HDR → fps → codec → bitrate
   ✓ Auto cookie detection (file → browser fallback)
   ✓ Robust retry & timeout handling
@@ -24,11 +24,18 @@ Performance features:
 from __future__ import annotations
 import os
 import re
-import shutil
 import concurrent.futures
 from typing import Callable
 
-import yt_dlp
+import info_cache
+import library_index
+import metrics
+import transfer
+from concurrency import MAX_WORKERS, get_controller
+from lazy_import import lazy_module
+from tracing import bind, traced, ydl_phases
+
+yt_dlp = lazy_module('yt_dlp')
 
 
 # ── URL validation ──────────────────────────────────────────────────────────────
@@ -65,7 +72,8 @@ _QUALITY_FORMATS: dict[str, str] = {
     "audio": "bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio/best",
 }
 
-# Max concurrent video downloads for multi-URL / playlist modes
+# Starting number of concurrent video downloads for multi-URL mode — the
+# adaptive controller (concurrency.py) raises / lowers it from here
 MAX_CONCURRENT_DOWNLOADS = 3
 
 
@@ -97,7 +105,7 @@ def get_youtube_runtime_context(quality: str = "best", use_cookies: bool = True)
         "cookies": cookie_status,
         "using_cookies": bool(cookies_opt),
         "using_aria2c": _has_aria2c(),
-        "concurrent_fragments": 8,
+        "concurrent_fragments": get_controller("youtube").fragments,
     }
 
 
@@ -119,6 +127,7 @@ def _validate_cookies_file(path: str) -> bool:
         return False
 
 
+@traced('cookies', 'youtube')
 def _cookies_opt() -> dict:
     """Return the best available cookies option.
 
@@ -166,21 +175,16 @@ def _cookies_opt() -> dict:
     return _cached_cookies
 
 
-# ── aria2c auto-detection ──────────────────────────────────────────────────────
-_aria2c_available: bool | None = None
-
-
+# ── aria2c auto-detection (shared with the other platforms) ────────────────────
 def _has_aria2c() -> bool:
     """Check if aria2c is available on PATH (cached)."""
-    global _aria2c_available
-    if _aria2c_available is None:
-        _aria2c_available = shutil.which("aria2c") is not None
-    return _aria2c_available
+    return transfer.has_aria2c()
 
 
 # ── Internal helpers ─────────────────────────────────────────────────────────
 
 
+@traced('build_opts', 'youtube')
 def _build_ydl_opts(
     out_dir: str,
     quality: str = "best",
@@ -190,6 +194,7 @@ def _build_ydl_opts(
     """Construct yt-dlp options dict optimized for maximum quality & speed."""
     fmt = _QUALITY_FORMATS.get(quality, _QUALITY_FORMATS["best"])
     is_audio = (quality == "audio")
+    ctl = get_controller("youtube")
 
     opts: dict = {
         "format":              fmt,
@@ -211,8 +216,12 @@ def _build_ydl_opts(
         "http_chunk_size":     10 * 1024 * 1024,   # 10 MB
         "socket_timeout":      30,
 
-        # ── Concurrent fragment downloads (yt-dlp -N) ─────────────────────
-        "concurrent_fragment_downloads": 8,
+        # ── Concurrent fragment downloads (yt-dlp -N, adaptive) ───────────
+        "concurrent_fragment_downloads": ctl.fragments,
+
+        # ── Feed 429/403/timeout retries back to the adaptive controller ──
+        "logger":              ctl.logger(metrics.ErrorLogger("youtube")),
+        "post_hooks":          [metrics.post_hook("youtube")],
 
         # ── JS runtime for YouTube signature/challenge solving ─────────────
         "js_runtimes":         {"node": {}},
@@ -259,8 +268,9 @@ def _build_ydl_opts(
             }
         }
 
+    opts["progress_hooks"] = [ctl.observe, metrics.progress_hook("youtube")]
     if progress_hook:
-        opts["progress_hooks"] = [progress_hook]
+        opts["progress_hooks"].append(progress_hook)
 
     return opts
 
@@ -292,6 +302,7 @@ def download_youtube_video(
             log_fn(f"URL không hợp lệ: {url}", "err")
         return None
     os.makedirs(out_dir, exist_ok=True)
+    get_controller("youtube", log_fn)
     if log_fn:
         ctx = get_youtube_runtime_context(quality, use_cookies)
         log_fn(
@@ -303,8 +314,13 @@ def download_youtube_video(
         )
     opts = _build_ydl_opts(out_dir, quality, progress_hook, use_cookies)
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+        with library_index.attach(yt_dlp.YoutubeDL(opts), out_dir) as ydl, ydl_phases(ydl, url):
+            path = library_index.existing(ydl, url)
+            if path:
+                if log_fn:
+                    log_fn(f"[Library] Đã có: {os.path.basename(path)} — bỏ qua tải", "info")
+                return path
+            info = info_cache.extract(ydl, url)
             if info:
                 return ydl.prepare_filename(info)
     except yt_dlp.utils.DownloadError as e:
@@ -318,7 +334,7 @@ def download_youtube_video(
             f1["format"] = "best"                    # no DASH requirement
             f1.pop("extractor_args", None)           # let yt-dlp pick client
             try:
-                with yt_dlp.YoutubeDL(f1) as ydl:
+                with library_index.attach(yt_dlp.YoutubeDL(f1), out_dir) as ydl, ydl_phases(ydl, url):
                     info = ydl.extract_info(url, download=True)
                     if info:
                         if log_fn:
@@ -351,10 +367,13 @@ def download_youtube_video(
                     "youtube": {"player_client": ["tv_embedded", "mweb"]}
                 },
             }
+            f2["progress_hooks"] = [get_controller("youtube").observe,
+                                    metrics.progress_hook("youtube")]
+            f2["post_hooks"] = [metrics.post_hook("youtube")]
             if progress_hook:
-                f2["progress_hooks"] = [progress_hook]
+                f2["progress_hooks"].append(progress_hook)
             try:
-                with yt_dlp.YoutubeDL(f2) as ydl:
+                with library_index.attach(yt_dlp.YoutubeDL(f2), out_dir) as ydl, ydl_phases(ydl, url):
                     info = ydl.extract_info(url, download=True)
                     if info:
                         if log_fn:
@@ -373,6 +392,7 @@ def download_youtube_video(
     except Exception as e:
         if log_fn:
             log_fn(f"[YouTube] lỗi không xác định: {e}", "err")
+    metrics.record_failure("youtube")
     return None
 
 
@@ -405,6 +425,7 @@ def download_youtube_playlist(
     opts["ignoreerrors"] = True   # skip unavailable videos in playlist
 
     ok = err = 0
+    listed = processed = 0
 
     def _hook(d: dict) -> None:
         nonlocal ok, err
@@ -420,16 +441,26 @@ def download_youtube_playlist(
         if progress_hook:
             progress_hook(d)
 
-    opts["progress_hooks"] = [_hook]
+    opts["progress_hooks"] = [get_controller("youtube").observe,
+                              metrics.progress_hook("youtube"), _hook]
 
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            total = len(info.get("entries", [])) if info else 0
+        with library_index.attach(yt_dlp.YoutubeDL(opts), out_dir) as ydl, ydl_phases(ydl, url):
+            try:
+                info = ydl.extract_info(url, download=True)
+                metrics.record_playlist("youtube", info)
+                total = len(info.get("entries", [])) if info else 0
+            finally:
+                listed, processed = library_index.skipped(ydl)
     except Exception:
+        metrics.record_failure("youtube")
         total = 0
+    # Videos already in the library are skipped without a "finished" hook;
+    # listed ones are not among the processed entries either
+    if listed + processed and log_fn:
+        log_fn(f"[Library] Đã có {listed + processed} video — bỏ qua tải", "info")
 
-    return ok, total
+    return ok + listed + processed, total + listed
 
 
 def download_youtube_multi(
@@ -438,23 +469,27 @@ def download_youtube_multi(
     quality: str = "best",
     progress_hook: Callable | None = None,
     log_fn: Callable | None = None,
-    max_workers: int = MAX_CONCURRENT_DOWNLOADS,
+    max_workers: int | None = None,
     use_cookies: bool = True,
 ) -> tuple[int, int]:
     """Download multiple individual YouTube URLs concurrently.
 
-    Uses ThreadPoolExecutor for parallel downloads (default 3 workers).
+    Uses ThreadPoolExecutor for parallel downloads.  With max_workers=None the
+    number of simultaneous downloads is driven by the adaptive controller
+    (starts at MAX_CONCURRENT_DOWNLOADS); an explicit value pins it.
 
     Returns: (success_count, total_count)
     """
     os.makedirs(out_dir, exist_ok=True)
+    ctl = get_controller("youtube", log_fn)
     if log_fn:
         ctx = get_youtube_runtime_context(quality, use_cookies)
         log_fn(
             "[YouTube] cấu hình multi-url: "
             f"quality={ctx['quality']} | cookies={ctx['cookies']} | "
             f"aria2c={'bật' if ctx['using_aria2c'] else 'tắt'} | "
-            f"N={ctx['concurrent_fragments']} | workers={max_workers}",
+            f"N={ctx['concurrent_fragments']} | "
+            f"workers={max_workers or f'auto ({ctl.workers})'}",
             "info",
         )
 
@@ -469,9 +504,23 @@ def download_youtube_multi(
                 log_fn(f"Thất bại: {single_url}", "err")
             return False
 
+    def _download_gated(single_url: str) -> bool:
+        with ctl.slot():
+            return _download_one(single_url)
+
+    if max_workers:
+        pool_size, task = max_workers, _download_one
+    else:
+        pool_size, task = MAX_WORKERS, _download_gated
+
+    def _queued(single_url: str) -> bool:
+        metrics.queue_done()
+        return task(single_url)
+
     ok = 0
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
-        futures = {pool.submit(_download_one, u): u for u in urls}
+    metrics.queue_add(len(urls))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=pool_size) as pool:
+        futures = {pool.submit(bind(_queued), u): u for u in urls}
         for future in concurrent.futures.as_completed(futures):
             try:
                 if future.result():
@@ -552,6 +601,7 @@ def download_youtube_channel(
     opts["ignoreerrors"] = True   # skip unavailable videos in channel
 
     ok = err = 0
+    listed = processed = 0
 
     def _hook(d: dict) -> None:
         nonlocal ok, err
@@ -567,19 +617,29 @@ def download_youtube_channel(
         if progress_hook:
             progress_hook(d)
 
-    opts["progress_hooks"] = [_hook]
+    opts["progress_hooks"] = [get_controller("youtube").observe,
+                              metrics.progress_hook("youtube"), _hook]
 
     total = 0
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            entries = info.get("entries") if info else None
-            if entries is not None:
-                total = len(list(entries))   # entries may be a generator
+        with library_index.attach(yt_dlp.YoutubeDL(opts), out_dir) as ydl, ydl_phases(ydl, url):
+            try:
+                info = ydl.extract_info(url, download=True)
+                entries = info.get("entries") if info else None
+                if entries is not None:
+                    info["entries"] = entries = list(entries)   # entries may be a generator
+                    total = len(entries)
+                metrics.record_playlist("youtube", info)
+            finally:
+                listed, processed = library_index.skipped(ydl)
     except Exception:
-        pass
+        metrics.record_failure("youtube")
+    # Videos already in the library are skipped without a "finished" hook;
+    # listed ones are not among the processed entries either
+    if listed + processed and log_fn:
+        log_fn(f"[Library] Đã có {listed + processed} video — bỏ qua tải", "info")
 
-    return ok, total
+    return ok + listed + processed, total + listed
 
 
 # ── Utility: get video info without downloading ───────────────────────────────
@@ -665,6 +725,7 @@ def fetch_video_list(url: str, max_videos: int | None = None,
                     if on_result:
                         on_result(results[-1])
             else:
+                info_cache.put(info, url)
                 vid_id = info.get("id", "")
                 thumb = ""
                 if info.get("thumbnails"):